@@ -0,0 +1,51 @@
+import argparse
+
+import numpy as np
+
+import noxitu.minecraft.renderer.block_file as block_file
+import noxitu.minecraft.renderer.view as view
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reports points submitted by render_close_chunks with and without skipping back-facing directions.')
+    parser.add_argument('path', help='block file without extension, e.g. data/block_buffers/output')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--view-distance', type=int, default=2)
+    parser.add_argument('--fov', type=float, default=80)
+    args = parser.parse_args()
+
+    mega_chunks = block_file.load_mega_chunks(args.path)
+    keys = np.array(list(mega_chunks), dtype=int).reshape(-1, 3)
+    lows, highs = 256.0 * keys, 256.0 * (keys + 1)
+    direction_ranges = block_file.load_direction_ranges(args.path)
+    counts = np.array([
+        (direction_ranges[key] if key in direction_ranges else block_file.split_by_direction(blocks)[1])[:, 1]
+        for key, blocks in mega_chunks.items()
+    ])
+
+    random = np.random.RandomState(0)
+    frustum_points = facing_points = 0
+
+    for _ in range(args.frames):
+        camera_position = np.array([random.uniform(lows[:, 0].min(), highs[:, 0].max()),
+                                    random.uniform(60, 160),
+                                    random.uniform(lows[:, 2].min(), highs[:, 2].max())])
+        matrix = (view.perspective(args.fov, 16/9)
+                  @ view.view(random.uniform(-180, 180), random.uniform(-60, 30), 0)
+                  @ view.location(camera_position))
+
+        camera_chunk = np.floor(camera_position / 256).astype(int)[::2]
+        close = np.linalg.norm(camera_chunk - keys[:, ::2], ord=np.inf, axis=1) <= args.view_distance
+        visible = close & view.boxes_in_frustum(view.frustum_planes(matrix), lows, highs)
+        facing = view.facing_directions(camera_position, lows[visible], highs[visible])
+
+        frustum_points += counts[visible].sum()
+        facing_points += (counts[visible] * facing).sum()
+
+    print(f'      frustum culling: {frustum_points/args.frames:12.0f} points/frame')
+    print(f'  + back-face skipping: {facing_points/args.frames:12.0f} points/frame')
+    print(f'            reduction: {1 - facing_points/max(frustum_points, 1):.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import time
+
+import numpy as np
+
+from noxitu.minecraft.map.load import load_lazy
+from noxitu.minecraft.renderer.greedy_mesh import greedy_quads
+from noxitu.minecraft.renderer.tiled_faces import build_block_buffer
+
+
+def _parse_range(value):
+    start, stop = map(int, value.split(':'))
+    return slice(start, stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reports the reduction of the face buffer by greedy meshing.')
+    parser.add_argument('path', help='data/chunks directory')
+    parser.add_argument('--x-range', type=_parse_range, default=None, help='chunk range, e.g. -20:20')
+    parser.add_argument('--z-range', type=_parse_range, default=None)
+    args = parser.parse_args()
+
+    offset, world = load_lazy(args.path, x_range=args.x_range, z_range=args.z_range)
+    # The legacy face buffer has no textures, faces are merged by color only.
+    texture_mapping = np.zeros((int(np.iinfo(np.uint16).max) + 1, 6), dtype=np.int16)
+
+    start = time.perf_counter()
+    blocks = build_block_buffer(world, texture_mapping, offset=offset[[2, 0, 1]])
+    faces_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer, extents = greedy_quads(blocks)
+    greedy_time = time.perf_counter() - start
+
+    # One quad of 4 vertices per face, as written by compute_faces.
+    faces_size = 4 * len(blocks) * buffer.dtype.itemsize
+    greedy_size = buffer.nbytes + extents.nbytes
+
+    print(f'   faces: {len(blocks):>10} quads   {faces_size/1024/1024:8.1f} MB   {faces_time:.2f} s')
+    print(f'  greedy: {len(buffer):>10} quads   {greedy_size/1024/1024:8.1f} MB   {greedy_time:.2f} s')
+    print(f'  reduction: {len(blocks)/max(len(buffer), 1):.1f}x faces, {faces_size/max(greedy_size, 1):.1f}x size')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+from noxitu.minecraft.map.load import load
+
+
+def _ch(idx):
+    return slice(16*idx, 16*idx+16)
+
+
+def load_serial(path):
+    # The implementation of map.load before the index and the thread pool.
+    chunks = []
+    chunks_paths = []
+
+    for chunk in os.listdir(path):
+        if not chunk.endswith('_chunk.npy'):
+            continue
+
+        x, z = map(int, chunk.split('_')[:2])
+        chunks.append((x, z))
+        chunks_paths.append(chunk)
+
+    chunks = np.array(chunks)
+
+    min_x = np.amin(chunks[:, 0])
+    min_z = np.amin(chunks[:, 1])
+    max_x = np.amax(chunks[:, 0])
+    max_z = np.amax(chunks[:, 1])
+
+    world = np.zeros((256, 16*(max_z-min_z+1), 16*(max_x-min_x+1)), dtype=np.uint16)
+
+    for chunk in chunks_paths:
+        x, z = map(int, chunk.split('_')[:2])
+        world[:, _ch(z-min_z), _ch(x-min_x)] = np.load(os.path.join(path, chunk))
+
+    return np.array([0, 16*min_z, 16*min_x]), world
+
+
+def drop_page_cache(path):
+    # Evicts clean pages of the store, does not need root.
+    for name in os.listdir(path):
+        fd = os.open(os.path.join(path, name), os.O_RDONLY)
+
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def measure(name, path, function):
+    times = []
+
+    for cold in (True, False):
+        if cold:
+            drop_page_cache(path)
+
+        start = time.perf_counter()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, world = function(path)
+
+        times.append(time.perf_counter() - start)
+
+    print(f'{name:>12}: cold {times[0]:.2f} s   warm {times[1]:.2f} s')
+    return world
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares loading a chunk store with the serial implementation.')
+    parser.add_argument('path', help='data/chunks directory')
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16])
+    args = parser.parse_args()
+
+    worlds = []
+
+    if any(name.endswith('_chunk.npy') for name in os.listdir(args.path)):
+        worlds.append(measure('serial', args.path, load_serial))
+
+    for workers in args.workers:
+        worlds.append(measure(f'{workers} threads', args.path, lambda path: load(path, workers=workers)))
+
+    assert all(np.array_equal(world, worlds[0]) for world in worlds)
+
+
+if __name__ == '__main__':
+    main()
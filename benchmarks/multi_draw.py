@@ -0,0 +1,108 @@
+"""Frame time of render_close_chunks with per-chunk draws and with one glMultiDrawArrays.
+
+Runs headless on Mesa llvmpipe through EGL, without an X server:
+
+    PYOPENGL_PLATFORM=egl SDL_VIDEODRIVER=offscreen LIBGL_ALWAYS_SOFTWARE=1 \\
+        python benchmarks/multi_draw.py data/block_buffers/output
+"""
+import argparse
+from types import SimpleNamespace
+import time
+
+import numpy as np
+import pygame
+from pygame.locals import DOUBLEBUF, HIDDEN, OPENGL
+from OpenGL.GL import *
+
+import noxitu.minecraft.renderer.block_file as block_file
+import noxitu.minecraft.renderer.main as renderer_main
+import noxitu.minecraft.renderer.renderables2 as renderables
+from noxitu.minecraft.renderer.state import SUN_DIRECTION
+import noxitu.minecraft.renderer.view as view
+
+
+def camera_frames(lows, highs, n_frames, view_distance, fov, aspect):
+    random = np.random.RandomState(0)
+
+    for _ in range(n_frames):
+        camera_position = np.array([random.uniform(lows[:, 0].min(), highs[:, 0].max()),
+                                    random.uniform(60, 160),
+                                    random.uniform(lows[:, 2].min(), highs[:, 2].max())])
+
+        yield SimpleNamespace(
+            sun_direction=SUN_DIRECTION,
+            camera_position=camera_position,
+            projectionview_matrix=(view.perspective(fov, aspect)
+                                   @ view.view(random.uniform(-180, 180), random.uniform(-60, 30), 0)
+                                   @ view.location(camera_position)),
+            camera_chunk=np.floor(camera_position / 256).astype(int)[::2],
+            view_distance=view_distance,
+        )
+
+
+def measure(context, frames):
+    times = []
+
+    for frame in frames:
+        start = time.perf_counter()
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        renderables.render_close_chunks(context, frame)
+        glFinish()
+
+        times.append(time.perf_counter() - start)
+
+    return np.array(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares frame times of drawing close mega chunks one by one and with glMultiDrawArrays.')
+    parser.add_argument('path', help='block file without extension, e.g. data/block_buffers/output')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--view-distance', type=int, default=2)
+    parser.add_argument('--fov', type=float, default=80)
+    parser.add_argument('--size', type=int, nargs=2, default=(1280, 720))
+    args = parser.parse_args()
+
+    mega_chunks = block_file.load_mega_chunks(args.path)
+    direction_ranges = block_file.load_direction_ranges(args.path)
+
+    pygame.init()
+    pygame.display.set_mode(args.size, DOUBLEBUF | OPENGL | HIDDEN)
+    print('GL_RENDERER =', glGetString(GL_RENDERER).decode())
+
+    def context(vaos, multi_draw):
+        return SimpleNamespace(
+            ensure_framebuffer=renderables.EnsureFunc(),
+            ensure_program=renderables.EnsureFunc(),
+            default_framebuffer=0,
+            screen_size=tuple(args.size),
+            texture_atlas=0,
+            main_program=main_program,
+            mega_chunks_boxes=renderables.create_mega_chunks_boxes(vaos),
+            multi_draw=multi_draw,
+            multi_draw_boxes=renderables.create_mega_chunks_boxes(packed),
+        )
+
+    main_program = renderer_main.create_program('play2')
+    separate = {key: renderer_main.create_vao(blocks, direction_ranges.get(key)) for key, blocks in mega_chunks.items()}
+    packed = renderer_main.create_packed_vaos(mega_chunks, direction_ranges)
+
+    modes = [
+        ('per-chunk vertex arrays', context(separate, False)),
+        ('packed, per-chunk draws', context(packed, False)),
+        ('packed, glMultiDrawArrays', context(separate, True)),
+    ]
+
+    boxes = modes[0][1].mega_chunks_boxes
+    frames = list(camera_frames(boxes.lows, boxes.highs, args.frames, args.view_distance, args.fov, args.size[0] / args.size[1]))
+
+    for name, mode_context in modes:
+        measure(mode_context, frames[:5])
+        times = 1000 * measure(mode_context, frames)
+        print(f'{name:>26}: {np.mean(times):8.2f} ms mean {np.median(times):8.2f} ms median  '
+              f'({mode_context.frame_stats.drawn_chunks} chunks in the last frame)')
+
+
+if __name__ == '__main__':
+    main()
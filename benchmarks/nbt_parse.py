@@ -0,0 +1,44 @@
+import argparse
+import time
+
+import noxitu.minecraft.protocol.nbt as nbt
+from noxitu.minecraft.map.region import RegionFile
+
+
+def read_chunks(path, limit):
+    with RegionFile(path) as region:
+        return [region.read(local_x, local_z) for local_x, local_z in region.chunks()[:limit]]
+
+
+def measure(name, chunks, parse):
+    start = time.perf_counter()
+
+    for chunk in chunks:
+        parse(chunk)
+
+    elapsed = time.perf_counter() - start
+    print(f'{name:>10}: {elapsed:.3f} s   {1e3*elapsed/len(chunks):.2f} ms/chunk')
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares NBT parsers on chunks of a region file.')
+    parser.add_argument('region', help='path to r.X.Z.mca file')
+    parser.add_argument('--chunks', type=int, default=200)
+    args = parser.parse_args()
+
+    chunks = read_chunks(args.region, args.chunks)
+    print(f'Loaded {len(chunks)} chunks, {sum(map(len, chunks))/1024/1024:.1f} MB of NBT.')
+
+    reference = measure('parse', chunks, nbt.parse)
+    fast = measure('parse_fast', chunks, nbt.parse_fast)
+
+    fields = ['Level.xPos', 'Level.zPos', 'Level.Sections.Y', 'Level.Sections.Palette', 'Level.Sections.BlockStates']
+    selective = measure('selective', chunks, lambda chunk: nbt.parse_fast(chunk, include=fields))
+
+    print(f'Speedup: {reference / fast:.1f}x (selective: {reference / selective:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
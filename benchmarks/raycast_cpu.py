@@ -0,0 +1,87 @@
+import argparse
+import time
+
+import numpy as np
+
+from noxitu.minecraft.raycaster.core import build_acceleration, raycast_native
+from noxitu.minecraft.raycaster.rays import create_camera_rays
+import noxitu.minecraft.renderer.view as view
+
+
+# 4K RENDER_SHAPE of noxitu.minecraft.raycaster.main.
+RENDER_SHAPE = 1080*2, 1920*2
+
+
+def synthetic_world(size=768, height=128):
+    # Rolling terrain around y = 64 with a few trees, air above it.
+    z, x = np.mgrid[:size, :size] / size * 2 * np.pi
+    heights = (64 + 8 * np.sin(3 * x) * np.cos(2 * z) + 4 * np.sin(7 * z + x)).astype(int)
+
+    world = np.zeros((height, size, size), dtype=np.uint16)
+    world[np.arange(height).reshape(-1, 1, 1) < heights] = 1
+
+    random = np.random.RandomState(0)
+    for tz, tx in random.randint(2, size - 2, size=(size, 2)):
+        top = heights[tz, tx]
+        world[top:top+4, tz, tx] = 2
+        world[top+3:top+6, tz-2:tz+3, tx-2:tx+3] = 3
+
+    return world, np.array([0, 1, 1, 1], dtype=bool)
+
+
+def synthetic_rays(world, shape, fov=80, dtype=float):
+    _, sz, sx = world.shape
+    position = np.array([sx / 2, 100, sz / 2])
+
+    return create_camera_rays(
+        position=position,
+        rotation=view.view(30, -20, 0)[:3, :3],
+        camera=view.perspective(fov, shape[1] / shape[0])[:3, :3],
+        resolution=shape,
+        offset=np.zeros(3),
+        dtype=dtype,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rays per second of the CPU raycaster with and without empty-space skipping.')
+    parser.add_argument('--data', action='store_true', help='use the world and viewport of noxitu.minecraft.raycaster.io instead of a synthetic world')
+    parser.add_argument('--shape', type=int, nargs=2, default=RENDER_SHAPE, help='height and width of the image')
+    parser.add_argument('--dtype', choices=['float64', 'float32'], default='float64', help='dtype of rays and depths')
+    args = parser.parse_args()
+
+    if args.data:
+        import noxitu.minecraft.raycaster.io as io
+        from noxitu.minecraft.raycaster.main import GLOBAL_COLORS_MASK, create_camera_rays as create_viewport_rays
+
+        offset, world = io.load_world()
+        rays = create_viewport_rays(tuple(args.shape), io.load_viewport(), offset).astype(args.dtype)
+        mask = GLOBAL_COLORS_MASK
+    else:
+        world, mask = synthetic_world()
+        rays = synthetic_rays(world, tuple(args.shape), dtype=args.dtype)
+
+    n_rays = np.prod(rays.shape[:-1])
+    print(f'world {world.shape}, {n_rays:,} {rays.dtype} rays')
+
+    start = time.perf_counter()
+    build_acceleration(world, mask)
+    print(f'   acceleration structure: {time.perf_counter() - start:8.3f} s')
+
+    results = []
+
+    for name, accelerate in [('voxel by voxel', False), ('empty-space skipping', True)]:
+        raycast_native(rays[:16], world, mask, accelerate=accelerate)
+
+        start = time.perf_counter()
+        results.append(raycast_native(rays, world, mask, accelerate=accelerate))
+        elapsed = time.perf_counter() - start
+
+        print(f'{name:>25}: {elapsed:8.3f} s {n_rays / elapsed / 1e6:8.2f} Mrays/s')
+
+    identical = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(*results))
+    print(f'identical results: {identical}')
+
+
+if __name__ == '__main__':
+    main()
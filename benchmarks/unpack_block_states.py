@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import numpy as np
+
+import noxitu.minecraft.protocol.nbt as nbt
+from noxitu.minecraft.map.block_states import SECTION_SIZE, bits_per_block, unpack_block_states, unpack_long
+from noxitu.minecraft.map.region import RegionFile
+
+
+def read_sections(path, limit):
+    sections = []
+
+    with RegionFile(path) as region:
+        for local_x, local_z in region.chunks():
+            chunk, _ = nbt.parse(region.read(local_x, local_z))
+
+            for section in chunk[b''][b'Level'].get(b'Sections', []):
+                if b'BlockStates' in section:
+                    sections.append((section[b'BlockStates'], len(section[b'Palette'])))
+
+            if len(sections) >= limit:
+                break
+
+    return sections[:limit]
+
+
+def unpack_with_generator(packed, bits, palette):
+    result = [val for long in packed for val in unpack_long(long, bits)]
+    result = result[:SECTION_SIZE]
+    result = palette[result]
+    return np.array(result).reshape(16, 16, 16).astype(int)
+
+
+def measure(name, sections, unpack):
+    start = time.perf_counter()
+
+    for packed, palette_length in sections:
+        unpack(packed, bits_per_block(palette_length), np.arange(palette_length))
+
+    elapsed = time.perf_counter() - start
+    print(f'{name:>10}: {elapsed:.3f} s   {1e6*elapsed/len(sections):.1f} us/section')
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares BlockStates unpacking on sections of a region file.')
+    parser.add_argument('region', help='path to r.X.Z.mca file')
+    parser.add_argument('--sections', type=int, default=2000)
+    args = parser.parse_args()
+
+    sections = read_sections(args.region, args.sections)
+    print(f'Loaded {len(sections)} sections.')
+
+    for packed, palette_length in sections:
+        bits = bits_per_block(palette_length)
+        expected = unpack_with_generator(packed, bits, np.arange(palette_length))
+        assert np.array_equal(unpack_block_states(packed, bits, np.arange(palette_length)), expected)
+
+    generator = measure('generator', sections, unpack_with_generator)
+    vectorized = measure('numpy', sections, unpack_block_states)
+
+    print(f'Speedup: {generator / vectorized:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
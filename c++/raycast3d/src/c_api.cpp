@@ -2,11 +2,23 @@
 // #include "raycast_amp.hpp"
 #include "raycast_cpu.hpp"
 #include <iostream>
+#include <stdexcept>
+#include <typeinfo>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+#ifdef _WIN32
+#define RAYCAST_EXPORT __declspec(dllexport)
+#else
+#define RAYCAST_EXPORT __attribute__((visibility("default")))
+#endif
 
 #define ARRAY_ARG_SIGNATURE(name) void *name ## _ptr, int name ## _dims, long long *name ## _shape, long long *name ## _strides
 #define ARRAY_ARG_VALUE(type, name) auto name = type(name ## _ptr, name ## _dims, name ## _shape, name ## _strides)
 
-extern "C" __declspec(dllexport) void raycast(
+extern "C" RAYCAST_EXPORT void raycast(
     ARRAY_ARG_SIGNATURE(rays),
     ARRAY_ARG_SIGNATURE(world),
     ARRAY_ARG_SIGNATURE(block_mask),
@@ -25,4 +37,170 @@ extern "C" __declspec(dllexport) void raycast(
 catch(std::exception &ex)
 {
     std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_build_acceleration(
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(occupancy),
+    ARRAY_ARG_SIGNATURE(cell_occupancy),
+    ARRAY_ARG_SIGNATURE(heightmap)
+) try
+{
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, occupancy);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, cell_occupancy);
+    ARRAY_ARG_VALUE(array2d<unsigned short>, heightmap);
+
+    noxitu::minecraft::build_acceleration(world, block_mask, occupancy, cell_occupancy, heightmap);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_accelerated(
+    ARRAY_ARG_SIGNATURE(rays),
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(occupancy),
+    ARRAY_ARG_SIGNATURE(cell_occupancy),
+    ARRAY_ARG_SIGNATURE(heightmap),
+    ARRAY_ARG_SIGNATURE(result),
+    ARRAY_ARG_SIGNATURE(result_depth)
+) try
+{
+    ARRAY_ARG_VALUE(array2d<double>, rays);
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, occupancy);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, cell_occupancy);
+    ARRAY_ARG_VALUE(array2d<unsigned short>, heightmap);
+    ARRAY_ARG_VALUE(array1d<int>, result);
+    ARRAY_ARG_VALUE(array1d<double>, result_depth);
+
+    noxitu::minecraft::raycast_accelerated(rays, world, block_mask, occupancy, cell_occupancy, heightmap, result, result_depth);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+// Variants for float32 rays and depths; the traversal itself is in double.
+extern "C" RAYCAST_EXPORT void raycast_f32(
+    ARRAY_ARG_SIGNATURE(rays),
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(result),
+    ARRAY_ARG_SIGNATURE(result_depth)
+) try
+{
+    ARRAY_ARG_VALUE(array2d<float>, rays);
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array1d<int>, result);
+    ARRAY_ARG_VALUE(array1d<float>, result_depth);
+
+    noxitu::minecraft::raycast(rays, world, block_mask, result, result_depth);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_accelerated_f32(
+    ARRAY_ARG_SIGNATURE(rays),
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(occupancy),
+    ARRAY_ARG_SIGNATURE(cell_occupancy),
+    ARRAY_ARG_SIGNATURE(heightmap),
+    ARRAY_ARG_SIGNATURE(result),
+    ARRAY_ARG_SIGNATURE(result_depth)
+) try
+{
+    ARRAY_ARG_VALUE(array2d<float>, rays);
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, occupancy);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, cell_occupancy);
+    ARRAY_ARG_VALUE(array2d<unsigned short>, heightmap);
+    ARRAY_ARG_VALUE(array1d<int>, result);
+    ARRAY_ARG_VALUE(array1d<float>, result_depth);
+
+    noxitu::minecraft::raycast_accelerated(rays, world, block_mask, occupancy, cell_occupancy, heightmap, result, result_depth);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_camera(
+    ARRAY_ARG_SIGNATURE(camera),
+    ARRAY_ARG_SIGNATURE(xs),
+    ARRAY_ARG_SIGNATURE(ys),
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(occupancy),
+    ARRAY_ARG_SIGNATURE(cell_occupancy),
+    ARRAY_ARG_SIGNATURE(heightmap),
+    ARRAY_ARG_SIGNATURE(result),
+    ARRAY_ARG_SIGNATURE(result_depth)
+) try
+{
+    ARRAY_ARG_VALUE(array1d<double>, camera);
+    ARRAY_ARG_VALUE(array1d<double>, xs);
+    ARRAY_ARG_VALUE(array1d<double>, ys);
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, occupancy);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, cell_occupancy);
+    ARRAY_ARG_VALUE(array2d<unsigned short>, heightmap);
+    ARRAY_ARG_VALUE(array1d<int>, result);
+    ARRAY_ARG_VALUE(array1d<double>, result_depth);
+
+    noxitu::minecraft::raycast_camera(camera, xs, ys, world, block_mask, occupancy, cell_occupancy, heightmap, result, result_depth);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_camera_f32(
+    ARRAY_ARG_SIGNATURE(camera),
+    ARRAY_ARG_SIGNATURE(xs),
+    ARRAY_ARG_SIGNATURE(ys),
+    ARRAY_ARG_SIGNATURE(world),
+    ARRAY_ARG_SIGNATURE(block_mask),
+    ARRAY_ARG_SIGNATURE(occupancy),
+    ARRAY_ARG_SIGNATURE(cell_occupancy),
+    ARRAY_ARG_SIGNATURE(heightmap),
+    ARRAY_ARG_SIGNATURE(result),
+    ARRAY_ARG_SIGNATURE(result_depth)
+) try
+{
+    ARRAY_ARG_VALUE(array1d<double>, camera);
+    ARRAY_ARG_VALUE(array1d<double>, xs);
+    ARRAY_ARG_VALUE(array1d<double>, ys);
+    ARRAY_ARG_VALUE(array3d<unsigned short>, world);
+    ARRAY_ARG_VALUE(array1d<unsigned char>, block_mask);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, occupancy);
+    ARRAY_ARG_VALUE(array3d<unsigned char>, cell_occupancy);
+    ARRAY_ARG_VALUE(array2d<unsigned short>, heightmap);
+    ARRAY_ARG_VALUE(array1d<int>, result);
+    ARRAY_ARG_VALUE(array1d<float>, result_depth);
+
+    noxitu::minecraft::raycast_camera(camera, xs, ys, world, block_mask, occupancy, cell_occupancy, heightmap, result, result_depth);
+}
+catch(std::exception &ex)
+{
+    std::cerr << "Failed with exception " << typeid(ex).name() << ": " << ex.what() << std::endl;
+}
+
+extern "C" RAYCAST_EXPORT void raycast_set_num_threads(int num_threads)
+{
+#ifdef _OPENMP
+    omp_set_num_threads(num_threads > 0 ? num_threads : omp_get_num_procs());
+#endif
 }
\ No newline at end of file
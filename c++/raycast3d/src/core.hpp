@@ -1,4 +1,5 @@
 #include <array>
+#include <stdexcept>
 
 template<typename Type, int DIMS>
 struct Array
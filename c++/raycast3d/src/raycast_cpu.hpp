@@ -1,11 +1,20 @@
-#include <iostream>
+#include <algorithm>
 #include <chrono>
+#include <cmath>
+#include <iostream>
+#include <stdexcept>
 
 namespace detail
 {
     const int OUTER_ITERATIONS = 256;
     const int INNER_ITERATIONS = 128;
 
+    // Bricks of 16x16x16 blocks and cells of 4x4x4 blocks of the acceleration structure.
+    const int BRICK_SHIFT = 4;
+    const int BRICK_SIZE = 1 << BRICK_SHIFT;
+    const int CELL_SHIFT = 2;
+    const int CELL_SIZE = 1 << CELL_SHIFT;
+
     enum state {
         STATE_NORMAL,
         STATE_HIT
@@ -24,14 +33,11 @@ namespace detail
         return INFINITY;
     }
 
-    template<typename Array>
-    inline int advance(int &x, int &y, int &z,
-                        const double x0, const double y0, const double z0,
-                        const double rx_inv, const double ry_inv, const double rz_inv,
-                        const int size_x, const int size_y, const int size_z,
-                        Array &world,
-                        double &depth,
-                        int &normal_idx
+    inline void step(int &x, int &y, int &z,
+                     const double x0, const double y0, const double z0,
+                     const double rx_inv, const double ry_inv, const double rz_inv,
+                     double &depth,
+                     int &normal_idx
     )
     {
         const double dx = next_intersection(x, x0, rx_inv);
@@ -56,6 +62,19 @@ namespace detail
             z += (rz_inv > 0 ? 1 : -1);
             normal_idx = (rz_inv > 0 ? 5 : 6);
         }
+    }
+
+    template<typename Array>
+    inline int advance(int &x, int &y, int &z,
+                        const double x0, const double y0, const double z0,
+                        const double rx_inv, const double ry_inv, const double rz_inv,
+                        const int size_x, const int size_y, const int size_z,
+                        Array &world,
+                        double &depth,
+                        int &normal_idx
+    )
+    {
+        step(x, y, z, x0, y0, z0, rx_inv, ry_inv, rz_inv, depth, normal_idx);
 
         const bool inside = (x >= 0 && y >= 0 && z >= 0 && x < size_x && y < size_y && z < size_z);
 
@@ -65,6 +84,74 @@ namespace detail
         return -1;
     }
 
+    // Whether step() crosses boundary t of axis before boundary t_other of
+    // axis_other; on ties it prefers z over y over x.
+    inline bool precedes(double t, int axis, double t_other, int axis_other)
+    {
+        return t < t_other || (t == t_other && axis > axis_other);
+    }
+
+    // Moves the cell to the first one outside of its brick of 2^shift blocks,
+    // the same one step() would reach, and returns the number of steps it took
+    // (0 when the brick cannot be skipped exactly, e.g. for NaN boundaries).
+    inline int skip_brick(const int shift,
+                          int &x, int &y, int &z,
+                          const double x0, const double y0, const double z0,
+                          const double rx_inv, const double ry_inv, const double rz_inv,
+                          double &depth,
+                          int &normal_idx
+    )
+    {
+        int c[3] = {x, y, z};
+        const double c0[3] = {x0, y0, z0};
+        const double inv[3] = {rx_inv, ry_inv, rz_inv};
+
+        int edge[3];
+        double edge_t[3];
+
+        for (int axis = 0; axis < 3; ++axis)
+        {
+            edge[axis] = inv[axis] > 0 ? (c[axis] | ((1 << shift) - 1)) : (c[axis] & ~((1 << shift) - 1));
+            edge_t[axis] = next_intersection(edge[axis], c0[axis], inv[axis]);
+
+            if (std::isnan(edge_t[axis]) || std::isnan(next_intersection(c[axis], c0[axis], inv[axis])))
+                return 0;
+        }
+
+        int exit_axis = 0;
+
+        for (int axis = 1; axis < 3; ++axis)
+            if (precedes(edge_t[axis], axis, edge_t[exit_axis], exit_axis))
+                exit_axis = axis;
+
+        int steps = 0;
+
+        // Crossings of other axes before leaving the brick stay inside of it.
+        for (int axis = 0; axis < 3; ++axis)
+        {
+            if (axis == exit_axis) continue;
+
+            while (precedes(next_intersection(c[axis], c0[axis], inv[axis]), axis, edge_t[exit_axis], exit_axis))
+            {
+                c[axis] += (inv[axis] > 0 ? 1 : -1);
+                ++steps;
+            }
+        }
+
+        const int direction = (inv[exit_axis] > 0 ? 1 : -1);
+        steps += direction * (edge[exit_axis] - c[exit_axis]) + 1;
+        c[exit_axis] = edge[exit_axis] + direction;
+
+        depth = edge_t[exit_axis];
+        normal_idx = 2*exit_axis + (direction > 0 ? 1 : 2);
+
+        x = c[0];
+        y = c[1];
+        z = c[2];
+
+        return steps;
+    }
+
     auto invoke_raycasting = [](
         int size_x, int size_y, int size_z,
         auto &rays,
@@ -82,9 +169,9 @@ namespace detail
             const double x0 = rays(i, 0);
             const double y0 = rays(i, 1);
             const double z0 = rays(i, 2);
-            const double rx_inv = 1/rays(i, 3);
-            const double ry_inv = 1/rays(i, 4);
-            const double rz_inv = 1/rays(i, 5);
+            const double rx_inv = 1.0/rays(i, 3);
+            const double ry_inv = 1.0/rays(i, 4);
+            const double rz_inv = 1.0/rays(i, 5);
 
             int x = static_cast<int>(x0);
             int y = static_cast<int>(y0);
@@ -126,8 +213,212 @@ namespace detail
     };
 }
 
+namespace detail
+{
+    struct Acceleration
+    {
+        int size_x, size_y, size_z;
+        int max_height;
+    };
+
+    // Visits the same cells as invoke_raycasting and counts them the same
+    // way, so that results do not change, only blocks of empty bricks or
+    // cells and blocks above the heightmap are not read.
+    template<typename World, typename Mask, typename Occupancy, typename Heightmap, typename Result, typename Depth>
+    inline void trace_accelerated(
+        const double x0, const double y0, const double z0,
+        const double rx_inv, const double ry_inv, const double rz_inv,
+        const Acceleration &acceleration,
+        World &world,
+        Mask &block_mask,
+        Occupancy &occupancy,
+        Occupancy &cell_occupancy,
+        Heightmap &heightmap,
+        Result &result,
+        Depth &result_depth
+    )
+    {
+        const int size_x = acceleration.size_x;
+        const int size_y = acceleration.size_y;
+        const int size_z = acceleration.size_z;
+        const int max_steps = OUTER_ITERATIONS * INNER_ITERATIONS;
+
+        int x = static_cast<int>(x0);
+        int y = static_cast<int>(y0);
+        int z = static_cast<int>(z0);
+
+        for (int steps = 0; steps < max_steps;)
+        {
+            if (rx_inv > 0 && x >= size_x) break;
+            if (ry_inv > 0 && y >= size_y) break;
+            if (rz_inv > 0 && z >= size_z) break;
+
+            if (rx_inv < 0 && x < 0) break;
+            if (ry_inv < 0 && y < 0) break;
+            if (rz_inv < 0 && z < 0) break;
+
+            // Rays not going down cannot hit anything above all columns.
+            if (ry_inv > 0 && y >= acceleration.max_height) break;
+
+            const bool inside = (x >= 0 && y >= 0 && z >= 0 && x < size_x && y < size_y && z < size_z);
+
+            double depth;
+            int normal_idx = 0;
+            int skipped = 0;
+
+            if (inside && occupancy(y >> BRICK_SHIFT, z >> BRICK_SHIFT, x >> BRICK_SHIFT) == 0)
+                skipped = skip_brick(BRICK_SHIFT, x, y, z, x0, y0, z0, rx_inv, ry_inv, rz_inv, depth, normal_idx);
+            else if (inside && cell_occupancy(y >> CELL_SHIFT, z >> CELL_SHIFT, x >> CELL_SHIFT) == 0)
+                skipped = skip_brick(CELL_SHIFT, x, y, z, x0, y0, z0, rx_inv, ry_inv, rz_inv, depth, normal_idx);
+
+            if (skipped == 0)
+            {
+                step(x, y, z, x0, y0, z0, rx_inv, ry_inv, rz_inv, depth, normal_idx);
+                skipped = 1;
+            }
+
+            steps += skipped;
+
+            if (steps > max_steps) break;
+
+            if (x < 0 || y < 0 || z < 0 || x >= size_x || y >= size_y || z >= size_z) continue;
+            if (y >= heightmap(z, x)) continue;
+
+            const int block_id = world(y, z, x);
+
+            if (block_mask(block_id) != 0)
+            {
+                result = 
+                    block_id & 0xffff |
+                    (normal_idx << 16) & 0x70000;
+
+                result_depth = depth;
+                break;
+            }
+        }
+    }
+
+    template<typename World, typename Heightmap>
+    Acceleration create_acceleration(World &world, Heightmap &heightmap)
+    {
+        Acceleration acceleration = {world.shape[2], world.shape[0], world.shape[1], 0};
+
+        if (heightmap.shape[0] != acceleration.size_z || heightmap.shape[1] != acceleration.size_x)
+            throw std::logic_error("raycast_accelerated: incorrect heightmap shape");
+
+        for (int z = 0; z < acceleration.size_z; ++z)
+            for (int x = 0; x < acceleration.size_x; ++x)
+                acceleration.max_height = std::max(acceleration.max_height, static_cast<int>(heightmap(z, x)));
+
+        return acceleration;
+    }
+}
+
 namespace noxitu { namespace minecraft
 {
+    auto build_acceleration = [](auto &world, auto &block_mask, auto &occupancy, auto &cell_occupancy, auto &heightmap)
+    {
+        using namespace detail;
+
+        const int size_x = world.shape[2];
+        const int size_y = world.shape[0];
+        const int size_z = world.shape[1];
+
+        if (occupancy.shape[0] != (size_y + BRICK_SIZE - 1) / BRICK_SIZE ||
+            occupancy.shape[1] != (size_z + BRICK_SIZE - 1) / BRICK_SIZE ||
+            occupancy.shape[2] != (size_x + BRICK_SIZE - 1) / BRICK_SIZE)
+            throw std::logic_error("build_acceleration: incorrect occupancy shape");
+
+        if (cell_occupancy.shape[0] != (size_y + CELL_SIZE - 1) / CELL_SIZE ||
+            cell_occupancy.shape[1] != (size_z + CELL_SIZE - 1) / CELL_SIZE ||
+            cell_occupancy.shape[2] != (size_x + CELL_SIZE - 1) / CELL_SIZE)
+            throw std::logic_error("build_acceleration: incorrect cell_occupancy shape");
+
+        if (heightmap.shape[0] != size_z || heightmap.shape[1] != size_x)
+            throw std::logic_error("build_acceleration: incorrect heightmap shape");
+
+        // Every thread fills its own rows of bricks, heights grow with y.
+        #pragma omp parallel for schedule(dynamic, 1)
+        for (int brick_z = 0; brick_z < occupancy.shape[1]; ++brick_z)
+        {
+            const int z_end = std::min((brick_z + 1) * BRICK_SIZE, size_z);
+
+            for (int y = 0; y < size_y; ++y)
+                for (int z = brick_z * BRICK_SIZE; z < z_end; ++z)
+                    for (int x = 0; x < size_x; ++x)
+                        if (block_mask(world(y, z, x)) != 0)
+                        {
+                            occupancy(y >> BRICK_SHIFT, brick_z, x >> BRICK_SHIFT) = 1;
+                            cell_occupancy(y >> CELL_SHIFT, z >> CELL_SHIFT, x >> CELL_SHIFT) = 1;
+                            heightmap(z, x) = y + 1;
+                        }
+        }
+    };
+
+    auto raycast_accelerated = [](auto &rays, auto &world, auto &block_mask, auto &occupancy, auto &cell_occupancy, auto &heightmap, auto &result, auto &result_depth)
+    {
+        using namespace detail;
+
+        const int n_rays = rays.shape[0];
+
+        if (rays.shape[1] != 6)
+            throw std::logic_error("raycast_accelerated: incorrect rays shape");
+
+        if (n_rays != result.shape[0] || n_rays != result_depth.shape[0])
+            throw std::logic_error("raycast_accelerated: incorrect result shape");
+
+        const Acceleration acceleration = create_acceleration(world, heightmap);
+
+        #pragma omp parallel for schedule(dynamic, 1024)
+        for (int i = 0; i < n_rays; ++i)
+        {
+            trace_accelerated(
+                rays(i, 0), rays(i, 1), rays(i, 2),
+                1.0/rays(i, 3), 1.0/rays(i, 4), 1.0/rays(i, 5),
+                acceleration, world, block_mask, occupancy, cell_occupancy, heightmap,
+                result(i), result_depth(i)
+            );
+        }
+    };
+
+    // Generates primary rays from the camera origin (camera[0:3]) and the
+    // inverse projection (camera[3:12], row major) for pixels at (xs, ys) of
+    // the image plane, with the arithmetic of rays.CameraRays.
+    auto raycast_camera = [](auto &camera, auto &xs, auto &ys, auto &world, auto &block_mask, auto &occupancy, auto &cell_occupancy, auto &heightmap, auto &result, auto &result_depth)
+    {
+        using namespace detail;
+
+        const int width = xs.shape[0];
+        const int n_rays = width * ys.shape[0];
+
+        if (camera.shape[0] != 12)
+            throw std::logic_error("raycast_camera: incorrect camera shape");
+
+        if (n_rays != result.shape[0] || n_rays != result_depth.shape[0])
+            throw std::logic_error("raycast_camera: incorrect result shape");
+
+        const Acceleration acceleration = create_acceleration(world, heightmap);
+
+        #pragma omp parallel for schedule(dynamic, 1024)
+        for (int i = 0; i < n_rays; ++i)
+        {
+            const double v[2] = {xs(i % width), ys(i / width)};
+            double d[3];
+
+            for (int r = 0; r < 3; ++r)
+                d[r] = camera(3 + 3*r) * v[0] + camera(4 + 3*r) * v[1] + camera(5 + 3*r);
+
+            const double norm = std::sqrt(d[0]*d[0] + d[1]*d[1] + d[2]*d[2]);
+
+            trace_accelerated(
+                camera(0), camera(1), camera(2),
+                1.0/(d[0]/norm), 1.0/(d[1]/norm), 1.0/(d[2]/norm),
+                acceleration, world, block_mask, occupancy, cell_occupancy, heightmap,
+                result(i), result_depth(i)
+            );
+        }
+    };
+
     auto raycast = [](auto &rays, auto &world, auto &block_mask, auto &result, auto &result_depth)
     {
         using namespace detail;
@@ -0,0 +1,89 @@
+import functools
+
+import numpy as np
+
+from noxitu.minecraft.map.global_palette import BLOCKS
+
+
+def _build_index():
+    index = {}
+
+    for name, block in BLOCKS.items():
+        name = name.encode()
+
+        for state in block['states']:
+            properties = state.get('properties', {})
+            properties = frozenset((key.encode(), value.encode()) for key, value in properties.items())
+            index[name, properties] = state['id']
+
+            if state.get('default'):
+                index[name, None] = state['id']
+
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def load_index():
+    # Built from blocks.json already parsed by global_palette;
+    # resolve_palette adds entries it matched.
+    return _build_index()
+
+
+def palette_key(entry):
+    properties = entry.get(b'Properties')
+
+    if properties is None:
+        return entry[b'Name'], None
+
+    return entry[b'Name'], frozenset(properties.items())
+
+
+def _find_state(key):
+    name, properties = key
+    block = BLOCKS.get(name.decode())
+
+    if block is None or properties is None:
+        return None
+
+    properties = {key.decode(): value.decode() for key, value in properties}
+    states = [
+        state['id']
+        for state in block['states']
+        if all(properties.get(key) == value for key, value in state.get('properties', {}).items())
+    ]
+
+    return states[0] if len(states) == 1 else None
+
+
+def resolve_palette(palette, missing):
+    index = load_index()
+    result = np.zeros(len(palette), dtype=np.uint16)
+
+    for i, entry in enumerate(palette):
+        key = palette_key(entry)
+        state_id = index.get(key)
+
+        if state_id is None:
+            # Entries with extra properties still match a single state,
+            # remember them so that the next lookup is a dictionary hit.
+            state_id = _find_state(key)
+
+            if state_id is None:
+                missing.add(key)
+                continue
+
+            index[key] = state_id
+
+        result[i] = state_id
+
+    return result
+
+
+def describe(key):
+    name, properties = key
+
+    if properties is None:
+        return name.decode()
+
+    properties = ','.join(f'{key.decode()}={value.decode()}' for key, value in sorted(properties))
+    return f'{name.decode()}[{properties}]'
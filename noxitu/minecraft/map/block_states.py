@@ -0,0 +1,86 @@
+import numpy as np
+
+
+SECTION_SHAPE = (16, 16, 16)
+SECTION_SIZE = 16 * 16 * 16
+
+
+def unpack_long(value, bits):
+    if value < 0:
+        value += 2 ** 64
+
+    mask = 2**bits - 1
+    for i in range(0, 64-bits+1, bits):
+        yield (value >> i) & mask
+
+
+def bits_per_block(palette_length):
+    bits = 4
+
+    while 2 ** bits < palette_length:
+        bits += 1
+
+    return bits
+
+
+def packed_length(bits, spanning):
+    if spanning:
+        return (SECTION_SIZE * bits + 63) // 64
+
+    values_per_long = 64 // bits
+    return (SECTION_SIZE + values_per_long - 1) // values_per_long
+
+
+def as_uint64(packed):
+    if isinstance(packed, np.ndarray):
+        if packed.dtype.kind == 'i':
+            packed = packed.view(packed.dtype.str.replace('i', 'u'))
+        return packed.astype(np.uint64, copy=False)
+
+    return np.array([value & 0xffff_ffff_ffff_ffff for value in packed], dtype=np.uint64)
+
+
+def _unpack_compact(packed, bits):
+    values_per_long = 64 // bits
+    shifts = np.arange(values_per_long, dtype=np.uint64) * np.uint64(bits)
+    mask = np.uint64(2**bits - 1)
+
+    values = (packed[:, np.newaxis] >> shifts) & mask
+    return values.reshape(-1)[:SECTION_SIZE]
+
+
+def _unpack_spanning(packed, bits):
+    positions = np.arange(SECTION_SIZE, dtype=np.uint64) * np.uint64(bits)
+    words = (positions >> np.uint64(6)).astype(np.intp)
+    shifts = positions & np.uint64(63)
+    mask = np.uint64(2**bits - 1)
+
+    padded = np.append(packed, np.uint64(0))
+
+    low = padded[words] >> shifts
+    # Two shifts instead of one, so that a zero offset never shifts by 64.
+    high = (padded[words+1] << (np.uint64(63) - shifts)) << np.uint64(1)
+
+    return (low | high) & mask
+
+
+def unpack_block_states(packed, bits, palette=None, *, spanning=None):
+    packed = as_uint64(packed)
+
+    if spanning is None:
+        spanning = (64 % bits != 0 and len(packed) == packed_length(bits, True))
+
+    if len(packed) < packed_length(bits, spanning):
+        raise ValueError(f'Expected {packed_length(bits, spanning)} longs for {bits} bits per block, got {len(packed)}.')
+
+    if spanning:
+        values = _unpack_spanning(packed, bits)
+    else:
+        values = _unpack_compact(packed, bits)
+
+    if palette is None:
+        result = values.astype(np.uint16)
+    else:
+        result = np.asarray(palette, dtype=np.uint16)[values.astype(np.intp)]
+
+    return result.reshape(SECTION_SHAPE)
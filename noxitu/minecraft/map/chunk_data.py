@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 
@@ -5,18 +6,14 @@ import numpy as np
 from tqdm import tqdm
 
 import noxitu.minecraft.protocol.packet
+from noxitu.minecraft.map.block_states import unpack_block_states
+from noxitu.minecraft.map.chunk_store import FORMATS, open_store, write_index
 from noxitu.minecraft.map.global_palette import GLOBAL_PALETTE, MATERIALS
 
 
 UNKNOWN = set()
 
 
-def unpack_long(value, bits):
-    mask = 2**bits - 1
-    for i in range(0, 64-bits+1, bits):
-        yield (value >> i) & mask
-
-
 def parse_chunk(x, z, section_mask, data):
     global UNKNOWN
     data = noxitu.minecraft.protocol.packet.Packet(data)
@@ -39,17 +36,14 @@ def parse_chunk(x, z, section_mask, data):
             if UNKNOWN is not None:
                 UNKNOWN |= set(map(lambda i: GLOBAL_PALETTE[i], palette)) - set(MATERIALS)
         else:
-            palette = np.arange(2 ** bits_per_block)
+            palette = None
 
         section_data_length = data.varint()
 
-        section_data = [data.ulong() for _ in range(section_data_length)]
+        section_data = data.ulong_array(section_data_length)
 
-        def get_result():
-            result = [val for packed in section_data for val in unpack_long(packed, bits_per_block)][:16*16*16]
-            result = palette[result]
-            result = np.array(result).reshape(16, 16, 16).astype(int)
-            return result
+        def get_result(section_data=section_data, bits_per_block=bits_per_block, palette=palette):
+            return unpack_block_states(section_data, bits_per_block, palette)
 
         yield y, get_result
 
@@ -57,21 +51,29 @@ def parse_chunk(x, z, section_mask, data):
 
 
 if __name__ == '__main__':
-    os.makedirs('data/chunks', exist_ok=True)
+    parser = argparse.ArgumentParser(description='Converts chunks captured by proxy_server into data/chunks.')
+    parser.add_argument('--output', default='data/chunks')
+    parser.add_argument('--format', choices=sorted(FORMATS), default=None,
+                        help='format of a new output store (default: npy, existing stores keep their format)')
+    args = parser.parse_args()
+
+    with open_store(args.output, 'a', args.format) as store:
+        for chunk in tqdm(os.listdir('data/chunks_raw')):
+            match = re.match(R'^(-?[0-9]+)-(-?[0-9]+)-([0-9]+)\.bin$', chunk)
+            x, z, section_mask = [int(match.group(i)) for i in (1, 2, 3)]
 
-    for chunk in tqdm(os.listdir('data/chunks_raw')):
-        match = re.match(R'^(-?[0-9]+)-(-?[0-9]+)-([0-9]+)\.bin$', chunk)
-        x, z, section_mask = [int(match.group(i)) for i in (1, 2, 3)]
+            with open(f'data/chunks_raw/{x}-{z}-{section_mask}.bin', 'rb') as fd:
+                data = fd.read()
 
-        with open(f'data/chunks_raw/{x}-{z}-{section_mask}.bin', 'rb') as fd:
-            data = fd.read()
+            chunk = np.zeros((16, 16, 16, 16), dtype=np.uint16)
 
-        chunk = np.zeros((16, 16, 16, 16), dtype=int)
+            for y, section in parse_chunk(x, z, section_mask, data):
+                chunk[y] = section()
 
-        for y, section in parse_chunk(x, z, section_mask, data):
-            chunk[y] = section()
+            store.write_chunk(x, z, chunk.reshape(256, 16, 16))
 
-        np.save(Rf'data/chunks/{x}_{z}_chunk.npy', chunk.reshape(256, 16, 16))
+        store.flush()
+        write_index(store)
 
     if UNKNOWN:
         print('Unknown items:')
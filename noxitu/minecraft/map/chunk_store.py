@@ -0,0 +1,338 @@
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+
+
+CHUNK_SHAPE = (256, 16, 16)
+SECTIONS = 16
+SECTION_SIZE = 16 * 16 * 16
+SHARD_SIZE = 32
+
+SHARD_MAGIC = b'NXCHUNKS'
+SHARD_VERSION = 1
+SHARD_HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('shard_size', '<u4')])
+SECTION_INDEX_DTYPE = np.dtype([('offset', '<u4'), ('palette_size', '<u2'), ('index_itemsize', 'u1'), ('_pad', 'u1')])
+
+_CHUNKS_OFFSET = SHARD_HEADER_DTYPE.itemsize
+_SECTIONS_OFFSET = _CHUNKS_OFFSET + SHARD_SIZE * SHARD_SIZE
+_DATA_OFFSET = _SECTIONS_OFFSET + SHARD_SIZE * SHARD_SIZE * SECTIONS * SECTION_INDEX_DTYPE.itemsize
+
+INDEX_NAME = 'index.json'
+
+NPY_PATTERN = re.compile(R'^(-?[0-9]+)_(-?[0-9]+)_chunk\.npy$')
+SHARD_PATTERN = re.compile(R'^r\.(-?[0-9]+)\.(-?[0-9]+)\.shard$')
+
+
+def encode_section(section):
+    section = section.reshape(SECTION_SIZE)
+    palette, indices = np.unique(section, return_inverse=True)
+
+    if len(palette) == 1:
+        if palette[0] == 0:
+            return 0, 0, b''
+        return 1, 0, palette.astype('<u2').tobytes()
+
+    itemsize = 1 if len(palette) <= 256 else 2
+    indices = indices.astype('<u1' if itemsize == 1 else '<u2')
+
+    return len(palette), itemsize, palette.astype('<u2').tobytes() + indices.tobytes()
+
+
+def decode_sections(data, index, out):
+    for y, (offset, palette_size, itemsize, _) in enumerate(index.tolist()):
+        if palette_size == 0:
+            continue
+
+        palette = np.frombuffer(data, dtype='<u2', count=palette_size, offset=offset)
+
+        if itemsize == 0:
+            out[y] = palette[0]
+        else:
+            indices = np.frombuffer(data, dtype='<u1' if itemsize == 1 else '<u2', count=SECTION_SIZE, offset=offset+2*palette_size)
+            out[y] = palette[indices]
+
+
+def _section_nbytes(palette_size, itemsize):
+    return 2*palette_size + itemsize*SECTION_SIZE
+
+
+class NpyChunkDirectory:
+    format = 'npy'
+
+    def __init__(self, path, mode='r'):
+        self.path = str(path)
+
+        if mode != 'r':
+            os.makedirs(self.path, exist_ok=True)
+
+    def _chunk_path(self, x, z):
+        return os.path.join(self.path, f'{x}_{z}_chunk.npy')
+
+    def chunks(self):
+        matches = (NPY_PATTERN.match(name) for name in os.listdir(self.path))
+        return [(int(match.group(1)), int(match.group(2))) for match in matches if match is not None]
+
+    def __contains__(self, xz):
+        return os.path.exists(self._chunk_path(*xz))
+
+    def read_chunk(self, x, z):
+        return np.load(self._chunk_path(x, z), mmap_mode='r')
+
+    def write_chunk(self, x, z, chunk):
+        remove_index(self)
+        np.save(self._chunk_path(x, z), np.asarray(chunk, dtype=np.uint16).reshape(CHUNK_SHAPE))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class _Shard:
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+
+        header = np.frombuffer(self.data, dtype=SHARD_HEADER_DTYPE, count=1)[0]
+
+        if header['magic'] != SHARD_MAGIC or header['version'] != SHARD_VERSION or header['shard_size'] != SHARD_SIZE:
+            raise ValueError(f'{path} is not a version {SHARD_VERSION} chunk shard.')
+
+        # Both indices are [local_z, local_x], like the location table of region files.
+        self.present = np.frombuffer(self.data, dtype=np.uint8, count=SHARD_SIZE*SHARD_SIZE, offset=_CHUNKS_OFFSET)
+        self.present = self.present.reshape(SHARD_SIZE, SHARD_SIZE)
+        self.sections = np.frombuffer(self.data, dtype=SECTION_INDEX_DTYPE, count=SHARD_SIZE*SHARD_SIZE*SECTIONS, offset=_SECTIONS_OFFSET)
+        self.sections = self.sections.reshape(SHARD_SIZE, SHARD_SIZE, SECTIONS)
+
+    def raw_sections(self, local_x, local_z):
+        for offset, palette_size, itemsize, _ in self.sections[local_z, local_x].tolist():
+            if palette_size == 0:
+                yield 0, 0, b''
+            else:
+                yield palette_size, itemsize, self.data[offset:offset+_section_nbytes(palette_size, itemsize)].tobytes()
+
+
+def _write_shard(path, chunks):
+    present = np.zeros((SHARD_SIZE, SHARD_SIZE), dtype=np.uint8)
+    sections = np.zeros((SHARD_SIZE, SHARD_SIZE, SECTIONS), dtype=SECTION_INDEX_DTYPE)
+    blobs = []
+    offset = _DATA_OFFSET
+
+    for (local_x, local_z), chunk_sections in sorted(chunks.items()):
+        present[local_z, local_x] = 1
+
+        for y, (palette_size, itemsize, blob) in enumerate(chunk_sections):
+            if palette_size == 0:
+                continue
+
+            sections[local_z, local_x, y] = (offset, palette_size, itemsize, 0)
+            blobs.append(blob)
+            offset += len(blob)
+
+    header = np.array([(SHARD_MAGIC, SHARD_VERSION, SHARD_SIZE)], dtype=SHARD_HEADER_DTYPE)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as fd:
+        fd.write(header.tobytes())
+        fd.write(present.tobytes())
+        fd.write(sections.tobytes())
+
+        for blob in blobs:
+            fd.write(blob)
+
+    os.replace(temporary_path, path)
+
+
+class ShardedChunkStore:
+    format = 'sharded'
+
+    def __init__(self, path, mode='r'):
+        self.path = str(path)
+        self.mode = mode
+        self._shards = {}
+        self._pending = {}
+
+        if mode != 'r' and not os.path.exists(os.path.join(self.path, 'store.json')):
+            os.makedirs(self.path, exist_ok=True)
+            _write_json(os.path.join(self.path, 'store.json'), {'format': self.format, 'shard_size': SHARD_SIZE})
+
+    @staticmethod
+    def _shard_key(x, z):
+        return (x // SHARD_SIZE, z // SHARD_SIZE), (x % SHARD_SIZE, z % SHARD_SIZE)
+
+    def _shard_path(self, shard_x, shard_z):
+        return os.path.join(self.path, f'r.{shard_x}.{shard_z}.shard')
+
+    def _shard(self, shard_key):
+        if shard_key not in self._shards:
+            path = self._shard_path(*shard_key)
+            self._shards[shard_key] = _Shard(path) if os.path.exists(path) else None
+
+        return self._shards[shard_key]
+
+    def shards(self):
+        matches = (SHARD_PATTERN.match(name) for name in os.listdir(self.path))
+        return [(int(match.group(1)), int(match.group(2))) for match in matches if match is not None]
+
+    def chunks(self):
+        ret = []
+
+        for shard_key in self.shards():
+            shard_x, shard_z = shard_key
+            local_z, local_x = np.nonzero(self._shard(shard_key).present)
+            ret.extend(zip((SHARD_SIZE*shard_x + local_x).tolist(), (SHARD_SIZE*shard_z + local_z).tolist()))
+
+        return ret
+
+    def __contains__(self, xz):
+        shard_key, (local_x, local_z) = self._shard_key(*xz)
+
+        if (local_x, local_z) in self._pending.get(shard_key, ()):
+            return True
+
+        shard = self._shard(shard_key)
+        return shard is not None and shard.present[local_z, local_x] != 0
+
+    def read_chunk(self, x, z):
+        shard_key, (local_x, local_z) = self._shard_key(x, z)
+        shard = self._shard(shard_key)
+
+        if shard is None or not shard.present[local_z, local_x]:
+            raise KeyError((x, z))
+
+        chunk = np.zeros((SECTIONS, SECTION_SIZE), dtype=np.uint16)
+        decode_sections(shard.data, shard.sections[local_z, local_x], chunk)
+
+        return chunk.reshape(CHUNK_SHAPE)
+
+    def write_chunk(self, x, z, chunk):
+        shard_key, local_xz = self._shard_key(x, z)
+        sections = np.asarray(chunk, dtype=np.uint16).reshape(SECTIONS, SECTION_SIZE)
+
+        self._pending.setdefault(shard_key, {})[local_xz] = [encode_section(section) for section in sections]
+
+    def flush(self):
+        if self._pending:
+            remove_index(self)
+
+        for shard_key, chunks in self._pending.items():
+            shard = self._shard(shard_key)
+
+            if shard is not None:
+                for local_z, local_x in zip(*np.nonzero(shard.present)):
+                    chunks.setdefault((int(local_x), int(local_z)), list(shard.raw_sections(local_x, local_z)))
+
+            # Drops the memory map of the old shard before it is replaced.
+            self._shards.pop(shard_key, None)
+            shard = None
+
+            _write_shard(self._shard_path(*shard_key), chunks)
+
+        self._pending = {}
+
+    def close(self):
+        if self.mode != 'r':
+            self.flush()
+
+        self._shards = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+FORMATS = {
+    NpyChunkDirectory.format: NpyChunkDirectory,
+    ShardedChunkStore.format: ShardedChunkStore,
+}
+
+
+def _write_json(path, value):
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'w') as fd:
+        json.dump(value, fd)
+
+    os.replace(temporary_path, path)
+
+
+def write_index(store):
+    _write_json(os.path.join(store.path, INDEX_NAME), {'chunks': sorted(store.chunks())})
+
+
+def remove_index(store):
+    # Every write makes the index stale; the converters write it again
+    # once they are done.
+    try:
+        os.remove(os.path.join(store.path, INDEX_NAME))
+    except FileNotFoundError:
+        pass
+
+
+def read_index(store):
+    # Written by the converters; listing a directory of many .npy files
+    # is slow on network drives, so it is only a fallback.
+    try:
+        with open(os.path.join(store.path, INDEX_NAME)) as fd:
+            chunks = json.load(fd)['chunks']
+    except FileNotFoundError:
+        chunks = store.chunks()
+
+    return np.array(chunks, dtype=np.int64).reshape(-1, 2)
+
+
+def detect_format(path):
+    try:
+        with open(os.path.join(path, 'store.json')) as fd:
+            return json.load(fd)['format']
+    except FileNotFoundError:
+        return None
+
+
+def open_store(path, mode='r', format=None):
+    format = detect_format(path) or format or NpyChunkDirectory.format
+    return FORMATS[format](path, mode)
+
+
+def migrate(source, destination, tqdm=lambda x: x):
+    with open_store(source) as source, open_store(destination, 'a', format=ShardedChunkStore.format) as destination:
+        chunks = sorted(source.chunks(), key=lambda xz: ShardedChunkStore._shard_key(*xz))
+        shard_key = None
+
+        for x, z in tqdm(chunks):
+            # Chunks are sorted by shard, so at most one shard is kept in memory.
+            if ShardedChunkStore._shard_key(x, z)[0] != shard_key:
+                destination.flush()
+                shard_key = ShardedChunkStore._shard_key(x, z)[0]
+
+            if (x, z) not in destination:
+                destination.write_chunk(x, z, source.read_chunk(x, z))
+
+        destination.flush()
+        write_index(destination)
+
+
+def main():
+    from tqdm import tqdm
+
+    parser = argparse.ArgumentParser(description='Migrates a data/chunks directory of .npy files into a sharded chunk store.')
+    parser.add_argument('source', help='directory with {x}_{z}_chunk.npy files')
+    parser.add_argument('destination', help='directory of the sharded store')
+    args = parser.parse_args()
+
+    migrate(args.source, args.destination, tqdm=tqdm)
+
+
+if __name__ == '__main__':
+    main()
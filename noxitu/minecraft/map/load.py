@@ -1,37 +1,35 @@
-import os
+import collections
+import concurrent.futures
+import threading
 
 import numpy as np
 
+from noxitu.minecraft.map.chunk_store import open_store, read_index
+
 
 def _ch(idx):
     return slice(16*idx, 16*idx+16)
 
 
-def load(path, tqdm=lambda x: x, x_range=None, y_range=None, z_range=None):
-    chunks = []
-    chunks_paths = []
+def _select_chunks(store, x_range, z_range):
+    chunks = read_index(store)
+    mask = np.ones(len(chunks), dtype=bool)
 
     if x_range is not None:
-        use_x = lambda c: x_range.start <= c < x_range.stop
-    else:
-        use_x = lambda _: True
-    
+        mask &= (x_range.start <= chunks[:, 0]) & (chunks[:, 0] < x_range.stop)
+
     if z_range is not None:
-        use_z = lambda c: z_range.start <= c < z_range.stop
-    else:
-        use_z = lambda _: True
+        mask &= (z_range.start <= chunks[:, 1]) & (chunks[:, 1] < z_range.stop)
 
-    if y_range is None:
-        y_range = slice(0, 256)
+    return chunks[mask]
 
-    for chunk in os.listdir(path):
-        x, z = map(int, chunk.split('_')[:2])
 
-        if use_x(x) and use_z(z):
-            chunks.append((x, z))
-            chunks_paths.append(chunk)
+def load(path, tqdm=lambda x: x, x_range=None, y_range=None, z_range=None, workers=16):
+    if y_range is None:
+        y_range = slice(0, 256)
 
-    chunks = np.array(chunks)
+    store = open_store(path)
+    chunks = _select_chunks(store, x_range, z_range)
 
     min_x = np.amin(chunks[:, 0])
     min_z = np.amin(chunks[:, 1])
@@ -46,9 +44,233 @@ def load(path, tqdm=lambda x: x, x_range=None, y_range=None, z_range=None):
     print(f'Allocating {1.0*size_y*16*size_z*16*size_x*2/1024/1024/1024:.01f} GB...')
     world = np.zeros((size_y, 16*size_z, 16*size_x), dtype=np.uint16)
 
-    for chunk in tqdm(chunks_paths):
-        x, z = map(int, chunk.split('_')[:2])
+    def load_chunk(x, z):
+        world[:, _ch(z-min_z), _ch(x-min_x)] = store.read_chunk(x, z)[y_range]
+
+    # Reading is dominated by I/O latency and decompression in NumPy, so
+    # threads overlap well; every chunk is written into its own slice.
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        futures = [executor.submit(load_chunk, x, z) for x, z in chunks.tolist()]
 
-        world[:, _ch(z-min_z), _ch(x-min_x)] = np.load(os.path.join(path, chunk))[y_range]
+        for future in tqdm(futures):
+            future.result()
 
     return np.array([min_y, 16*min_z, 16*min_x]), world
+
+
+class LazyWorld:
+    def __init__(self, store, chunks, y_range, cache_bytes):
+        self._store = store
+        self._y_range = y_range
+        self._min_x = int(np.amin(chunks[:, 0]))
+        self._min_z = int(np.amin(chunks[:, 1]))
+        self._present = set(map(tuple, chunks.tolist()))
+
+        size_x = int(np.amax(chunks[:, 0])) - self._min_x + 1
+        size_y = y_range.stop - y_range.start
+        size_z = int(np.amax(chunks[:, 1])) - self._min_z + 1
+
+        self.shape = (size_y, 16*size_z, 16*size_x)
+        self.dtype = np.dtype(np.uint16)
+        self.ndim = 3
+
+        self.cache_bytes = cache_bytes
+        self._cache = collections.OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._empty_chunk = np.zeros((size_y, 16, 16), dtype=np.uint16)
+        self._empty_chunk.flags.writeable = False
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    @property
+    def offset(self):
+        return np.array([self._y_range.start, 16*self._min_z, 16*self._min_x])
+
+    def chunks(self):
+        return sorted(self._present)
+
+    def chunk(self, chunk_z, chunk_x):
+        key = chunk_z, chunk_x
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        x, z = self._min_x + chunk_x, self._min_z + chunk_z
+
+        if (x, z) not in self._present:
+            return self._empty_chunk
+
+        chunk = np.array(self._store.read_chunk(x, z)[self._y_range])
+        chunk.flags.writeable = False
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = chunk
+                self._cached_bytes += chunk.nbytes
+
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted.nbytes
+
+        return chunk
+
+    def _normalize_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        key = tuple(k if isinstance(k, slice) or k is Ellipsis else np.asarray(k) for k in key)
+        # Boolean masks index as many axes as they have dimensions.
+        used = sum(k.ndim if isinstance(k, np.ndarray) and k.dtype == bool else 1 for k in key if k is not Ellipsis)
+
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            key = key[:i] + (slice(None),) * (3 - used) + key[i+1:]
+        else:
+            key = key + (slice(None),) * (3 - used)
+
+        normalized = []
+
+        for k in key:
+            if isinstance(k, np.ndarray) and k.dtype == bool:
+                axes = self.shape[len(normalized):len(normalized) + k.ndim]
+
+                if k.shape != axes:
+                    raise IndexError(f'boolean index of shape {k.shape} does not match indexed axes of shape {axes}')
+
+                normalized.extend(np.nonzero(k))
+            else:
+                normalized.append(k)
+
+        if len(normalized) != 3:
+            raise IndexError(f'Too many indices for LazyWorld: {key}.')
+
+        return tuple(normalized)
+
+    def __getitem__(self, key):
+        key = self._normalize_key(key)
+
+        if all(isinstance(k, slice) or np.ndim(k) == 0 for k in key):
+            return self._get_box(key)
+
+        # Like NumPy, broadcast index arrays replace their axes when adjacent
+        # and come first otherwise; sliced axes keep their order.
+        advanced = [axis for axis, k in enumerate(key) if not isinstance(k, slice)]
+        sliced = [axis for axis, k in enumerate(key) if isinstance(k, slice)]
+        arrays = np.broadcast_arrays(*[key[axis] for axis in advanced])
+        shape = arrays[0].shape
+
+        position = advanced[0] if advanced[-1] - advanced[0] == len(advanced) - 1 else 0
+        ndim = len(sliced) + len(shape)
+        coords = [None] * 3
+
+        for axis, array in zip(advanced, arrays):
+            coords[axis] = array.reshape((1,) * position + shape + (1,) * (len(sliced) - position))
+
+        for i, axis in enumerate(sliced):
+            dim = i if i < position else i + len(shape)
+            coords[axis] = np.arange(*key[axis].indices(self.shape[axis])).reshape([-1 if d == dim else 1 for d in range(ndim)])
+
+        return self._get_points(*np.broadcast_arrays(*coords))
+
+    def _get_box(self, key):
+        # Only selected indices are allocated, also for strided slices.
+        indices = []
+        local_key = []
+
+        for axis, (k, size) in enumerate(zip(key, self.shape)):
+            if isinstance(k, slice):
+                indices.append(np.arange(*k.indices(size)))
+                local_key.append(slice(None))
+            else:
+                k = int(k)
+                index = k + size if k < 0 else k
+
+                if not 0 <= index < size:
+                    raise IndexError(f'index {k} is out of bounds for axis {axis} with size {size}')
+
+                indices.append(np.array([index]))
+                local_key.append(0)
+
+        ys, zs, xs = indices
+        out = np.zeros((len(ys), len(zs), len(xs)), dtype=self.dtype)
+
+        for chunk_z in np.unique(zs // 16).tolist():
+            z_positions = np.nonzero(zs // 16 == chunk_z)[0]
+
+            for chunk_x in np.unique(xs // 16).tolist():
+                x_positions = np.nonzero(xs // 16 == chunk_x)[0]
+
+                chunk = self.chunk(chunk_z, chunk_x)
+                out[:, z_positions[:, np.newaxis], x_positions] = chunk[np.ix_(ys, zs[z_positions] % 16, xs[x_positions] % 16)]
+
+        return out[tuple(local_key)]
+
+    def _get_points(self, ys, zs, xs):
+        shape = ys.shape
+        coords = []
+
+        for axis, (c, size) in enumerate(zip((ys, zs, xs), self.shape)):
+            c = np.where(c < 0, c + size, c).astype(np.intp)
+
+            if c.size and (c.min() < 0 or c.max() >= size):
+                raise IndexError(f'index out of bounds for axis {axis} with size {size}')
+
+            coords.append(c.ravel())
+
+        ys, zs, xs = coords
+        out = np.zeros(ys.shape, dtype=self.dtype)
+
+        chunk_ids = (zs // 16) * (self.shape[2] // 16) + xs // 16
+        order = np.argsort(chunk_ids, kind='stable')
+        chunk_ids, starts = np.unique(chunk_ids[order], return_index=True)
+
+        for chunk_id, idx in zip(chunk_ids.tolist(), np.split(order, starts[1:])):
+            chunk_z, chunk_x = divmod(chunk_id, self.shape[2] // 16)
+            out[idx] = self.chunk(chunk_z, chunk_x)[ys[idx], zs[idx] % 16, xs[idx] % 16]
+
+        return out.reshape(shape)
+
+    def materialize(self, path=None):
+        if path is None:
+            world = np.zeros(self.shape, dtype=self.dtype)
+        else:
+            # A dense file-backed copy, paged in by the OS; usable where a
+            # contiguous array is required, e.g. by the native raycaster.
+            world = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=self.shape)
+
+        for chunk_z in range(self.shape[1] // 16):
+            for chunk_x in range(self.shape[2] // 16):
+                if (self._min_x + chunk_x, self._min_z + chunk_z) in self._present:
+                    world[:, _ch(chunk_z), _ch(chunk_x)] = self._store.read_chunk(self._min_x + chunk_x, self._min_z + chunk_z)[self._y_range]
+
+        if path is not None:
+            world.flush()
+
+        return world
+
+    def __array__(self, dtype=None, copy=None):
+        # Implicit conversions would silently load worlds larger than RAM.
+        if self.nbytes > self.cache_bytes:
+            raise ValueError(f'LazyWorld of {self.nbytes / 1024**3:.1f} GB does not fit into cache_bytes, use materialize(path) for a memory-mapped copy.')
+
+        world = self.materialize()
+        return world if dtype is None else world.astype(dtype)
+
+
+def load_lazy(path, x_range=None, y_range=None, z_range=None, cache_bytes=2*1024**3):
+    if y_range is None:
+        y_range = slice(0, 256)
+
+    store = open_store(path)
+    world = LazyWorld(store, _select_chunks(store, x_range, z_range), y_range, cache_bytes)
+
+    return world.offset, world
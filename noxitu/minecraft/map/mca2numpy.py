@@ -1,25 +1,28 @@
+import argparse
+import multiprocessing
 import os
-import re
-import zlib
 
 import numpy as np
 from tqdm import tqdm
 
 import noxitu.minecraft.protocol.nbt as nbt
-import noxitu.minecraft.protocol.packet
-from noxitu.minecraft.map.global_palette import BLOCKS, GLOBAL_PALETTE, MATERIALS
+from noxitu.minecraft.map.block_states import bits_per_block, unpack_block_states
+from noxitu.minecraft.map.block_state_index import describe, load_index, resolve_palette
+from noxitu.minecraft.map.chunk_store import FORMATS, open_store, write_index
+from noxitu.minecraft.map.global_palette import GLOBAL_PALETTE, MATERIALS
+from noxitu.minecraft.map.region import RegionFile, parse_region_name
 
 
 UNKNOWN = set()
+MISSING = set()
 
-
-def unpack_long(value, bits):
-    if value < 0:
-        value += 2 ** 64
-
-    mask = 2**bits - 1
-    for i in range(0, 64-bits+1, bits):
-        yield (value >> i) & mask
+CHUNK_FIELDS = [
+    'Level.xPos',
+    'Level.zPos',
+    'Level.Sections.Y',
+    'Level.Sections.Palette',
+    'Level.Sections.BlockStates',
+]
 
 
 def unpack_section(section_data, palette):
@@ -28,120 +31,160 @@ def unpack_section(section_data, palette):
     if UNKNOWN is not None:
         UNKNOWN |= set(map(lambda i: GLOBAL_PALETTE[i], palette)) - set(MATERIALS)
 
+    return unpack_block_states(section_data, bits_per_block(len(palette)), palette)
 
-    bits_per_block = 4
 
-    while 2 ** bits_per_block < len(palette):
-        bits_per_block += 1
+def _in_range(value, value_range):
+    return value_range is None or value_range.start <= value < value_range.stop
 
-    result = [val for packed in section_data for val in unpack_long(packed, bits_per_block)]
-    result = result[:16*16*16]
-    result = palette[result]
-    result = np.array(result).reshape(16, 16, 16).astype(int)
-    return result
 
+def convert_chunk(chunk_data, x, z):
+    chunk_data, _ = nbt.parse_fast(chunk_data, include=CHUNK_FIELDS)
 
-if __name__ == '__main__':
-    os.makedirs('data/chunks', exist_ok=True)
-
-    PATH = R'C:\Users\grzeg\AppData\Roaming\.minecraft\saves\hc7\region'
-
-    for chunk_file in tqdm(os.listdir(PATH)):
-        try:
-            match = re.match(R'^r\.(-?[0-9]+)\.(-?[0-9]+)\.mca$', chunk_file)
-            global_x, global_z = [int(match.group(i)) for i in (1, 2)]
-        except:
-            tqdm.write(f'\033[31mFailed for {chunk_file}\033[m')
-            raise
-
-        with open(f'{PATH}/{chunk_file}', 'rb') as fd:
-            data = fd.read()
-
-        try:
-            chunks = {(i%32, i//32): (4096 * (65536*data[4*i] + 256*data[4*i+1] + data[4*i+2]), 4096*data[4*i+3]) for i in range(1024)}
-            chunks = {(x, z): (offset, size) for (x, z), (offset, size) in chunks.items() if size > 0}
-        except:
-            tqdm.write(f'\033[31mFailed for {chunk_file}\033[m')
-            continue
-        
-        for (local_x, local_z) in tqdm([(local_x, local_z) for local_x in range(32) for local_z in range(32)], leave=False):
-            try:                
-                offset, size = chunks[(local_x, local_z)]
-            except KeyError:
-                continue
+    assert chunk_data[b''][b'Level'][b'xPos'] == x
+    assert chunk_data[b''][b'Level'][b'zPos'] == z
+
+    chunk = np.zeros((16, 16, 16, 16), dtype=np.uint16)
+
+    for section in chunk_data[b''][b'Level'][b'Sections']:
+        y = section[b'Y']
+
+        if b'BlockStates' in section and 0 <= y < 16:
+            palette = resolve_palette(section[b'Palette'], MISSING)
+            chunk[y] = unpack_section(section[b'BlockStates'], palette)
 
-            x = 32*global_x + local_x
-            z = 32*global_z + local_z
+    return chunk.reshape(256, 16, 16)
 
-            if x < -210 or x > 150 or z < -120 or z > 130:
+
+def convert_region(path, output='data/chunks', x_range=None, z_range=None, format=None):
+    global UNKNOWN, MISSING
+    UNKNOWN = set()
+    MISSING = set()
+
+    converted = skipped = 0
+
+    with RegionFile(path) as region, open_store(output, 'a', format) as store:
+        for local_x, local_z in sorted(region.chunks()):
+            x, z = region.global_coords(local_x, local_z)
+
+            if not _in_range(x, x_range) or not _in_range(z, z_range):
                 continue
 
-            if os.path.exists(f'data/chunks/{x}_{z}_chunk.npy'):
+            if (x, z) in store:
+                skipped += 1
                 continue
 
-            chunk_data = noxitu.minecraft.protocol.packet.Packet(data[offset:offset+5])
-            size = chunk_data.int()
-            encryption = chunk_data.ubyte()
-            assert encryption == 2
+            store.write_chunk(x, z, convert_chunk(region.read(local_x, local_z), x, z))
+            converted += 1
 
-            chunk_data = zlib.decompress(data[offset+5:offset+4+size])
-            chunk_data, _ = nbt.parse(chunk_data)
+    return os.path.basename(path), converted, skipped, UNKNOWN, MISSING
 
-            assert chunk_data[b''][b'Level'][b'xPos'] == x
-            assert chunk_data[b''][b'Level'][b'zPos'] == z
 
-            chunk = np.zeros((16, 16, 16, 16), dtype=np.uint16)
+def _convert_region(args):
+    path, output, x_range, z_range, format = args
 
-            for section in chunk_data[b''][b'Level'][b'Sections']:
-                y = section[b'Y']
+    try:
+        return convert_region(path, output, x_range, z_range, format), None
+    except Exception as ex:
+        return (os.path.basename(path), 0, 0, set(), set()), f'{type(ex).__name__}: {ex}'
 
-                if b'BlockStates' in section:
-                    palette = []
 
-                    for entry in section[b'Palette']:
-                        block = BLOCKS[entry[b'Name'].decode()]
-                        if b'Properties' in entry:
-                            properties = {key.decode(): value.decode() for key, value in entry[b'Properties'].items()}
-                            n = 0
-                            for state in block['states']:
-                                if all(properties.get(key) == value for key, value in state['properties'].items()):
-                                    palette.append(state['id'])
-                                    n += 1
+def convert_world(region_path, output='data/chunks', *, x_range=None, z_range=None, format=None, processes=None, tqdm=None):
+    # Creates the store once, so that workers do not race to create it.
+    open_store(output, 'a', format).close()
 
-                            if n != 1:
-                                raise Exception()
-                        else:
-                            n = 0
-                            for state in block['states']:
-                                if state['default']:
-                                    palette.append(state['id'])
-                                    n += 1
+    regions = []
 
-                            if n != 1:
-                                raise Exception()
+    for filename in sorted(os.listdir(region_path)):
+        coords = parse_region_name(filename)
 
-                    palette = np.array(palette)
-                    chunk[y] = unpack_section(section[b'BlockStates'], palette)
+        if coords is None:
+            continue
+
+        region_x, region_z = coords
 
+        if x_range is not None and not (x_range.start < 32*region_x + 32 and 32*region_x < x_range.stop):
+            continue
 
-            np.save(Rf'data/chunks/{x}_{z}_chunk.npy', chunk.reshape(256, 16, 16))
+        if z_range is not None and not (z_range.start < 32*region_z + 32 and 32*region_z < z_range.stop):
+            continue
 
-    # for chunk in tqdm(os.listdir('data/chunks_raw')):
-    #     match = re.match(R'^(-?[0-9]+)-(-?[0-9]+)-([0-9]+)\.bin$', chunk)
-    #     x, z, section_mask = [int(match.group(i)) for i in (1, 2, 3)]
+        regions.append(os.path.join(region_path, filename))
 
-    #     with open(f'data/chunks_raw/{x}-{z}-{section_mask}.bin', 'rb') as fd:
-    #         data = fd.read()
+    unknown = set()
+    missing = set()
+    failed = []
 
-    #     chunk = np.zeros((16, 16, 16, 16), dtype=int)
+    # Built once here, so that forked workers inherit the index.
+    load_index()
 
-    #     for y, section in parse_chunk(x, z, section_mask, data):
-    #         chunk[y] = section()
+    # Every worker holds at most one region in memory and is replaced
+    # after a few regions, so that long conversions do not accumulate
+    # fragmented heap.
+    with multiprocessing.Pool(processes, maxtasksperchild=16) as pool:
+        tasks = [(path, output, x_range, z_range, format) for path in regions]
+        results = pool.imap(_convert_region, tasks)
 
-    #     np.save(Rf'data/chunks/{x}_{z}_chunk.npy', chunk.reshape(256, 16, 16))
+        if tqdm is not None:
+            results = tqdm(results, total=len(tasks))
 
-    if UNKNOWN:
+        for (name, converted, skipped, region_unknown, region_missing), error in results:
+            unknown |= region_unknown
+            missing |= region_missing
+
+            if error is not None:
+                failed.append(name)
+                (print if tqdm is None else tqdm.write)(f'\033[31mFailed for {name}: {error}\033[m')
+            elif tqdm is not None:
+                results.set_postfix_str(f'{name}: {converted} converted, {skipped} skipped')
+
+    with open_store(output) as store:
+        write_index(store)
+
+    return unknown, missing, failed
+
+
+def _parse_range(value):
+    start, stop = map(int, value.split(':'))
+    return slice(start, stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts region files of a Minecraft save into data/chunks.')
+    parser.add_argument('region_path', help='path to "region" directory of a save')
+    parser.add_argument('--output', default='data/chunks')
+    parser.add_argument('--x-range', type=_parse_range, help='chunk range as START:STOP, e.g. --x-range=-210:151 (with =, as START may be negative)')
+    parser.add_argument('--z-range', type=_parse_range, help='chunk range as START:STOP, e.g. --z-range=-120:131')
+    parser.add_argument('--format', choices=sorted(FORMATS), default=None,
+                        help='format of a new output store (default: npy, existing stores keep their format)')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    unknown, missing, failed = convert_world(
+        args.region_path,
+        args.output,
+        x_range=args.x_range,
+        z_range=args.z_range,
+        format=args.format,
+        processes=args.processes,
+        tqdm=tqdm
+    )
+
+    if unknown:
         print('Unknown items:')
-        for item in UNKNOWN:
+        for item in unknown:
             print('  ', item)
         print()
+
+    if missing:
+        print('Block states not found in blocks.json (stored as air):')
+        for key in sorted(missing, key=describe):
+            print('  ', describe(key))
+        print()
+
+    if failed:
+        print(f'Failed regions: {", ".join(failed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import gzip
+import mmap
+import os
+import re
+import zlib
+
+import numpy as np
+
+
+SECTOR_SIZE = 4096
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_EXTERNAL = 0x80
+
+_DECOMPRESS = {
+    COMPRESSION_GZIP: gzip.decompress,
+    COMPRESSION_ZLIB: zlib.decompress,
+    COMPRESSION_NONE: bytes,
+}
+
+
+def parse_region_name(filename):
+    match = re.match(R'^r\.(-?[0-9]+)\.(-?[0-9]+)\.mca$', filename)
+
+    if match is None:
+        return None
+
+    return int(match.group(1)), int(match.group(2))
+
+
+class RegionFile:
+    def __init__(self, path):
+        self.path = str(path)
+        self.region_x, self.region_z = parse_region_name(os.path.basename(self.path))
+
+        self._fd = open(self.path, 'rb')
+        self._size = os.fstat(self._fd.fileno()).st_size
+
+        if self._size >= 2 * SECTOR_SIZE:
+            self._mmap = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+            header = np.frombuffer(self._mmap, dtype='>u4', count=2*1024).reshape(2, 32, 32)
+        else:
+            # Empty (or truncated) region files are valid and contain no chunks.
+            self._mmap = None
+            header = np.zeros((2, 32, 32), dtype='>u4')
+
+        # Indexed as [local_z, local_x], following the order of the header.
+        self.offsets = (header[0] >> 8).astype(np.int64) * SECTOR_SIZE
+        self.sectors = (header[0] & 0xff).astype(np.int64)
+        self.timestamps = header[1].astype(np.int64)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __contains__(self, local_xz):
+        local_x, local_z = local_xz
+        return self.sectors[local_z, local_x] > 0
+
+    def chunks(self):
+        local_z, local_x = np.nonzero(self.sectors)
+        return list(zip(local_x.tolist(), local_z.tolist()))
+
+    def global_coords(self, local_x, local_z):
+        return 32*self.region_x + local_x, 32*self.region_z + local_z
+
+    def timestamp(self, local_x, local_z):
+        return int(self.timestamps[local_z, local_x])
+
+    def read_raw(self, local_x, local_z):
+        if (local_x, local_z) not in self:
+            raise KeyError((local_x, local_z))
+
+        offset = int(self.offsets[local_z, local_x])
+
+        if offset + 5 > self._size:
+            raise ValueError(f'Chunk {(local_x, local_z)} points outside of {self.path}.')
+
+        length = int.from_bytes(self._mmap[offset:offset+4], 'big')
+        compression = self._mmap[offset+4]
+
+        if compression & COMPRESSION_EXTERNAL:
+            x, z = self.global_coords(local_x, local_z)
+            path = os.path.join(os.path.dirname(self.path), f'c.{x}.{z}.mcc')
+
+            with open(path, 'rb') as fd:
+                return compression & ~COMPRESSION_EXTERNAL, fd.read()
+
+        # Slicing a memoryview does not copy, only the sectors of this chunk are read.
+        return compression, memoryview(self._mmap)[offset+5:offset+4+length]
+
+    def read(self, local_x, local_z):
+        compression, data = self.read_raw(local_x, local_z)
+
+        try:
+            decompress = _DECOMPRESS[compression]
+        except KeyError:
+            raise ValueError(f'Unsupported compression {compression} of chunk {(local_x, local_z)} in {self.path}.') from None
+
+        return decompress(data)
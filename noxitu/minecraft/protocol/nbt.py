@@ -1,5 +1,8 @@
+import functools
 import struct
 
+import numpy as np
+
 
 def parse(buffer, offset=0):
     def pop_byte():
@@ -95,3 +98,249 @@ def parse(buffer, offset=0):
     key, value = pop_compound_item()
 
     return {key: value}, offset
+
+
+_BYTE = struct.Struct('>b')
+_SHORT = struct.Struct('>h')
+_USHORT = struct.Struct('>H')
+_INT = struct.Struct('>i')
+_LONG = struct.Struct('>q')
+_FLOAT = struct.Struct('>f')
+_DOUBLE = struct.Struct('>d')
+
+_SCALARS = {
+    0x01: _BYTE,
+    0x02: _SHORT,
+    0x03: _INT,
+    0x04: _LONG,
+    0x05: _FLOAT,
+    0x06: _DOUBLE,
+}
+
+_ARRAYS = {
+    0x07: np.dtype('i1'),
+    0x0b: np.dtype('>i4'),
+    0x0c: np.dtype('>i8'),
+}
+
+
+def _read_list(buffer, offset):
+    item_type = buffer[offset]
+    length, = _INT.unpack_from(buffer, offset+1)
+    offset += 5
+
+    if length <= 0:
+        return [], offset
+
+    scalar = _SCALARS.get(item_type)
+
+    if scalar is not None:
+        values = struct.unpack_from(f'>{length}{scalar.format[1:]}', buffer, offset)
+        return list(values), offset + length*scalar.size
+
+    values = []
+
+    for _ in range(length):
+        value, offset = _read_value(buffer, offset, item_type)
+        values.append(value)
+
+    return values, offset
+
+
+def _read_compound(buffer, offset):
+    ret = {}
+    unpack_ushort = _USHORT.unpack_from
+
+    while True:
+        item_type = buffer[offset]
+
+        if item_type == 0x00:
+            return ret, offset + 1
+
+        length, = unpack_ushort(buffer, offset+1)
+        offset += 3 + length
+        key = bytes(buffer[offset-length:offset])
+
+        scalar = _SCALARS.get(item_type)
+
+        if scalar is not None:
+            ret[key], = scalar.unpack_from(buffer, offset)
+            offset += scalar.size
+        else:
+            ret[key], offset = _read_value(buffer, offset, item_type)
+
+
+def _read_value(buffer, offset, tag):
+    if tag == 0x0a:
+        return _read_compound(buffer, offset)
+
+    scalar = _SCALARS.get(tag)
+
+    if scalar is not None:
+        value, = scalar.unpack_from(buffer, offset)
+        return value, offset + scalar.size
+
+    if tag == 0x08:
+        length, = _USHORT.unpack_from(buffer, offset)
+        offset += 2 + length
+        return bytes(buffer[offset-length:offset]), offset
+
+    if tag == 0x09:
+        return _read_list(buffer, offset)
+
+    dtype = _ARRAYS.get(tag)
+
+    if dtype is not None:
+        length, = _INT.unpack_from(buffer, offset)
+        offset += 4
+        value = np.frombuffer(buffer, dtype=dtype, count=length, offset=offset)
+        return value, offset + length*dtype.itemsize
+
+    raise ValueError(f'Unknown NBT tag 0x{tag:02x} at offset {offset}.')
+
+
+def _skip_list(buffer, offset):
+    item_type = buffer[offset]
+    length, = _INT.unpack_from(buffer, offset+1)
+    offset += 5
+
+    if length <= 0:
+        return offset
+
+    scalar = _SCALARS.get(item_type)
+
+    if scalar is not None:
+        return offset + length*scalar.size
+
+    for _ in range(length):
+        offset = _skip_value(buffer, offset, item_type)
+
+    return offset
+
+
+def _skip_compound(buffer, offset):
+    unpack_ushort = _USHORT.unpack_from
+
+    while True:
+        item_type = buffer[offset]
+
+        if item_type == 0x00:
+            return offset + 1
+
+        length, = unpack_ushort(buffer, offset+1)
+        offset = _skip_value(buffer, offset + 3 + length, item_type)
+
+
+def _skip_value(buffer, offset, tag):
+    scalar = _SCALARS.get(tag)
+
+    if scalar is not None:
+        return offset + scalar.size
+
+    if tag == 0x0a:
+        return _skip_compound(buffer, offset)
+
+    if tag == 0x08:
+        length, = _USHORT.unpack_from(buffer, offset)
+        return offset + 2 + length
+
+    if tag == 0x09:
+        return _skip_list(buffer, offset)
+
+    dtype = _ARRAYS.get(tag)
+
+    if dtype is not None:
+        length, = _INT.unpack_from(buffer, offset)
+        return offset + 4 + length*dtype.itemsize
+
+    raise ValueError(f'Unknown NBT tag 0x{tag:02x} at offset {offset}.')
+
+
+def _read_filtered_list(buffer, offset, include):
+    item_type = buffer[offset]
+
+    if item_type not in (0x09, 0x0a):
+        return _read_list(buffer, offset)
+
+    length, = _INT.unpack_from(buffer, offset+1)
+    offset += 5
+
+    values = []
+
+    for _ in range(length):
+        value, offset = _read_filtered_value(buffer, offset, item_type, include)
+        values.append(value)
+
+    return values, offset
+
+
+def _read_filtered_compound(buffer, offset, include):
+    ret = {}
+    unpack_ushort = _USHORT.unpack_from
+
+    while True:
+        item_type = buffer[offset]
+
+        if item_type == 0x00:
+            return ret, offset + 1
+
+        length, = unpack_ushort(buffer, offset+1)
+        offset += 3 + length
+        key = bytes(buffer[offset-length:offset])
+
+        item_include = include.get(key)
+
+        if item_include is None:
+            offset = _skip_value(buffer, offset, item_type)
+        elif item_include is True:
+            ret[key], offset = _read_value(buffer, offset, item_type)
+        else:
+            ret[key], offset = _read_filtered_value(buffer, offset, item_type, item_include)
+
+
+def _read_filtered_value(buffer, offset, tag, include):
+    if tag == 0x0a:
+        return _read_filtered_compound(buffer, offset, include)
+
+    if tag == 0x09:
+        return _read_filtered_list(buffer, offset, include)
+
+    return _read_value(buffer, offset, tag)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_include(paths):
+    tree = {}
+
+    for path in paths:
+        node = tree
+        *parents, leaf = path.encode().split(b'.')
+
+        for key in parents:
+            child = node.get(key)
+
+            if child is True:
+                break
+
+            node = node.setdefault(key, {})
+        else:
+            node[leaf] = True
+
+    return tree
+
+
+# `include` is an optional list of dotted paths below the root compound, e.g.
+# ['Level.xPos', 'Level.Sections.Y']. A path continues into each element of a
+# list. Tags outside of these paths are skipped by length without decoding.
+def parse_fast(buffer, offset=0, include=None):
+    item_type = buffer[offset]
+    length, = _USHORT.unpack_from(buffer, offset+1)
+    offset += 3 + length
+    key = bytes(buffer[offset-length:offset])
+
+    if include is None:
+        value, offset = _read_value(buffer, offset, item_type)
+    else:
+        value, offset = _read_filtered_value(buffer, offset, item_type, _compile_include(tuple(include)))
+
+    return {key: value}, offset
@@ -1,6 +1,8 @@
 import struct
 import uuid
 
+import numpy as np
+
 from noxitu.minecraft.protocol.protocol_core import varint32
 import noxitu.minecraft.protocol.nbt
 
@@ -42,6 +44,11 @@ class Packet:
         self.offset += 8
         return value
 
+    def ulong_array(self, length):
+        value = np.frombuffer(self._buffer, dtype='>u8', count=length, offset=self.offset)
+        self.offset += 8 * length
+        return value
+
     def varint(self):
         value, skip = varint32(self._buffer, self.offset)
         self.offset += skip
@@ -57,6 +64,11 @@ class Packet:
         value, self.offset = noxitu.minecraft.protocol.nbt.parse(self._buffer, self.offset)
         return value
 
+    def nbt_fast(self, include=None):
+        # Arrays are NumPy views into the packet and bytes are signed.
+        value, self.offset = noxitu.minecraft.protocol.nbt.parse_fast(self._buffer, self.offset, include)
+        return value
+
     def uuid(self):
         value = uuid.UUID(bytes=self._buffer[self.offset:self.offset+16])
         self.offset += 16
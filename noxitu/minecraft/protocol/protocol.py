@@ -131,7 +131,7 @@ def chunk_data(_, packet):
     z = packet.int()
     full_chunk = packet.boolean()
     section_mask = packet.varint()
-    heightmaps = packet.nbt()
+    heightmaps = packet.nbt_fast(include=())
 
     if full_chunk:
         biomes_length = packet.varint()
@@ -147,4 +147,4 @@ def chunk_data(_, packet):
         noxitu.minecraft.protocol.handler.handle_chunk_data(x, z, section_mask, chunk_data)
 
     entities_length = packet.varint()
-    entities = [packet.nbt() for _ in range(entities_length)]
+    entities = [packet.nbt_fast(include=()) for _ in range(entities_length)]
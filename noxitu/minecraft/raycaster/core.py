@@ -1,7 +1,34 @@
 import ctypes
+import functools
+import logging
+import os
+import pathlib
+import sys
+import threading
 
 import numpy as np
 
+
+LOGGER = logging.getLogger(__name__)
+
+LIBRARY_ENV = 'NOXITU_RAYCAST_LIBRARY'
+LIBRARY_NAMES = {'win32': 'RayCasting.dll', 'darwin': 'libRayCasting.dylib'}
+BUILD_DIRS = [
+    pathlib.Path('c++/build/raycast3d'),
+    pathlib.Path(__file__).resolve().parents[3] / 'c++' / 'build' / 'raycast3d',
+]
+
+# Same limits as raycast_cpu.hpp.
+OUTER_ITERATIONS = 256
+INNER_ITERATIONS = 128
+BRICK_SIZE = 16
+CELL_SIZE = 4
+
+_ACCELERATION_CACHE = {}
+_ACCELERATION_LOCK = threading.Lock()
+_NUM_THREADS = None
+
+
 def array(a):
     return (
         ctypes.c_void_p(a.ctypes.data),
@@ -10,31 +37,231 @@ def array(a):
         a.ctypes.strides
     )
 
-_raycast_impl = ctypes.WinDLL('c++/build/raycast3d/Release/RayCasting.dll').raycast
 
-def raycast(rays, world, mask):
-    result = np.zeros(rays.shape[:-1], dtype=int)
-    result_depth = np.zeros(rays.shape[:-1], dtype=float)
+def library_candidates():
+    if os.environ.get(LIBRARY_ENV):
+        yield pathlib.Path(os.environ[LIBRARY_ENV])
+
+    name = LIBRARY_NAMES.get(sys.platform, 'libRayCasting.so')
+
+    # Multi-config generators (Visual Studio) build into Release/.
+    for build_dir in BUILD_DIRS:
+        yield build_dir / 'Release' / name
+        yield build_dir / name
+
+
+@functools.lru_cache(maxsize=None)
+def load_library():
+    load = ctypes.WinDLL if sys.platform == 'win32' else ctypes.CDLL
+
+    for path in library_candidates():
+        if path.exists():
+            library = load(str(path))
+            for name in ['raycast', 'raycast_f32', 'raycast_build_acceleration', 'raycast_accelerated', 'raycast_accelerated_f32',
+                         'raycast_camera', 'raycast_camera_f32', 'raycast_set_num_threads']:
+                getattr(library, name).restype = None
+            LOGGER.info('Loaded raycaster from %s', path)
+            return library
+
+    LOGGER.warning('Raycaster library not found, build c++/ with CMake; falling back to NumPy.')
+    return None
+
+
+def _split_result(result, result_depth):
+    return (
+        (result & 0xffff).astype(np.uint16),
+        result_depth,
+        ((result & 0x70000) >> 16).astype(np.uint8)
+    )
+
+
+def set_num_threads(num_threads):
+    # OpenMP threads of every native call (None for all cores), so that
+    # threads raycasting tiles at once do not run a team of all cores each.
+    global _NUM_THREADS
+    _NUM_THREADS = num_threads
+
+
+def _native_library():
+    library = load_library()
+
+    if library is None:
+        raise RuntimeError('Raycaster library is not available.')
+
+    # OpenMP keeps the number of threads per calling thread.
+    library.raycast_set_num_threads(ctypes.c_int(_NUM_THREADS or 0))
+
+    return library
+
+
+def build_acceleration(world, mask):
+    # Occupancy of 16x16x16 bricks, of 4x4x4 cells and heights of columns (one
+    # above their highest block), all with respect to blocks selected by mask.
+    library = _native_library()
+    world = np.ascontiguousarray(world, dtype=np.uint16)
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+
+    occupancy = np.zeros(tuple(-(-size // BRICK_SIZE) for size in world.shape), dtype=np.uint8)
+    cell_occupancy = np.zeros(tuple(-(-size // CELL_SIZE) for size in world.shape), dtype=np.uint8)
+    heightmap = np.zeros(world.shape[1:], dtype=np.uint16)
+
+    library.raycast_build_acceleration(*array(world), *array(mask), *array(occupancy), *array(cell_occupancy), *array(heightmap))
+
+    return occupancy, cell_occupancy, heightmap
+
+
+def _cached_acceleration(world, mask):
+    # Raycasting uses few masks of the same world, so structures are built
+    # once for each of them, also when tiles are raycast by many threads.
+    # Keyed by the address of the data, as views of a memory-mapped world
+    # are new objects every call; the cache keeps the world alive.
+    key = world.__array_interface__['data'][0], world.shape, mask.tobytes()
+
+    with _ACCELERATION_LOCK:
+        cached = _ACCELERATION_CACHE.get(key)
+
+        if cached is None:
+            if len(_ACCELERATION_CACHE) >= 4:
+                _ACCELERATION_CACHE.clear()
+
+            cached = _ACCELERATION_CACHE[key] = (world, *build_acceleration(world, mask))
+
+    return cached[1:]
+
+
+def _ray_dtype(rays):
+    # float32 rays (and depths) halve memory traffic, anything else is float64.
+    return np.float32 if np.asarray(rays).dtype == np.float32 else np.float64
+
+
+def raycast_native(rays, world, mask, accelerate=True):
+    library = _native_library()
+
+    dtype = _ray_dtype(rays)
+    rays = np.ascontiguousarray(rays, dtype=dtype)
+    world = np.ascontiguousarray(world, dtype=np.uint16)
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+
+    acceleration = _cached_acceleration(world, mask) if accelerate else ()
+
+    result = np.zeros(rays.shape[:-1], dtype=np.int32)
+    result_depth = np.zeros(rays.shape[:-1], dtype=dtype)
 
     batch_size = 10_000_000
+    name = ('raycast_accelerated' if accelerate else 'raycast') + ('_f32' if dtype == np.float32 else '')
 
     for offset in range(0, result.size, batch_size):
         batch = slice(offset, offset+batch_size)
 
-        _raycast_impl(
+        getattr(library, name)(
             *array(rays.reshape(-1, 6)[batch]),
             *array(world),
             *array(mask),
-            *array(result.ravel()[batch]),
-            *array(result_depth.ravel()[batch])
+            *(arg for a in acceleration for arg in array(a)),
+            *array(result.reshape(-1)[batch]),
+            *array(result_depth.reshape(-1)[batch])
         )
 
-    return (
-        (result & 0xffff).astype(np.uint16),
-        result_depth,
-        ((result & 0x70000) >> 16).astype(np.uint8)
+    return _split_result(result, result_depth)
+
+
+def raycast_numpy(rays, world, mask):
+    # Steps all rays through the grid at once, block by block, with the same
+    # arithmetic as raycast_cpu.hpp, so that results are identical to it.
+    shape = rays.shape[:-1]
+    dtype = _ray_dtype(rays)
+    rays = np.asarray(rays, dtype=np.float64).reshape(-1, 6)
+    mask = np.asarray(mask) != 0
+    size = np.array([world.shape[2], world.shape[0], world.shape[1]])
+
+    result = np.zeros(len(rays), dtype=np.int32)
+    result_depth = np.zeros(len(rays), dtype=np.float64)
+
+    active = np.arange(len(rays))
+    origin = rays[:, :3]
+    cell = origin.astype(np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1 / rays[:, 3:]
+
+        for _ in range(OUTER_ITERATIONS * INNER_ITERATIONS):
+            # A ray outside of the world moving away from it cannot hit
+            # anything; raycast_cpu.hpp checks it less often, with the same result.
+            keep = ~((inv > 0) & (cell >= size) | (inv < 0) & (cell < 0)).any(axis=1)
+            active, origin, inv, cell = active[keep], origin[keep], inv[keep], cell[keep]
+
+            if len(active) == 0:
+                break
+
+            distance = np.where(inv > 0, (cell - origin + 1) * inv, np.where(inv < 0, (cell - origin) * inv, np.inf))
+            dx, dy, dz = distance.T
+            axis = np.where((dx < dy) & (dx < dz), 0, np.where(dy < dz, 1, 2))
+
+            rows = np.arange(len(active))
+            positive = inv[rows, axis] > 0
+            cell[rows, axis] += np.where(positive, 1, -1)
+
+            inside = np.nonzero(((cell >= 0) & (cell < size)).all(axis=1))[0]
+            x, y, z = cell[inside].T
+            ids = world[y, z, x]
+            hit = inside[mask[ids]]
+            ids = ids[mask[ids]].astype(np.int32)
+
+            normal_idx = 2 * axis[hit] + np.where(positive[hit], 1, 2)
+            result[active[hit]] = ids & 0xffff | (normal_idx << 16) & 0x70000
+            result_depth[active[hit]] = distance[hit, axis[hit]]
+
+            keep = np.ones(len(active), dtype=bool)
+            keep[hit] = False
+            active, origin, inv, cell = active[keep], origin[keep], inv[keep], cell[keep]
+
+    return _split_result(result.reshape(shape), result_depth.reshape(shape).astype(dtype))
+
+
+def raycast(rays, world, mask):
+    if load_library() is not None:
+        return raycast_native(rays, world, mask)
+
+    return raycast_numpy(rays, world, mask)
+
+
+def raycast_camera(camera_rays, world, mask):
+    # Raycasts rays.CameraRays without creating arrays of rays; results are
+    # equal to raycasting np.asarray(camera_rays, float64), depths have
+    # the dtype of camera_rays.
+    dtype = np.float32 if camera_rays.dtype == np.float32 else np.float64
+
+    if load_library() is None:
+        ids, depths, normal_idx = raycast_numpy(np.asarray(camera_rays, dtype=np.float64), world, mask)
+        return ids, depths.astype(dtype), normal_idx
+
+    library = _native_library()
+    world = np.ascontiguousarray(world, dtype=np.uint16)
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    occupancy, cell_occupancy, heightmap = _cached_acceleration(world, mask)
+
+    camera = np.concatenate([camera_rays.origin, camera_rays.inverse_projection.reshape(-1)]).astype(np.float64)
+    xs = np.ascontiguousarray(camera_rays.xs, dtype=np.float64)
+    ys = np.ascontiguousarray(camera_rays.ys, dtype=np.float64)
+
+    result = np.zeros(camera_rays.shape[:2], dtype=np.int32)
+    result_depth = np.zeros(camera_rays.shape[:2], dtype=dtype)
+
+    getattr(library, 'raycast_camera_f32' if dtype == np.float32 else 'raycast_camera')(
+        *array(camera),
+        *array(xs),
+        *array(ys),
+        *array(world),
+        *array(mask),
+        *array(occupancy),
+        *array(cell_occupancy),
+        *array(heightmap),
+        *array(result.reshape(-1)),
+        *array(result_depth.reshape(-1))
     )
 
+    return _split_result(result, result_depth)
+
 
 def chain_masks(base, *masks):
     ret = base.copy()
@@ -4,6 +4,9 @@ from tqdm import tqdm
 import noxitu.minecraft.map.load
 
 
+WORLD_PATH = 'data/raycaster_world.npy'
+
+
 def load_world():
     if True:
         # offset, world = noxitu.minecraft.map.load.load(
@@ -14,13 +17,15 @@ def load_world():
         #     z_range=slice(-75, -37)
         # )
 
-        offset, world = noxitu.minecraft.map.load.load(
+        # Chunks are copied into a memory-mapped file, so that the world may
+        # be larger than RAM; the raycaster reads only pages it visits.
+        offset, world = noxitu.minecraft.map.load.load_lazy(
             'data/chunks',
-            tqdm=tqdm,
             x_range=slice(-500, 0),
             y_range=slice(20, 256),
             z_range=slice(-20, 580)
         )
+        world = world.materialize(WORLD_PATH)
 
         if False:
             np.savez('data/goat.npz', offset=offset, world=world)
@@ -1,10 +1,14 @@
 import logging
+import os
+
 import numpy as np
+from tqdm import tqdm
 
-from noxitu.minecraft.raycaster.core import chain_masks, raycast as raycast_cpp, normalize_factors, pyplot
+from noxitu.minecraft.raycaster.core import chain_masks, raycast as raycast_cpp, raycast_camera, normalize_factors, pyplot, set_num_threads
 from noxitu.minecraft.raycaster.opengl_raycaster import Raycaster
 import noxitu.minecraft.raycaster.rays
 import noxitu.minecraft.raycaster.io as io
+from noxitu.minecraft.raycaster.tiles import render_tiled
 
 from noxitu.minecraft.map.global_palette import GLOBAL_PALETTE, MATERIALS, MATERIAL_COLORS
 
@@ -27,6 +31,22 @@ AMBIENT_FACTOR, DIFFUSE_FACTOR = normalize_factors(0.25, 0.75)
 
 USE_OPENGL = True
 
+# float32 rays halve memory of the pipeline; hits match float64 ones but
+# for rays grazing edges of blocks.
+RAY_DTYPE = np.float32
+
+# The frame is rendered in tiles, so that memory depends on the budget and
+# not on RENDER_SHAPE. BYTES_PER_PIXEL is the peak of render_tile measured
+# with tracemalloc on a 512x512 tile: 198 B when all pixels hit land and
+# 457 B when all of them hit water, adding underwater and reflection rays.
+MEMORY_BUDGET = 2 * 1024**3
+BYTES_PER_PIXEL = 512
+
+# The library raycasts with OpenMP while shading runs in NumPy on one core,
+# so two workers overlap both; OpenMP threads are split between them, so
+# that no more threads than cores run at once.
+WORKERS = 2
+
 NORMALS_IDX = np.array([
     0, 0, 0,
     -1, 0, 0, 1, 0, 0,
@@ -51,13 +71,28 @@ SUN_DIRECTION = np.array([1, 3, -3], dtype=float)
 SUN_DIRECTION /= np.linalg.norm(SUN_DIRECTION)
 
 
-def create_camera_rays(render_shape, viewport, offset):
+def create_camera_rays(render_shape, viewport, offset, tile=None):
     return noxitu.minecraft.raycaster.rays.create_camera_rays(
         position=viewport['position'],
         rotation=viewport['rotation'][:3, :3],
         camera=viewport['camera'][:3, :3],
         resolution=render_shape,
-        offset=offset
+        offset=offset,
+        tile=tile,
+        dtype=RAY_DTYPE
+    )
+
+
+def camera_rays(render_shape, viewport, offset, tile=None):
+    # Rays created only for pixels that shading indexes.
+    return noxitu.minecraft.raycaster.rays.CameraRays(
+        position=viewport['position'],
+        rotation=viewport['rotation'][:3, :3],
+        camera=viewport['camera'][:3, :3],
+        resolution=render_shape,
+        offset=offset,
+        tile=tile,
+        dtype=RAY_DTYPE
     )
 
 def reduce_size(offset, world, camera_position, camera_rotation=None):
@@ -79,11 +114,10 @@ def reduce_size(offset, world, camera_position, camera_rotation=None):
         remove = world.shape[2] % 32
         world = world[..., :-remove]
     
-    world = world.copy()
+    world = np.ascontiguousarray(world)
 
     size = np.prod(world.shape, dtype=float)*2/1024/1024/1024
     LOGGER.info('  reduced to shape %s and size %.02f GB', world.shape, size)
-    assert size < 2.0
 
     return offset, world
 
@@ -103,10 +137,8 @@ def main():
     # LOGGER.info('Limiting world size...')
     # offset, world = reduce_size(offset, world, viewport['position'], viewport['rotation'][:3, :3])
 
-    LOGGER.info('Computing rays...')
-    rays = create_camera_rays(RENDER_SHAPE, viewport, offset)
-
     raycast = raycast_cpp
+    workers = WORKERS
     primary_block_mask = GLOBAL_COLORS_MASK
     block_mask_without_water = GLOBAL_COLORS_MASK & ~IS_WATER
 
@@ -116,22 +148,26 @@ def main():
         primary_block_mask = raycaster.set_mask('primary_block_mask', primary_block_mask)
         block_mask_without_water = raycaster.set_mask('block_mask_without_water', block_mask_without_water)
         raycast = raycaster.raycast
+        workers = 1
+    else:
+        set_num_threads(max(os.cpu_count() // workers, 1))
 
     def do_raycast_shadows(rays):
         n_rays = np.prod(rays.shape[::-1])
-        LOGGER.info(f'Raycasting {n_rays:,} rays to find shadows...', )
+        LOGGER.debug(f'Raycasting {n_rays:,} rays to find shadows...', )
         ids, _, _ = raycast(rays, world, block_mask_without_water)
         return (ids != 0)
 
     def do_raycast(rays, *,
+                   hits=None,
                    block_mask=primary_block_mask,
                    sun_direction=SUN_DIRECTION,
                    compute_shadows=True,
                    compute_water_reflections=True,
                    compute_underwater=True):
         n_rays = np.prod(rays.shape[::-1])
-        LOGGER.info(f'Raycasting {n_rays:,} rays...')
-        ids, depths, normal_idx = raycast(rays, world, block_mask)
+        LOGGER.debug(f'Raycasting {n_rays:,} rays...')
+        ids, depths, normal_idx = hits if hits is not None else raycast(rays, world, block_mask)
         colors = GLOBAL_COLORS[ids]
         hit_mask = (ids != 0)
 
@@ -168,7 +204,6 @@ def main():
             grass_mask = (texture_idx[texture_mask] == 7)
 
             target_colors = texture_atlas[texture_idx, offsets2d[:, 1], offsets2d[:, 0], :3][texture_mask].copy()
-            print(target_colors.shape)
             target_colors[grass_mask] = target_colors[grass_mask] * np.array([0x7C, 0xBD, 0x6B]) / 255 
 
             colors[chain_masks(hit_mask, texture_mask)] = target_colors
@@ -178,7 +213,7 @@ def main():
                                                                                   indices=normal_idx)
 
         if compute_shadows:
-            LOGGER.info('Computing shadow rays...')
+            LOGGER.debug('Computing shadow rays...')
             shadow_rays = noxitu.minecraft.raycaster.rays.compute_shadow_rays(rays[hit_mask], depths[hit_mask], sun_direction)
             shadow_mask = do_raycast_shadows(shadow_rays)
 
@@ -204,7 +239,7 @@ def main():
             water_colors = colors[water_mask] * water_factors[0]
 
             if compute_underwater:
-                LOGGER.info('Computing underwater rays...')
+                LOGGER.debug('Computing underwater rays...')
 
                 underwater_rays = rays[water_mask, 3:]
 
@@ -231,7 +266,7 @@ def main():
                 water_colors += underwater_colors * water_factors[1]
 
             if compute_water_reflections:
-                LOGGER.info('Computing water reflection rays...')
+                LOGGER.debug('Computing water reflection rays...')
                 reflection_direction = [1, 1, 1] - 2 * abs(NORMALS_IDX[normal_idx[water_mask]])
                 water_reflection_rays = noxitu.minecraft.raycaster.rays.compute_shadow_rays(rays[water_mask], 
                                                                                             depths[water_mask]-0.01,
@@ -250,8 +285,18 @@ def main():
 
         return ids, depths, normal_idx, colors
 
-    LOGGER.info('Raycasting...')
-    _, _, _, colors = do_raycast(rays)
+    def render_tile(tile):
+        if USE_OPENGL:
+            _, _, _, colors = do_raycast(create_camera_rays(RENDER_SHAPE, viewport, offset, tile))
+            return colors
+
+        rays = camera_rays(RENDER_SHAPE, viewport, offset, tile)
+        _, _, _, colors = do_raycast(rays, hits=raycast_camera(rays, world, primary_block_mask))
+        return colors
+
+    LOGGER.info('Raycasting %dx%d image with %d workers...', RENDER_SHAPE[1], RENDER_SHAPE[0], workers)
+    colors = render_tiled(render_tile, RENDER_SHAPE, memory_budget=MEMORY_BUDGET, bytes_per_pixel=BYTES_PER_PIXEL,
+                          workers=workers, tqdm=tqdm)
 
     LOGGER.info('Displaying...')
     import matplotlib.pyplot as plt
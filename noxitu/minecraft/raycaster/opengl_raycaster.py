@@ -58,7 +58,7 @@ class Raycaster:
         return name
 
     def raycast(self, rays, _, mask_name, times=30):
-        rays = rays.astype(np.float32)
+        rays = np.asarray(rays, dtype=np.float32)
         state = create_state(rays)
         depths = create_depths(rays)
 
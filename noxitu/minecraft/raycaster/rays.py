@@ -1,16 +1,18 @@
 import numpy as np
 
 
-def create_camera_rays(*, position, rotation, camera, resolution, offset):
+def create_camera_rays(*, position, rotation, camera, resolution, offset, tile=None, dtype=float):
+    # With tile = (y0, y1, x0, x1) only rays of these pixels are created.
     render_height, render_width = resolution
+    y0, y1, x0, x1 = tile if tile is not None else (0, render_height, 0, render_width)
 
-    P_inv = np.linalg.inv(camera @ rotation)
+    P_inv = np.linalg.inv(camera @ rotation).astype(dtype)
     camera_x, camera_y, camera_z = position - offset
 
-    rays = np.array([camera_x, camera_y, camera_z, 0, 0, 1], dtype=float)
-    rays = rays.reshape(1, 1, 6) + np.zeros((render_height, render_width, 1))
-    rays[..., 3] += np.linspace(-1, 1, render_width).reshape(1, -1)
-    rays[..., 4] += np.linspace(-1, 1, render_height).reshape(-1, 1)
+    rays = np.array([camera_x, camera_y, camera_z, 0, 0, 1], dtype=dtype)
+    rays = rays.reshape(1, 1, 6) + np.zeros((y1 - y0, x1 - x0, 1), dtype=dtype)
+    rays[..., 3] += np.linspace(-1, 1, render_width, dtype=dtype)[x0:x1].reshape(1, -1)
+    rays[..., 4] += np.linspace(-1, 1, render_height, dtype=dtype)[y0:y1].reshape(-1, 1)
     
     rays[..., 3:] = np.einsum('rc,nmc->nmr', P_inv, rays[..., 3:])
     rays[..., 3:] /= np.linalg.norm(rays[..., 3:], axis=2)[..., np.newaxis]
@@ -18,7 +20,54 @@ def create_camera_rays(*, position, rotation, camera, resolution, offset):
     return rays
 
 
+class CameraRays:
+    # Primary rays of a tile described by the camera only (origin, inverse
+    # projection and resolution). The raycaster generates them on the fly,
+    # indexing with a boolean mask of pixels creates rays of these pixels
+    # only. Both use the same arithmetic, so they are equal to each other
+    # and up to rounding to create_camera_rays.
+    def __init__(self, *, position, rotation, camera, resolution, offset, tile=None, dtype=float):
+        render_height, render_width = resolution
+        y0, y1, x0, x1 = tile if tile is not None else (0, render_height, 0, render_width)
+
+        self.origin = np.asarray(position - offset, dtype=np.float64)
+        self.inverse_projection = np.linalg.inv(camera @ rotation)
+        self.xs = np.linspace(-1, 1, render_width)[x0:x1]
+        self.ys = np.linspace(-1, 1, render_height)[y0:y1]
+
+        self.shape = (y1 - y0, x1 - x0, 6)
+        self.dtype = np.dtype(dtype)
+
+    def pixels(self, ys, xs, dtype=None):
+        u, v = self.xs[xs], self.ys[ys]
+        P = self.inverse_projection
+        directions = [P[r, 0] * u + P[r, 1] * v + P[r, 2] for r in range(3)]
+        norm = np.sqrt(directions[0] * directions[0] + directions[1] * directions[1] + directions[2] * directions[2])
+
+        rays = np.empty((len(xs), 6), dtype=dtype or self.dtype)
+        rays[:, :3] = self.origin
+
+        for axis, direction in enumerate(directions):
+            rays[:, 3 + axis] = direction / norm
+
+        return rays
+
+    def __getitem__(self, key):
+        mask, rest = (key[0], key[1:]) if isinstance(key, tuple) else (key, ())
+        mask = np.asarray(mask)
+
+        if mask.dtype != bool or mask.shape != self.shape[:2]:
+            raise IndexError('CameraRays can be indexed only with a boolean mask of pixels.')
+
+        return self.pixels(*np.nonzero(mask))[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None):
+        ys, xs = np.nonzero(np.ones(self.shape[:2], dtype=bool))
+        return self.pixels(ys, xs, dtype).reshape(self.shape)
+
+
 def compute_shadow_rays(rays, depths, sunlight):
+    # Keeps the dtype of rays.
     rays = rays.copy()
     rays[..., :3] = rays[..., :3] + rays[..., 3:] * (depths - 0.05)[..., np.newaxis]
     rays[..., 3:] = sunlight
@@ -0,0 +1,53 @@
+import collections
+import concurrent.futures
+
+import numpy as np
+
+
+def tile_size_for_budget(shape, memory_budget, bytes_per_pixel, workers=1, multiple=16):
+    # Largest square tile, such that tiles of all workers fit into the budget.
+    height, width = shape
+    size = int(np.sqrt(memory_budget / (bytes_per_pixel * max(workers, 1))))
+    size = max(size // multiple * multiple, multiple)
+    return min(size, max(height, width))
+
+
+def screen_tiles(shape, tile_size):
+    height, width = shape
+
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def render_tiled(render_tile, shape, *, memory_budget, bytes_per_pixel, workers=1, channels=3, dtype=np.uint8, tqdm=lambda x: x):
+    # Renders the image tile by tile with render_tile((y0, y1, x0, x1)), that
+    # returns pixels of the tile; at most one tile per worker is in flight.
+    tile_size = tile_size_for_budget(shape, memory_budget, bytes_per_pixel, workers)
+    tile_list = list(screen_tiles(shape, tile_size))
+    image = np.zeros((*shape, channels), dtype=dtype)
+
+    def store(tile, pixels):
+        y0, y1, x0, x1 = tile
+        image[y0:y1, x0:x1] = pixels
+
+    # OpenGL contexts belong to the thread that created them.
+    if workers <= 1:
+        for tile in tqdm(tile_list):
+            store(tile, render_tile(tile))
+
+        return image
+
+    pending = collections.deque()
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        for tile in tqdm(tile_list):
+            if len(pending) >= workers:
+                store(*pending.popleft().result())
+
+            pending.append(executor.submit(lambda tile: (tile, render_tile(tile)), tile))
+
+        while pending:
+            store(*pending.popleft().result())
+
+    return image
@@ -0,0 +1,239 @@
+import os
+
+import numpy as np
+
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE, GLOBAL_COLORS, blocks_to_buffer, extract_tile_blocks, iter_tiles
+
+
+MEGA_CHUNK_SIZE = 256
+MEGA_CHUNK_INDEX_DTYPE = np.dtype([('key', '3int32'), ('offset', 'int64'), ('count', 'int64'), ('ranges', '(6, 2)int64')])
+
+
+def _paths(path):
+    return f'{path}.blocks', f'{path}.index.npy'
+
+
+def exists(path):
+    return all(os.path.exists(p) for p in _paths(path))
+
+
+def modification_time(path):
+    # Of the older of both files, None when the block file does not exist.
+    try:
+        return min(os.path.getmtime(p) for p in _paths(path))
+    except FileNotFoundError:
+        return None
+
+
+def remove(path):
+    for p in _paths(path):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+class BlockFileWriter:
+    # Writes an uncompressed block buffer (path.blocks) mega chunk by mega
+    # chunk and a table of their offsets and direction ranges (path.index.npy).
+    # Records of a mega chunk have to be written consecutively, possibly in
+    # several parts; only the parts of one mega chunk are kept in memory, to
+    # write it grouped by direction.
+    def __init__(self, path):
+        self.path = str(path)
+        self._data_path, self._index_path = _paths(self.path)
+        self._temporary_path = f'{self._data_path}.{os.getpid()}.tmp'
+        self._fd = open(self._temporary_path, 'wb')
+        self._index = []
+        self._keys = set()
+        self._key = None
+        self._parts = []
+        self._offset = 0
+
+    def write(self, key, blocks):
+        key = tuple(int(k) for k in key)
+        blocks = np.ascontiguousarray(blocks, dtype=BLOCK_BUFFER_DTYPE)
+
+        if key != self._key:
+            if key in self._keys:
+                raise ValueError(f'Mega chunk {key} was already written.')
+
+            self._flush()
+            self._keys.add(key)
+            self._key = key
+
+        self._parts.append(blocks)
+
+    def _flush(self):
+        if not self._parts:
+            return
+
+        blocks, ranges = split_by_direction(np.concatenate(self._parts))
+        self._parts = []
+
+        if len(blocks):
+            self._fd.write(blocks.tobytes())
+            self._index.append((self._key, self._offset, len(blocks), ranges))
+            self._offset += len(blocks)
+
+    def close(self):
+        self._flush()
+        self._fd.close()
+
+        index = np.array(self._index, dtype=MEGA_CHUNK_INDEX_DTYPE)
+        temporary_index_path = f'{self._index_path}.{os.getpid()}.tmp.npy'
+        np.save(temporary_index_path, index)
+
+        os.replace(self._temporary_path, self._data_path)
+        os.replace(temporary_index_path, self._index_path)
+
+    def __enter__(self):
+        return self
+
+    def abort(self):
+        self._fd.close()
+        os.remove(self._temporary_path)
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_block_file(path):
+    data_path, index_path = _paths(path)
+    index = np.load(index_path)
+
+    size = os.path.getsize(data_path)
+
+    if size != BLOCK_BUFFER_DTYPE.itemsize * int(index['count'].sum()):
+        raise ValueError(f'{index_path} does not match {data_path}.')
+
+    if size == 0:
+        return index, np.zeros(0, dtype=BLOCK_BUFFER_DTYPE)
+
+    return index, np.memmap(data_path, dtype=BLOCK_BUFFER_DTYPE, mode='r')
+
+
+def load_mega_chunks(path):
+    index, blocks = read_block_file(path)
+
+    return {
+        tuple(key): blocks[offset:offset+count]
+        for key, offset, count in zip(index['key'].tolist(), index['offset'].tolist(), index['count'].tolist())
+    }
+
+
+def load_direction_ranges(path):
+    # (first, count) of every direction within each mega chunk, empty for
+    # block files written before the ranges were stored.
+    index = np.load(_paths(path)[1])
+
+    if 'ranges' not in index.dtype.names:
+        return {}
+
+    return {tuple(key): ranges for key, ranges in zip(index['key'].tolist(), index['ranges'])}
+
+
+def to_mega_chunk(position):
+    return np.floor(position / MEGA_CHUNK_SIZE).astype(int)
+
+
+def compute_mega_chunk_index(blocks):
+    # Order of blocks grouping them by mega chunks, z major like in the
+    # block file, and the index of the groups within reordered blocks.
+    keys = to_mega_chunk(blocks['position'])
+    ids = 0x10000 * keys[:, 2] + keys[:, 0]
+
+    order = np.argsort(ids, kind='stable')
+    ids = ids[order]
+
+    _, first, counts = np.unique(ids, return_index=True, return_counts=True)
+
+    index = np.zeros(len(first), dtype=MEGA_CHUNK_INDEX_DTYPE)
+    index['key'] = keys[order[first]]
+    index['offset'] = first
+    index['count'] = counts
+
+    return order, index
+
+
+def split_by_direction(blocks):
+    # Orders blocks of a mega chunk by direction (unless they already are)
+    # and returns (first, count) of each of the six directions.
+    direction = blocks['direction']
+
+    if np.any(direction[1:] < direction[:-1]):
+        blocks = blocks[np.argsort(direction, kind='stable')]
+        direction = blocks['direction']
+
+    counts = np.bincount(direction, minlength=7)[1:7]
+    ranges = np.stack([np.cumsum(counts) - counts, counts], axis=1)
+
+    return blocks, ranges
+
+
+def cached_mega_chunks(load_blocks, cache_path, fingerprint):
+    # Grouping hundreds of millions of blocks takes long, so the grouped
+    # buffer is written once as a block file at cache_path, together with
+    # the fingerprint of its source (path.source), and reused while the
+    # fingerprint matches; load_blocks() is called only to rebuild it.
+    fingerprint_path = f'{cache_path}.source'
+
+    try:
+        with open(fingerprint_path) as fd:
+            cached = exists(cache_path) and fd.read() == fingerprint
+    except FileNotFoundError:
+        cached = False
+
+    if not cached:
+        if os.path.exists(fingerprint_path):
+            os.remove(fingerprint_path)
+
+        blocks = load_blocks()
+        order, index = compute_mega_chunk_index(blocks)
+
+        with BlockFileWriter(cache_path) as writer:
+            for key, offset, count in zip(index['key'].tolist(), index['offset'].tolist(), index['count'].tolist()):
+                writer.write(key, blocks[order[offset:offset+count]])
+
+        with open(fingerprint_path, 'w') as fd:
+            fd.write(fingerprint)
+
+    return load_mega_chunks(cache_path)
+
+
+def mega_chunk_tiles(shape, offset, tile_chunks=8, scale=1):
+    # Tiles of the world (with offset in (x, y, z)) that do not cross mega
+    # chunks, in the order of mega chunk keys (z major, like compute_mega_chunks).
+    # Blocks of a downsampled world span scale blocks of the original one.
+    _, sz, sx = shape
+    ox, oy, oz = (int(o) for o in offset)
+    tile_size = 16 * tile_chunks
+
+    if (oy + scale * (shape[0] - 1)) // MEGA_CHUNK_SIZE != oy // MEGA_CHUNK_SIZE:
+        raise ValueError('World has to fit into a single layer of mega chunks.')
+
+    def ranges(origin, size):
+        for k in range(origin // MEGA_CHUNK_SIZE, (origin + scale * (size - 1)) // MEGA_CHUNK_SIZE + 1):
+            low = max(-(-(MEGA_CHUNK_SIZE * k - origin) // scale), 0)
+            high = min(-(-(MEGA_CHUNK_SIZE * (k + 1) - origin) // scale), size)
+            yield k, [(start, min(start + tile_size, high)) for start in range(low, high, tile_size)]
+
+    for kz, z_tiles in ranges(oz, sz):
+        for kx, x_tiles in ranges(ox, sx):
+            for z0, z1 in z_tiles:
+                for x0, x1 in x_tiles:
+                    yield (kx, oy // MEGA_CHUNK_SIZE, kz), (z0, z1, x0, x1)
+
+
+def write_block_file(path, world, texture_mapping, colors=GLOBAL_COLORS, offset=(0, 0, 0), tile_chunks=8, workers=None, tqdm=lambda x: x, scale=1):
+    keys, tile_list = zip(*mega_chunk_tiles(world.shape, offset, tile_chunks, scale))
+    n_blocks = 0
+
+    with BlockFileWriter(path) as writer:
+        for key, (_, blocks) in zip(tqdm(keys), iter_tiles(extract_tile_blocks, world, tile_list, workers)):
+            blocks = blocks_to_buffer(*blocks, texture_mapping, colors, offset, scale)
+            writer.write(key, blocks)
+            n_blocks += len(blocks)
+
+    return n_blocks
@@ -151,6 +151,12 @@ def decrease_view_distance(state):
     state.redraw = True
 
 
+@on_keyup('9')
+def toggle_multi_draw(state):
+    state.multi_draw = not state.multi_draw
+    state.redraw = True
+
+
 @on_keyup('q')
 @on_quit
 def decrease_fov(_state):
@@ -1,8 +1,15 @@
+import argparse
+
 import numpy as np
 from tqdm import tqdm
 
 import noxitu.minecraft.map.load
-from noxitu.minecraft.renderer.world_faces import compute_face_mask, compute_face_colors, compute_face_ids, compute_faces
+from noxitu.minecraft.renderer.block_file import remove as remove_block_file, write_block_file
+from noxitu.minecraft.renderer.face_store import update_face_store
+from noxitu.minecraft.renderer.greedy_mesh import greedy_quads
+from noxitu.minecraft.renderer.lod import LOD_FACTORS, lod_path, write_lod_block_files
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE, build_block_buffer, compute_faces_tiled
+from noxitu.minecraft.renderer.world_faces import compute_faces
 from noxitu.minecraft.map.global_palette import GLOBAL_PALETTE, MATERIALS, MATERIAL_COLORS
 
 GLOBAL_COLORS = [MATERIAL_COLORS.get(MATERIALS.get(name)) for name in GLOBAL_PALETTE]
@@ -11,10 +18,34 @@ GLOBAL_COLORS = np.array([c if c is not None else [0, 0, 0] for c in GLOBAL_COLO
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Creates data/block_buffers from data/chunks.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='update data/block_buffers/chunks, recomputing only changed chunks and their neighbours')
+    parser.add_argument('--format', choices=['mmap', 'npz'], default='mmap',
+                        help='mmap writes uncompressed output.blocks sorted by mega chunk, npz writes compressed output.npz')
+    parser.add_argument('--lod', action='store_true',
+                        help='with --format mmap, also write output.lod{2,4,8} buffers of downsampled blocks for distant mega chunks')
+    parser.add_argument('--greedy', action='store_true',
+                        help='write data/face_buffers/output.npz with coplanar faces merged into larger quads')
+    args = parser.parse_args()
+
     print('Loading world...')
 
     texture_mapping = np.load('data/texture_atlas.npz')['texture_mapping']
 
+    if args.incremental:
+        dirty, removed = update_face_store('data/chunks', 'data/block_buffers/chunks', texture_mapping, GLOBAL_COLORS,
+                                           x_range=slice(-207, 114),
+                                           y_range=slice(2, 256),
+                                           z_range=slice(-82, 126),
+                                           tqdm=tqdm)
+        print(f'Updated {dirty} chunks, removed {removed} chunks.')
+
+        # The renderer would otherwise keep showing an older full buffer.
+        for path in ['data/block_buffers/output'] + [lod_path('data/block_buffers/output', factor) for factor in LOD_FACTORS]:
+            remove_block_file(path)
+        return
+
     S = 4000
     # S = 40
     # W = 140
@@ -29,23 +60,34 @@ def main():
     #                                                z_range=slice(-H, H+1)
     #                                             )
 
-    offset, world = noxitu.minecraft.map.load.load('data/chunks',
-                                                   tqdm=tqdm,
-                                                   x_range=slice(-207, 114),
-                                                   y_range=slice(2, 256),
-                                                   z_range=slice(-82, 126)
-                                                )
+    # Chunks are read on demand by the tiled face extraction.
+    offset, world = noxitu.minecraft.map.load.load_lazy('data/chunks',
+                                                        x_range=slice(-207, 114),
+                                                        y_range=slice(2, 256),
+                                                        z_range=slice(-82, 126)
+                                                     )
     offset = offset[[2, 0, 1]]
 
     print(offset, world.shape)
 
-    print('Computing faces...')
-    n_faces, face_coords = compute_face_mask(world)
-    face_colors = compute_face_colors(face_coords, world, GLOBAL_COLORS)
-    face_ids = compute_face_ids(face_coords, world)
-    world = None
+    if args.greedy:
+        print('Computing faces...')
+        blocks = build_block_buffer(world, texture_mapping, GLOBAL_COLORS, offset, tqdm=tqdm)
+        world = None
+
+        print('Merging faces...')
+        buffer, extents = greedy_quads(blocks)
+        print(f'  {len(blocks)} faces merged into {len(buffer)} quads')
+        blocks = None
+
+        print('Saving buffer...')
+        np.savez_compressed('data/face_buffers/output.npz', buffer=buffer, extents=extents)
+
+    elif False:
+        print('Computing faces...')
+        n_faces, face_coords, face_colors, face_ids = compute_faces_tiled(world, GLOBAL_COLORS, tqdm=tqdm)
+        world = None
 
-    if False:
         print('Computing vertices...')
         print(f'  size = {n_faces*3*4*2/1024/1024/1024:.01f} GB')
         vertices, vertex_colors = compute_faces(face_coords, face_colors)
@@ -64,26 +106,22 @@ def main():
         print('Saving buffer...')
         np.savez_compressed('data/face_buffers/output.npz', buffer=buffer)
 
-    else:
-        face_directions = np.concatenate([
-            [i]*len(colors) for i, colors in enumerate(face_colors)
-        ])
+    elif args.format == 'mmap':
+        print('Computing faces...')
+        n_blocks = write_block_file('data/block_buffers/output', world, texture_mapping, GLOBAL_COLORS, offset, tqdm=tqdm)
+        print(f'Stored buffer with size {n_blocks*BLOCK_BUFFER_DTYPE.itemsize/1024/1024/1024:.02f} GB')
 
-        n = len(face_directions)
+        if args.lod:
+            print('Computing levels of detail...')
+            lod_blocks = write_lod_block_files('data/block_buffers/output', world, texture_mapping, GLOBAL_COLORS, offset, tqdm=tqdm)
 
-        buffer = np.zeros((n,), dtype=[('position', '3int16'), ('direction', 'uint8'), ('color', '3uint8'), ('texture_id', 'int16')])
+            for factor, n_blocks in lod_blocks.items():
+                print(f'  {factor}x: {n_blocks*BLOCK_BUFFER_DTYPE.itemsize/1024/1024/1024:.02f} GB')
 
-        buffer['direction'] = face_directions + 1
-        
-        for i in range(6):
-            ys, zs, xs = face_coords[i]
-            buffer['position'][face_directions==i, 0] = xs
-            buffer['position'][face_directions==i, 1] = ys
-            buffer['position'][face_directions==i, 2] = zs
-            buffer['color'][face_directions==i] = face_colors[i]
-            buffer['texture_id'][face_directions==i] = texture_mapping[face_ids[i], i]
-
-        buffer['position'] += offset
+    else:
+        print('Computing faces...')
+        buffer = build_block_buffer(world, texture_mapping, GLOBAL_COLORS, offset, tqdm=tqdm)
+        world = None
 
         print(f'Storing buffer with size {buffer.size*buffer.itemsize/1024/1024/1024:.02f} GB')
 
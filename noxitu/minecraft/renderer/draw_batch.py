@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def multi_draw_ranges(ranges, facing):
+    # Firsts and counts for a single glMultiDrawArrays from (first, count) of
+    # the six directions of mega chunks in one buffer and the directions to
+    # draw; ranges ending where the next one starts are merged.
+    ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+    ranges = ranges[np.asarray(facing, dtype=bool).reshape(-1) & (ranges[:, 1] > 0)]
+
+    if len(ranges) == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    ranges = ranges[np.argsort(ranges[:, 0], kind='stable')]
+    ends = ranges[:, 0] + ranges[:, 1]
+
+    starts = np.ones(len(ranges), dtype=bool)
+    starts[1:] = ranges[1:, 0] != ends[:-1]
+
+    first = np.nonzero(starts)[0]
+    last = np.append(first[1:], len(ranges)) - 1
+
+    return ranges[first, 0].astype(np.int32), (ends[last] - ranges[first, 0]).astype(np.int32)
+
+
+def pack_offsets(sizes):
+    # Offsets of mega chunks placed one after another in a shared buffer.
+    sizes = np.asarray(sizes, dtype=np.int64)
+    return np.cumsum(sizes) - sizes
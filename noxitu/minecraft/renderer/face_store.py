@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from noxitu.minecraft.map.load import load_lazy
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE, GLOBAL_COLORS, blocks_to_buffer, extract_tile_blocks, iter_tiles
+
+
+PARTITION_CHUNKS = 16
+MANIFEST_NAME = 'faces.json'
+PARTITION_PATTERN = re.compile(R'^(-?[0-9]+)_(-?[0-9]+)_faces\.npz$')
+
+_NEIGHBOURS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def chunk_hash(chunk):
+    return hashlib.blake2b(np.ascontiguousarray(chunk).tobytes(), digest_size=16).hexdigest()
+
+
+def _settings_hash(y_range, texture_mapping, colors):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{y_range.start}:{y_range.stop}'.encode())
+
+    for array in (texture_mapping, colors):
+        array = np.ascontiguousarray(array)
+        h.update(f'{array.dtype.str}{array.shape}'.encode())
+        h.update(array.tobytes())
+
+    return h.hexdigest()
+
+
+def _partition_key(x, z):
+    return x // PARTITION_CHUNKS, z // PARTITION_CHUNKS
+
+
+class FaceStore:
+    # Faces of chunks are grouped into files of 16x16 chunks (one mega chunk
+    # of the renderer), each of them holds block buffer records of every
+    # chunk followed by a table of (x, z, number of faces) of the chunks.
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _partition_path(self, partition_x, partition_z):
+        return os.path.join(self.path, f'{partition_x}_{partition_z}_faces.npz')
+
+    def partitions(self):
+        matches = (PARTITION_PATTERN.match(name) for name in os.listdir(self.path))
+        return sorted((int(match.group(1)), int(match.group(2))) for match in matches if match is not None)
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST_NAME)) as fd:
+                return json.load(fd)
+        except FileNotFoundError:
+            return {'settings': None, 'bounds': None, 'hashes': {}}
+
+    def write_manifest(self, manifest):
+        path = os.path.join(self.path, MANIFEST_NAME)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+
+        with open(temporary_path, 'w') as fd:
+            json.dump(manifest, fd)
+
+        os.replace(temporary_path, path)
+
+    def read_partition(self, partition_x, partition_z):
+        path = self._partition_path(partition_x, partition_z)
+
+        if not os.path.exists(path):
+            return {}
+
+        with np.load(path) as fd:
+            faces, chunks = fd['faces'], fd['chunks']
+
+        ends = np.cumsum(chunks[:, 2])
+        return {(x, z): faces[end-count:end] for (x, z, count), end in zip(chunks.tolist(), ends.tolist())}
+
+    def write_partition(self, partition_x, partition_z, chunks):
+        path = self._partition_path(partition_x, partition_z)
+
+        if not chunks:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        keys = sorted(chunks, key=lambda xz: xz[::-1])
+        faces = np.concatenate([chunks[key] for key in keys])
+        table = np.array([(x, z, len(chunks[x, z])) for x, z in keys], dtype=np.int64).reshape(-1, 3)
+
+        temporary_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temporary_path, faces=faces, chunks=table)
+        os.replace(temporary_path, path)
+
+    def load(self):
+        parts = []
+
+        for partition in self.partitions():
+            with np.load(self._partition_path(*partition)) as fd:
+                parts.append(fd['faces'])
+
+        if not parts:
+            return np.zeros(0, dtype=BLOCK_BUFFER_DTYPE)
+
+        return np.concatenate(parts)
+
+
+def _edge_chunks(chunks, bounds):
+    if bounds is None:
+        return set()
+
+    min_x, max_x, min_z, max_z = bounds
+    return {(x, z) for x, z in chunks if x in (min_x, max_x) or z in (min_z, max_z)}
+
+
+def update_face_store(chunks_path, faces_path, texture_mapping, colors=GLOBAL_COLORS,
+                      x_range=None, y_range=None, z_range=None, workers=None, tqdm=lambda x: x):
+    offset, world = load_lazy(chunks_path, x_range=x_range, y_range=y_range, z_range=z_range)
+    store = FaceStore(faces_path)
+    manifest = store.read_manifest()
+
+    present = world.chunks()
+    min_y, min_z, min_x = offset.tolist()
+    bounds = [min_x // 16, min_x // 16 + world.shape[2] // 16 - 1, min_z // 16, min_z // 16 + world.shape[1] // 16 - 1]
+    settings = _settings_hash(slice(min_y, min_y + world.shape[0]), texture_mapping, colors)
+
+    hashes = {f'{x}_{z}': chunk_hash(world.chunk(z - min_z // 16, x - min_x // 16)) for x, z in tqdm(present)}
+
+    if manifest['settings'] != settings:
+        old_chunks = set()
+        dirty = set(present)
+        old_partitions = set(store.partitions())
+    else:
+        old_chunks = {tuple(map(int, key.split('_'))) for key in manifest['hashes']}
+        old_partitions = set()
+
+        changed = {(x, z) for x, z in present if manifest['hashes'].get(f'{x}_{z}') != hashes[f'{x}_{z}']}
+        changed |= old_chunks - set(present)
+
+        # Faces depend on neighbouring blocks, so neighbours of changed chunks
+        # are rebuilt too. Faces on the border of the world are not visible,
+        # so chunks on both old and new borders are rebuilt when it moves.
+        dirty = {(x + dx, z + dz) for x, z in changed for dx, dz in _NEIGHBOURS}
+
+        if manifest['bounds'] != bounds:
+            dirty |= _edge_chunks(old_chunks, manifest['bounds']) | _edge_chunks(present, bounds)
+
+        dirty &= set(present)
+
+    removed = old_chunks - set(present)
+
+    tile_list = [
+        (16*z - min_z, 16*z - min_z + 16, 16*x - min_x, 16*x - min_x + 16)
+        for x, z in sorted(dirty, key=lambda xz: _partition_key(*xz))
+    ]
+    partitions = {_partition_key(x, z) for x, z in dirty | removed} | old_partitions
+
+    updates = {}
+    written = set()
+
+    def write(partition):
+        chunks = {} if partition in old_partitions else store.read_partition(*partition)
+
+        for xz in removed:
+            chunks.pop(xz, None)
+
+        chunks.update(updates.pop(partition, {}))
+        store.write_partition(*partition, chunks)
+        written.add(partition)
+
+    # Tiles are sorted by partition, so only one partition is kept in memory.
+    for (z0, _, x0, _), blocks in tqdm(iter_tiles(extract_tile_blocks, world, tile_list, workers)):
+        x, z = (x0 + min_x) // 16, (z0 + min_z) // 16
+        partition = _partition_key(x, z)
+
+        if updates and partition not in updates:
+            write(next(iter(updates)))
+
+        updates.setdefault(partition, {})[x, z] = blocks_to_buffer(*blocks, texture_mapping, colors, (min_x, min_y, min_z))
+
+    for partition in sorted(set(updates) | partitions - written):
+        write(partition)
+
+    # Written last, an interrupted update is repeated on the next run.
+    store.write_manifest({'settings': settings, 'bounds': bounds, 'hashes': hashes})
+
+    return len(dirty), len(removed)
@@ -0,0 +1,80 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.tiled_faces import DIRECTIONS
+from noxitu.minecraft.renderer.world_faces import CUBE_FACES, CUBE_VERTICES, FACE_COLOR_MUL
+
+
+FACE_BUFFER_DTYPE = np.dtype([('vertices', '3int16'), ('colors', '3uint8')])
+SECTION_SIZE = 16
+
+# Axes of positions are (x, y, z), DIRECTIONS use (y, z, x).
+_NORMAL_AXIS = np.array([(axis + 1) % 3 for axis, _ in DIRECTIONS])
+_U_AXIS = (_NORMAL_AXIS + 1) % 3
+_V_AXIS = (_NORMAL_AXIS + 2) % 3
+
+
+def _runs(starts):
+    # Index of the run of every element and the first element of every run.
+    run = np.cumsum(starts) - 1
+    return run, np.nonzero(starts)[0]
+
+
+def _merge(keys, coord):
+    # Merges consecutive coordinates of elements with equal keys, without
+    # crossing boundaries of chunk sections. Returns the order of elements,
+    # the run of every sorted element and the first sorted element of runs.
+    order = np.lexsort((coord,) + tuple(keys[::-1]))
+    coord = coord[order]
+
+    starts = np.ones(len(order), dtype=bool)
+    same = (coord[1:] == coord[:-1] + 1) & (coord[1:] // SECTION_SIZE == coord[:-1] // SECTION_SIZE)
+
+    for key in keys:
+        key = key[order]
+        same &= key[1:] == key[:-1]
+
+    starts[1:] = ~same
+
+    return (order,) + _runs(starts)
+
+
+def greedy_quads(blocks):
+    # Merges coplanar neighbouring faces of a block buffer with the same
+    # color and texture into rectangles, first into runs along one axis of
+    # the plane and then runs of equal extent along the other.
+    direction = blocks['direction'].astype(np.int64) - 1
+    position = blocks['position'].astype(np.int64)
+    color = blocks['color'].astype(np.int64)
+    material = (blocks['texture_id'].astype(np.int64) << 24) | (color[:, 0] << 16) | (color[:, 1] << 8) | color[:, 2]
+
+    rows = np.arange(len(blocks))
+    plane = position[rows, _NORMAL_AXIS[direction]]
+    u = position[rows, _U_AXIS[direction]]
+    v = position[rows, _V_AXIS[direction]]
+
+    order, run, first = _merge([direction, plane, v, material], u)
+    width = np.bincount(run)
+    run_faces = order[first]
+
+    u_order, quad, quad_first = _merge([direction[run_faces], plane[run_faces], u[run_faces], width, material[run_faces]], v[run_faces])
+    height = np.bincount(quad)
+    faces = run_faces[u_order[quad_first]]
+
+    direction = direction[faces]
+    extents = np.stack([width[u_order[quad_first]], height], axis=1)
+
+    scale = np.ones((len(faces), 3), dtype=np.int64)
+    scale[np.arange(len(faces)), _U_AXIS[direction]] = extents[:, 0]
+    scale[np.arange(len(faces)), _V_AXIS[direction]] = extents[:, 1]
+
+    corners = CUBE_VERTICES[CUBE_FACES[direction]].astype(np.int64)
+    vertices = position[faces].reshape(-1, 1, 3) + corners * scale.reshape(-1, 1, 3)
+
+    multiplier = np.array(FACE_COLOR_MUL)[direction].reshape(-1, 1)
+    colors = (multiplier * blocks['color'][faces]).astype(np.uint8)
+
+    buffer = np.zeros((len(faces), 4), dtype=FACE_BUFFER_DTYPE)
+    buffer['vertices'] = vertices
+    buffer['colors'] = colors.reshape(-1, 1, 3)
+
+    return buffer, extents.astype(np.uint16)
@@ -1,8 +1,92 @@
+import hashlib
+import json
+import os
+import zipfile
+
 import numpy as np
 
+import noxitu.minecraft.renderer.block_file as block_file
+import noxitu.minecraft.renderer.lod as lod
+from noxitu.minecraft.renderer.face_store import MANIFEST_NAME, FaceStore
+
+
+OUTPUT_PATH = 'data/block_buffers/output'
+NPZ_PATH = 'data/block_buffers/output.npz'
+CHUNKS_PATH = 'data/block_buffers/chunks'
+
+
+def _modification_time(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+
+def _source_times():
+    times = {
+        'blocks': block_file.modification_time(OUTPUT_PATH),
+        'chunks': _modification_time(os.path.join(CHUNKS_PATH, MANIFEST_NAME)),
+        'npz': _modification_time(NPZ_PATH),
+    }
+    return {source: time for source, time in times.items() if time is not None}
+
+
+def _source_fingerprint(source):
+    # Cheap to compute, yet changes with the content also when an older
+    # file is restored: size and CRC32 of the buffer from the zip directory
+    # (nothing is decompressed), or a digest of the chunk hashes.
+    if source == 'npz':
+        with zipfile.ZipFile(NPZ_PATH) as fd:
+            return f'{os.path.getsize(NPZ_PATH)} {fd.getinfo("buffer.npy").CRC:08x}'
+
+    manifest = FaceStore(CHUNKS_PATH).read_manifest()
+    content = json.dumps([manifest.get('settings'), manifest.get('hashes')], sort_keys=True)
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def block_buffer_source():
+    # create_face_buffer writes one of these without touching the others,
+    # so the most recently written one is used.
+    times = _source_times()
+
+    if not times:
+        raise FileNotFoundError('No block buffer in data/block_buffers, run noxitu.minecraft.renderer.create_face_buffer first.')
+
+    return max(times, key=times.get)
+
+
+def load_mega_chunks():
+    # Mega chunks and their direction ranges, read from the block file index.
+    source = block_buffer_source()
+
+    if source == 'blocks':
+        path = OUTPUT_PATH
+    else:
+        path = 'data/block_buffers/chunks.sorted' if source == 'chunks' else 'data/block_buffers/output.sorted'
+        block_file.cached_mega_chunks(lambda: load_blocks(source), path, _source_fingerprint(source))
+
+    return block_file.load_mega_chunks(path), block_file.load_direction_ranges(path)
+
+
+def load_lod_mega_chunks():
+    # Levels of detail are written only together with output.blocks.
+    if block_buffer_source() != 'blocks':
+        return {}
+
+    paths = {factor: lod.lod_path(OUTPUT_PATH, factor) for factor in lod.LOD_FACTORS}
+
+    return {
+        factor: (block_file.load_mega_chunks(path), block_file.load_direction_ranges(path))
+        for factor, path in paths.items()
+        if block_file.exists(path)
+    }
+
+
+def load_blocks(source=None):
+    if (source or block_buffer_source()) == 'chunks':
+        return FaceStore(CHUNKS_PATH).load()
 
-def load_blocks():
-    return np.load('data/block_buffers/output.npz')['buffer']
+    return np.load(NPZ_PATH)['buffer']
     # return np.load('data/block_buffers/small.npz')['buffer']
 
 
@@ -0,0 +1,68 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.block_file import write_block_file
+from noxitu.minecraft.renderer.tiled_faces import GLOBAL_COLORS, GLOBAL_COLORS_MASK
+
+
+LOD_FACTORS = [2, 4, 8]
+
+
+def lod_path(path, factor):
+    return f'{path}.lod{factor}'
+
+
+def downsample(blocks, factor, colors_mask=GLOBAL_COLORS_MASK):
+    # Every factor^3 cell becomes its highest visible block (the first one
+    # in x, z order on that level), or air when it has none.
+    sy, sz, sx = blocks.shape
+    blocks = np.pad(blocks, ((0, -sy % factor), (0, -sz % factor), (0, -sx % factor)))
+    cy, cz, cx = (size // factor for size in blocks.shape)
+
+    cells = blocks.reshape(cy, factor, cz, factor, cx, factor)[:, ::-1]
+    cells = cells.transpose(0, 2, 4, 1, 3, 5).reshape(cy, cz, cx, factor**3)
+
+    visible = colors_mask[cells]
+    first = np.argmax(visible, axis=-1)
+
+    result = np.take_along_axis(cells, first[..., None], axis=-1)[..., 0]
+    result[~visible.any(axis=-1)] = 0
+
+    return result
+
+
+class DownsampledWorld:
+    # Downsamples boxes of the world when they are sliced, so that tiled
+    # face extraction never needs the whole downsampled world in memory.
+    def __init__(self, world, factor, colors_mask=GLOBAL_COLORS_MASK):
+        self._world = world
+        self.factor = factor
+        self._colors_mask = colors_mask
+
+        sy, sz, sx = world.shape
+        self.shape = (-(-sy // factor), -(-sz // factor), -(-sx // factor))
+        self.dtype = np.dtype(world.dtype)
+        self.ndim = 3
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple) or len(key) != 3 or any(not isinstance(k, slice) or k.step not in (None, 1) for k in key):
+            raise IndexError('DownsampledWorld supports only boxes of three contiguous slices.')
+
+        f = self.factor
+        (y0, y1, _), (z0, z1, _), (x0, x1, _) = (k.indices(size) for k, size in zip(key, self.shape))
+        blocks = np.asarray(self._world[f*y0:f*y1, f*z0:f*z1, f*x0:f*x1])
+
+        return downsample(blocks, f, self._colors_mask)[:y1-y0, :z1-z0, :x1-x0]
+
+    def __array__(self, dtype=None, copy=None):
+        world = self[:, :, :]
+        return world if dtype is None else world.astype(dtype)
+
+
+def write_lod_block_files(path, world, texture_mapping, colors=GLOBAL_COLORS, offset=(0, 0, 0), factors=LOD_FACTORS, workers=None, tqdm=lambda x: x):
+    n_blocks = {}
+
+    for factor in factors:
+        n_blocks[factor] = write_block_file(lod_path(path, factor), DownsampledWorld(world, factor), texture_mapping, colors, offset,
+                                            tile_chunks=max(16 // factor, 1), workers=workers, tqdm=tqdm, scale=factor)
+
+    return n_blocks
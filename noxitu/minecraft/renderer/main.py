@@ -10,6 +10,8 @@ import numpy as np
 import noxitu.opengl
 from noxitu.minecraft.renderer.controls import handle_events
 from noxitu.minecraft.renderer.state import create_default_state
+import noxitu.minecraft.renderer.block_file
+import noxitu.minecraft.renderer.draw_batch
 import noxitu.minecraft.renderer.io
 import noxitu.minecraft.renderer.renderables2 as renderables
 
@@ -28,57 +30,63 @@ PANORAMA_WIDTH, PANORAMA_HEIGHT = 8000, 8000
 LOGGER = logging.getLogger(__name__)
 
 
-def to_mega_chunk(position):
-    return np.floor(position / 256).astype(int)
+def create_vertex_array(vbo):
+    vao = glGenVertexArrays(1)
+    glBindVertexArray(vao)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
 
+    glEnableVertexAttribArray(0)
+    glVertexAttribPointer(0, 3, GL_SHORT, GL_FALSE, 12, c_void_p(0))
 
-def compute_mega_chunks(blocks):
-    LOGGER.info('Computing mega chunk keys...')
-    keys = to_mega_chunk(blocks['position'])
-    ids = 0x10000 * keys[:, 2] + keys[:, 0]
+    glEnableVertexAttribArray(1)
+    glVertexAttribIPointer(1, 1, GL_UNSIGNED_BYTE, 12, c_void_p(6))
 
-    LOGGER.info('Reordering blocks...')
-    order = np.argsort(ids)
-    ids = ids[order]
-    keys = keys[order]
-    blocks = blocks[order]
+    glEnableVertexAttribArray(2)
+    glVertexAttribPointer(2, 3, GL_UNSIGNED_BYTE, GL_TRUE, 12, c_void_p(7))
 
-    LOGGER.info('Creating megachunks...')
-    ids, unique_indices, sizes = np.unique(ids, return_index=True, return_counts=True)
-    keys = keys[unique_indices]
-    ends = np.cumsum(sizes)
+    glEnableVertexAttribArray(3)
+    glVertexAttribIPointer(3, 1, GL_SHORT, 12, c_void_p(10))
 
+    return vao
 
-    ret = {
-        tuple(key): blocks[end-size:end]
-        for key, size, end in zip(keys, sizes, ends)
-    }
 
-    LOGGER.info('Created %d mega chunks.', len(ids))
+def create_vao(array, direction_ranges=None):
+    # Block files store mega chunks grouped by direction with their ranges.
+    if direction_ranges is None:
+        array, direction_ranges = noxitu.minecraft.renderer.block_file.split_by_direction(array)
 
-    return ret
+    vbo = noxitu.opengl.create_buffers(array, usage=GL_STATIC_DRAW)
 
+    return vbo, create_vertex_array(vbo), len(array), direction_ranges
 
-def create_vao(array):
-    vbo = noxitu.opengl.create_buffers(array, usage=GL_STATIC_DRAW)
 
-    vao = glGenVertexArrays(1)
-    glBindVertexArray(vao)
+def create_packed_vaos(mega_chunks, direction_ranges=None):
+    # All mega chunks share one buffer and one vertex array, so visible ones
+    # can be drawn by a single glMultiDrawArrays; ranges are buffer offsets.
+    dtype = noxitu.minecraft.renderer.block_file.BLOCK_BUFFER_DTYPE
+    sizes = [len(blocks) for blocks in mega_chunks.values()]
+    offsets = noxitu.minecraft.renderer.draw_batch.pack_offsets(sizes)
+
+    vbo = noxitu.opengl.create_empty_buffer(shape=(max(sum(sizes), 1),), dtype=dtype, usage=GL_STATIC_DRAW)
+    vao = create_vertex_array(vbo)
+    vaos = {}
+
     glBindBuffer(GL_ARRAY_BUFFER, vbo)
 
-    glEnableVertexAttribArray(0)
-    glVertexAttribPointer(0, 3, GL_SHORT, GL_FALSE, 12, c_void_p(0))
+    for (key, blocks), offset in zip(mega_chunks.items(), offsets.tolist()):
+        if direction_ranges is not None and key in direction_ranges:
+            ranges = direction_ranges[key]
+        else:
+            blocks, ranges = noxitu.minecraft.renderer.block_file.split_by_direction(blocks)
 
-    glEnableVertexAttribArray(1)
-    glVertexAttribIPointer(1, 1, GL_UNSIGNED_BYTE, 12, c_void_p(6))
+        blocks = np.ascontiguousarray(blocks, dtype=dtype)
 
-    glEnableVertexAttribArray(2)
-    glVertexAttribPointer(2, 3, GL_UNSIGNED_BYTE, GL_TRUE, 12, c_void_p(7))
+        if len(blocks):
+            glBufferSubData(GL_ARRAY_BUFFER, offset * dtype.itemsize, blocks.nbytes, blocks)
 
-    glEnableVertexAttribArray(3)
-    glVertexAttribIPointer(3, 1, GL_SHORT, 12, c_void_p(10))
+        vaos[key] = vbo, vao, len(blocks), ranges + [offset, 0]
 
-    return vbo, vao, len(array)
+    return vaos
 
 
 def create_program(name, *, gs=True, **defines):
@@ -93,12 +101,12 @@ def create_program(name, *, gs=True, **defines):
 
 def main():
     LOGGER.info('Loading data...')
-    blocks = noxitu.minecraft.renderer.io.load_blocks()
+    mega_chunks, direction_ranges = noxitu.minecraft.renderer.io.load_mega_chunks()
     # viewport = noxitu.minecraft.renderer.io.load_viewport()
     texture_atlas, _ = noxitu.minecraft.renderer.io.load_texture_atlas()
 
-    mega_chunks = compute_mega_chunks(blocks)
-    blocks = None
+    lod_mega_chunks = noxitu.minecraft.renderer.io.load_lod_mega_chunks()
+    LOGGER.info('Loaded %d mega chunks, levels of detail: %s.', len(mega_chunks), sorted(lod_mega_chunks))
 
     pygame.init()
     pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
@@ -129,10 +137,15 @@ def main():
     assert actual_attribute_locations == [0, 1, 2], f'Invalid attribute locations: {actual_attribute_locations}.'
 
     mega_chunks_vaos = {
-        key: create_vao(value)
+        key: create_vao(value, direction_ranges.get(key))
         for key, value in mega_chunks.items()
     } 
 
+    lod_vaos = {
+        factor: {key: create_vao(value, lod_ranges.get(key)) for key, value in lod_chunks.items()}
+        for factor, (lod_chunks, lod_ranges) in lod_mega_chunks.items()
+    }
+
     state = create_default_state(
         ensure_framebuffer=renderables.EnsureFunc(),
         ensure_program=renderables.EnsureFunc(),
@@ -147,10 +160,15 @@ def main():
         main_program=main_program,
 
         mega_chunks_vaos=mega_chunks_vaos,
+        lod_vaos=lod_vaos,
 
         flip=pygame.display.flip,
         panorama_position=None,
         panorama_area=None,
+        frame_stats=None,
+        multi_draw=False,
+        multi_draw_boxes=None,
+        create_packed_vaos=lambda: create_packed_vaos(mega_chunks, direction_ranges),
 
         screen_size=(SCREEN_WIDTH, SCREEN_HEIGHT),
 
@@ -160,10 +178,16 @@ def main():
     frame_renderer = renderables.frame_renderer(state)
 
     while True:
+        stats = state.frame_stats
+
         pygame.display.set_caption(f'FPS = {clock.get_fps():.01f}    '
                                    f'@ ({", ".join(f"{c:.01f}" for c in state.camera_position)})    '
                                    f'FoV = {state.fov}    '
-                                   f'view distance = {state.view_distance}    ')
+                                   f'view distance = {state.view_distance}    '
+                                   f'{"multi-draw" if state.multi_draw else "per-chunk draws"}    '
+                                   + (f'chunks = {stats.drawn_chunks} drawn / {stats.culled_chunks} culled    '
+                                      f'points = {stats.drawn_points} drawn / {stats.culled_points} culled / {stats.back_face_points} back faces'
+                                      if stats is not None else ''))
 
         handle_events(state)
 
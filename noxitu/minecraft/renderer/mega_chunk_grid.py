@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class MegaChunkGrid:
+    # Dense (x, z) grid of indices of mega chunk keys (-1 where there is no
+    # mega chunk), so that mega chunks within a view distance are a slice.
+    def __init__(self, keys):
+        keys = np.asarray(keys, dtype=int).reshape(-1, 3)[:, ::2]
+
+        self.origin = keys.min(axis=0) if len(keys) else np.zeros(2, dtype=int)
+        shape = keys.max(axis=0) - self.origin + 1 if len(keys) else (0, 0)
+
+        self.keys = keys
+        self.grid = np.full(tuple(shape), -1, dtype=np.int64)
+        self.grid[tuple((keys - self.origin).T)] = np.arange(len(keys))
+
+        self._cached_area = None
+        self._selection = None
+
+    def _window(self, camera_chunk, view_distance):
+        low = np.clip(np.asarray(camera_chunk) - view_distance - self.origin, 0, self.grid.shape)
+        high = np.clip(np.asarray(camera_chunk) + view_distance + 1 - self.origin, 0, self.grid.shape)
+        return slice(low[0], high[0]), slice(low[1], high[1])
+
+    def select(self, camera_chunk, view_distance):
+        # Returns indices of keys (in their order) within the view distance,
+        # the remaining ones and their distances, cached for the same area.
+        area = tuple(int(c) for c in camera_chunk), int(view_distance)
+
+        if area == self._cached_area:
+            return self._selection
+
+        window = self._window(camera_chunk, view_distance)
+
+        near = self.grid[window]
+        near = np.sort(near[near >= 0])
+
+        far_mask = self.grid >= 0
+        far_mask[window] = False
+        far = np.sort(self.grid[far_mask])
+
+        distances = np.abs(self.keys[far] - np.asarray(camera_chunk)).max(axis=1) if len(far) else np.zeros(0, dtype=int)
+
+        self._cached_area = area
+        self._selection = SimpleNamespace(near=near, far=far, far_distances=distances)
+
+        return self._selection
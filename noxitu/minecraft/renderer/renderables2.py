@@ -3,6 +3,8 @@ from types import SimpleNamespace
 from OpenGL.GL import *
 import numpy as np
 
+from noxitu.minecraft.renderer.draw_batch import multi_draw_ranges
+from noxitu.minecraft.renderer.mega_chunk_grid import MegaChunkGrid
 import noxitu.minecraft.renderer.view as view
 
 
@@ -13,6 +15,11 @@ PANORAMA_WIDTH, PANORAMA_HEIGHT = 8000, 8000
 def to_mega_chunk(position):
     return np.floor(position / 256).astype(int)
 
+
+def mega_chunk_boxes(keys):
+    keys = np.asarray(keys, dtype=float).reshape(-1, 3)
+    return 256 * keys, 256 * (keys + 1)
+
 ##################
 
 class DoubleBuffer:
@@ -43,6 +50,27 @@ class EnsureFunc:
         self._last_ensured = args
 
 
+def lod_factor(distance, view_distance):
+    # Far mega chunks are drawn from buffers with 2x, 4x or 8x larger blocks.
+    if distance > 4 * view_distance:
+        return 8
+    if distance > 2 * view_distance:
+        return 4
+    if distance > view_distance:
+        return 2
+    return 1
+
+
+def select_lod(context, chunk_key, chunk, distance, view_distance):
+    lod_vaos = context.lod_vaos
+    factor = lod_factor(distance, view_distance)
+
+    for available in sorted((f for f in lod_vaos if f <= factor), reverse=True):
+        if chunk_key in lod_vaos[available]:
+            return available, lod_vaos[available][chunk_key]
+
+    return 1, chunk
+
 ##############################
 
 def use_panorama_framebuffer(context):
@@ -65,6 +93,7 @@ def use_panorama_program(context, frame):
 
     glUniform3f(program.uniform('camera_position'), *frame.camera_position)
     glUniform3f(program.uniform('sun_direction'), *frame.sun_direction)
+    glUniform1f(program.uniform('block_scale'), 1.0)
 
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_CULL_FACE)
@@ -91,6 +120,7 @@ def use_main_program(context, frame):
 
     program.set_uniform_mat4('projectionview_matrix', frame.projectionview_matrix)
     glUniform3f(program.uniform('sun_direction'), *frame.sun_direction)
+    glUniform1f(program.uniform('block_scale'), 1.0)
 
     glBindTexture(GL_TEXTURE_2D_ARRAY, context.texture_atlas)
     glActiveTexture(GL_TEXTURE0)
@@ -112,21 +142,24 @@ def panorama_renderer(context):
         context.ensure_framebuffer(use_panorama_framebuffer, context)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
+        boxes = context.mega_chunks_boxes
+        selection = boxes.grid.select(camera_chunk, view_distance)
+
         mega_chunks = [
-            chunk
-            for chunk_key, chunk in context.mega_chunks_vaos.items()
-            if np.linalg.norm(camera_chunk - chunk_key[::2], ord=np.inf) > view_distance
+            select_lod(context, boxes.chunk_keys[i], boxes.vaos[i], distance, view_distance)
+            for i, distance in zip(selection.far.tolist(), selection.far_distances.tolist())
         ]
 
-        for iter, (_, vao, n_blocks) in enumerate(mega_chunks):
+        for iter, (scale, (_, vao, n_blocks, ranges)) in enumerate(mega_chunks):
             if iter != 0:
                 yield False
 
             context.ensure_framebuffer(use_panorama_framebuffer, context)
             context.ensure_program(use_panorama_program, context, frame)
+            glUniform1f(context.panorama_renderer_program.uniform('block_scale'), scale)
 
             glBindVertexArray(vao)
-            glDrawArrays(GL_POINTS, 0, n_blocks)
+            glDrawArrays(GL_POINTS, int(ranges[0, 0]), n_blocks)
 
         context.panorama_position = frame.camera_position
         context.panorama_area = camera_chunk, view_distance
@@ -171,20 +204,91 @@ def render_close_chunks(context, frame):
     context.ensure_framebuffer(use_screen_framebuffer, context)
     context.ensure_program(use_main_program, context, frame)
 
-    mega_chunks = [
-        chunk
-        for chunk_key, chunk in context.mega_chunks_vaos.items()
-        if np.linalg.norm(frame.camera_chunk - chunk_key[::2], ord=np.inf) <= frame.view_distance
-    ]
+    boxes = context.mega_chunks_boxes
+    sizes = boxes.sizes
+
+    close = boxes.grid.select(frame.camera_chunk, frame.view_distance).near
+    in_frustum = view.boxes_in_frustum(view.frustum_planes(frame.projectionview_matrix), boxes.lows[close], boxes.highs[close])
+    visible, culled = close[in_frustum], close[~in_frustum]
+
+    # Directions whose faces all face away from the camera are not submitted.
+    facing = view.facing_directions(frame.camera_position, boxes.lows[visible], boxes.highs[visible])
+    submitted = (boxes.direction_counts[visible] * facing).sum(axis=1)
+
+    context.frame_stats = SimpleNamespace(
+        drawn_chunks=len(visible),
+        culled_chunks=len(culled),
+        drawn_points=int(submitted.sum()),
+        culled_points=int(sizes[culled].sum()),
+        back_face_points=int(sizes[visible].sum() - submitted.sum()),
+    )
+
+    # With multi-draw, mega chunks are drawn with a single call from one
+    # shared buffer, uploaded only when the mode is used for the first time.
+    if context.multi_draw:
+        if context.multi_draw_boxes is None:
+            context.multi_draw_boxes = create_mega_chunks_boxes(context.create_packed_vaos())
+
+        firsts, counts = multi_draw_ranges(context.multi_draw_boxes.ranges[visible], facing)
 
-    for _, vao, n_blocks in mega_chunks:
+        if len(firsts):
+            glBindVertexArray(context.multi_draw_boxes.shared_vao)
+            glMultiDrawArrays(GL_POINTS, firsts, counts, len(firsts))
+
+        return
+
+    for i, chunk_facing in zip(visible.tolist(), facing.tolist()):
+        _, vao, _, ranges = boxes.vaos[i]
         glBindVertexArray(vao)
-        glDrawArrays(GL_POINTS, 0, n_blocks)
+
+        for first, count in merge_ranges(ranges[chunk_facing]):
+            glDrawArrays(GL_POINTS, first, count)
+
+
+def merge_ranges(ranges):
+    # Neighbouring (first, count) ranges are drawn with a single call.
+    first, end = None, None
+
+    for range_first, range_count in ranges.tolist():
+        if range_count == 0:
+            continue
+
+        if first is not None and range_first == end:
+            end += range_count
+            continue
+
+        if first is not None:
+            yield first, end - first
+
+        first, end = range_first, range_first + range_count
+
+    if first is not None:
+        yield first, end - first
 
 ################
 
+def create_mega_chunks_boxes(mega_chunks_vaos):
+    keys = np.array(list(mega_chunks_vaos), dtype=int).reshape(-1, 3)
+    lows, highs = mega_chunk_boxes(keys)
+    vaos = list(mega_chunks_vaos.values())
+
+    return SimpleNamespace(
+        keys=keys,
+        chunk_keys=list(mega_chunks_vaos),
+        grid=MegaChunkGrid(keys),
+        lows=lows,
+        highs=highs,
+        sizes=np.array([n_blocks for _, _, n_blocks, _ in vaos], dtype=np.int64),
+        direction_counts=np.array([ranges[:, 1] for _, _, _, ranges in vaos], dtype=np.int64).reshape(-1, 6),
+        ranges=np.array([ranges for _, _, _, ranges in vaos], dtype=np.int64).reshape(-1, 6, 2),
+        shared_vao=vaos[0][1] if vaos and all(vao == vaos[0][1] for _, vao, _, _ in vaos) else None,
+        vaos=vaos,
+    )
+
+
 def frame_renderer(context):
     advance_panorama_frame = panorama_renderer(context)
+    context.mega_chunks_boxes = create_mega_chunks_boxes(context.mega_chunks_vaos)
 
     while True:
         camera_matrix = view.perspective(context.fov, context.screen_size[0]/context.screen_size[1])
@@ -30,6 +30,7 @@ flat out int texture_idx;
 uniform mat4 projectionview_matrix;
 uniform vec3 sun_direction;
 uniform vec3 camera_position;
+uniform float block_scale;
 
 const float DIFFUSE_FACTOR = 0.4;
 const float AMBIENT_FACTOR = 1.0 - DIFFUSE_FACTOR;
@@ -159,10 +160,11 @@ void main() {
 
     vec3 normal = vec3(direction == 2, direction == 4, direction == 6) - vec3(direction == 1, direction == 3, direction == 5);
 
-    p1 = get_p1(direction);
-    p2 = get_p2(direction);
-    p3 = get_p3(direction);
-    p4 = get_p4(direction);
+    // Blocks of level of detail buffers span block_scale blocks.
+    p1 = block_scale * get_p1(direction);
+    p2 = block_scale * get_p2(direction);
+    p3 = block_scale * get_p3(direction);
+    p4 = block_scale * get_p4(direction);
 
     float diffuse_factor = dot(normal, sun_direction);
     diffuse_factor = (diffuse_factor > 0 ? diffuse_factor * 0.7 + 0.3 : diffuse_factor * 0.3 + 0.3);
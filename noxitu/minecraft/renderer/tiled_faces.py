@@ -0,0 +1,190 @@
+import collections
+import concurrent.futures
+import os
+
+import numpy as np
+
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS, GLOBAL_COLORS_MASK
+
+
+BLOCK_BUFFER_DTYPE = np.dtype([('position', '3int16'), ('direction', 'uint8'), ('color', '3uint8'), ('texture_id', 'int16')])
+
+# (axis, direction) in the order of compute_face_mask, axes are (y, z, x).
+DIRECTIONS = [
+    (2, -1), (2, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 1),
+]
+
+
+def tiles(shape, tile_size):
+    _, sz, sx = shape
+
+    for z0 in range(0, sz, tile_size):
+        for x0 in range(0, sx, tile_size):
+            yield z0, min(z0 + tile_size, sz), x0, min(x0 + tile_size, sx)
+
+
+def _tile_mask(world, z0, z1, x0, x1, colors_mask):
+    sy, sz, sx = world.shape
+
+    # One block of halo, where the world has it.
+    hz0, hz1 = max(z0 - 1, 0), min(z1 + 1, sz)
+    hx0, hx1 = max(x0 - 1, 0), min(x1 + 1, sx)
+    blocks = np.asarray(world[:, hz0:hz1, hx0:hx1])
+
+    # Blocks outside of the world count as solid, because compute_face_mask
+    # does not emit faces on the border of the world.
+    mask = np.ones((sy + 2, z1 - z0 + 2, x1 - x0 + 2), dtype=bool)
+    mask[1:-1, 1+hz0-z0:1+hz1-z0, 1+hx0-x0:1+hx1-x0] = colors_mask[blocks]
+
+    return mask, blocks[:, z0-hz0:z1-hz0, x0-hx0:x1-hx0]
+
+
+def face_bits(mask):
+    # Bit i of a block is set when it has a visible face in DIRECTIONS[i];
+    # mask has one block of padding on every side.
+    inner = mask[1:-1, 1:-1, 1:-1]
+    bits = np.zeros(inner.shape, dtype=np.uint8)
+    visible = np.empty(inner.shape, dtype=bool)
+
+    for i, (axis, direction) in enumerate(DIRECTIONS):
+        neighbour = [slice(1, -1)] * 3
+        neighbour[axis] = slice(1 + direction, mask.shape[axis] - 1 + direction)
+
+        np.greater(inner, mask[tuple(neighbour)], out=visible)
+        bits |= visible.view(np.uint8) << i
+
+    return bits
+
+
+def extract_tile(world, z0, z1, x0, x1, colors_mask=GLOBAL_COLORS_MASK):
+    mask, ids = _tile_mask(world, z0, z1, x0, x1, colors_mask)
+    bits = face_bits(mask)
+
+    faces = []
+
+    for i in range(len(DIRECTIONS)):
+        ys, zs, xs = np.nonzero(bits & (1 << i))
+        faces.append((
+            ys.astype(np.uint8),
+            (zs + z0).astype(np.int16),
+            (xs + x0).astype(np.int16),
+            ids[ys, zs, xs],
+        ))
+
+    return faces
+
+
+def extract_tile_blocks(world, z0, z1, x0, x1, colors_mask=GLOBAL_COLORS_MASK):
+    mask, ids = _tile_mask(world, z0, z1, x0, x1, colors_mask)
+    bits = face_bits(mask)
+
+    # One record per block with any visible face instead of one per face.
+    ys, zs, xs = np.nonzero(bits)
+
+    return ys.astype(np.uint8), (zs + z0).astype(np.int16), (xs + x0).astype(np.int16), ids[ys, zs, xs], bits[ys, zs, xs]
+
+
+def iter_tiles(extract, world, tile_list, workers=None, colors_mask=GLOBAL_COLORS_MASK):
+    if workers is None:
+        workers = os.cpu_count()
+
+    pending = collections.deque()
+
+    # At most two tiles per worker are in flight, so memory depends on the
+    # tile size and the number of workers, but not on the size of the world.
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        for tile in tile_list:
+            pending.append((tile, executor.submit(extract, world, *tile, colors_mask)))
+
+            if len(pending) >= 2 * workers:
+                tile, future = pending.popleft()
+                yield tile, future.result()
+
+        while pending:
+            tile, future = pending.popleft()
+            yield tile, future.result()
+
+
+def iter_faces(world, tile_chunks=8, workers=None, colors_mask=GLOBAL_COLORS_MASK):
+    return iter_tiles(extract_tile, world, tiles(world.shape, 16 * tile_chunks), workers, colors_mask)
+
+
+def iter_face_blocks(world, tile_chunks=8, workers=None, colors_mask=GLOBAL_COLORS_MASK):
+    return iter_tiles(extract_tile_blocks, world, tiles(world.shape, 16 * tile_chunks), workers, colors_mask)
+
+
+def compute_faces_tiled(world, colors=GLOBAL_COLORS, tile_chunks=8, workers=None, tqdm=lambda x: x):
+    parts = [[] for _ in DIRECTIONS]
+    progress = tqdm(list(tiles(world.shape, 16 * tile_chunks)))
+
+    for _, (_, faces) in zip(progress, iter_faces(world, tile_chunks, workers)):
+        for part, face in zip(parts, faces):
+            part.append(face)
+
+    coords = []
+    face_ids = []
+
+    for part in parts:
+        ys, zs, xs, ids = (np.concatenate(values) for values in zip(*part))
+
+        # Tiles cover disjoint blocks, sorting restores the (y, z, x) order of np.where.
+        order = np.lexsort((xs, zs, ys))
+        coords.append((ys[order], zs[order], xs[order]))
+        face_ids.append(ids[order])
+
+    n_faces = sum(len(ids) for ids in face_ids)
+    face_colors = [colors[ids] for ids in face_ids]
+
+    return n_faces, coords, face_colors, face_ids
+
+
+def build_block_buffer(world, texture_mapping, colors=GLOBAL_COLORS, offset=(0, 0, 0), tile_chunks=8, workers=None, tqdm=lambda x: x):
+    parts = []
+    progress = tqdm(list(tiles(world.shape, 16 * tile_chunks)))
+
+    for _, (_, blocks) in zip(progress, iter_face_blocks(world, tile_chunks, workers)):
+        parts.append(blocks)
+
+    ys, zs, xs, ids, bits = (np.concatenate(values) for values in zip(*parts))
+    parts = None
+
+    # Reordered one array at a time, so that only one extra copy is alive.
+    order = np.lexsort((xs, zs, ys))
+    ys = ys[order]
+    zs = zs[order]
+    xs = xs[order]
+    ids = ids[order]
+    bits = bits[order]
+    order = None
+
+    return blocks_to_buffer(ys, zs, xs, ids, bits, texture_mapping, colors, offset)
+
+
+def blocks_to_buffer(ys, zs, xs, ids, bits, texture_mapping, colors=GLOBAL_COLORS, offset=(0, 0, 0), scale=1):
+    counts = [int(np.count_nonzero(bits & (1 << i))) for i in range(len(DIRECTIONS))]
+    buffer = np.zeros(sum(counts), dtype=BLOCK_BUFFER_DTYPE)
+    start = 0
+
+    # Faces are grouped by direction and in (y, z, x) order within a
+    # direction, the same layout as create_face_buffer always produced.
+    for i, count in enumerate(counts):
+        selected = (bits & (1 << i)) != 0
+        face_ids = ids[selected]
+        part = buffer[start:start+count]
+        start += count
+
+        part['position'][:, 0] = xs[selected]
+        part['position'][:, 1] = ys[selected]
+        part['position'][:, 2] = zs[selected]
+        part['direction'] = i + 1
+        part['color'] = colors[face_ids]
+        part['texture_id'] = texture_mapping[face_ids, i]
+
+    if scale != 1:
+        buffer['position'] *= np.int16(scale)
+
+    buffer['position'] += np.asarray(offset, dtype=np.int16)
+
+    return buffer
@@ -40,3 +40,32 @@ def location(pos):
     ret = np.eye(4)
     ret[:3, 3] = -pos
     return ret
+
+
+def frustum_planes(projectionview_matrix):
+    m = projectionview_matrix
+    planes = np.stack([m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]])
+
+    # perspective() has no far plane, its row is all zeros.
+    return planes[np.any(planes[:, :3] != 0, axis=1)]
+
+
+def boxes_in_frustum(planes, lows, highs):
+    # A box is outside when its corner furthest along the normal of any plane
+    # is behind it; tests all boxes against all planes at once.
+    corners = np.where(planes[:, None, :3] >= 0, highs[None], lows[None])
+    distances = np.einsum('pbc,pc->pb', corners, planes[:, :3]) + planes[:, None, 3]
+    return np.all(distances >= 0, axis=0)
+
+
+def facing_directions(camera_position, lows, highs):
+    # Whether faces of each direction (West, East, Bottom, Top, North, South)
+    # inside boxes can face the camera; planes of negative faces lie in
+    # [low, high), of positive faces in (low, high].
+    camera_position = np.asarray(camera_position, dtype=float)
+
+    return np.stack([
+        camera_position[0] < highs[:, 0], camera_position[0] > lows[:, 0],
+        camera_position[1] < highs[:, 1], camera_position[1] > lows[:, 1],
+        camera_position[2] < highs[:, 2], camera_position[2] > lows[:, 2],
+    ], axis=1)
@@ -1,6 +1,5 @@
 import pathlib
 import sys
-from OpenGL.GLU import projection
 
 import numpy as np
 
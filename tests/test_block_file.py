@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import noxitu.minecraft.renderer.block_file as block_file
+from noxitu.minecraft.renderer.block_file import BlockFileWriter, cached_mega_chunks, load_mega_chunks, write_block_file
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE, build_block_buffer
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS_MASK
+
+
+def to_mega_chunk(position):
+    return np.floor(position / 256).astype(int)
+
+
+def compute_mega_chunks(blocks):
+    # The same grouping as renderer.main.compute_mega_chunks.
+    keys = to_mega_chunk(blocks['position'])
+    return {tuple(key): blocks[np.all(keys == key, axis=1)] for key in np.unique(keys, axis=0)}
+
+
+def test_block_file_matches_mega_chunks(tmp_path):
+    random = np.random.RandomState(0)
+    solid = np.nonzero(GLOBAL_COLORS_MASK)[0]
+    world = random.choice(solid, (10, 300, 530)).astype(np.uint16)
+    world[random.rand(*world.shape) < 0.97] = 0
+
+    texture_mapping = random.randint(0, 100, (len(GLOBAL_COLORS_MASK), 6))
+    offset = np.array([-272, 30, 96])
+
+    expected = compute_mega_chunks(build_block_buffer(world, texture_mapping, offset=offset, workers=2))
+    n_blocks = write_block_file(tmp_path / 'output', world, texture_mapping, offset=offset, tile_chunks=5, workers=2)
+    mega_chunks = load_mega_chunks(tmp_path / 'output')
+
+    assert n_blocks == sum(len(blocks) for blocks in expected.values())
+    assert list(mega_chunks) == sorted(expected, key=lambda key: (key[2], key[0]))
+
+    direction_ranges = block_file.load_direction_ranges(tmp_path / 'output')
+
+    for key, blocks in mega_chunks.items():
+        assert isinstance(blocks, np.memmap)
+        assert np.array_equal(np.sort(blocks.view(np.void)), np.sort(expected[key].view(np.void)))
+
+        # Written grouped by direction.
+        ordered, ranges = block_file.split_by_direction(blocks)
+        assert ordered is blocks
+        assert direction_ranges[key].tolist() == ranges.tolist()
+
+
+def test_writer_rejects_split_mega_chunk(tmp_path):
+    blocks = np.zeros(3, dtype=BLOCK_BUFFER_DTYPE)
+
+    with pytest.raises(ValueError):
+        with BlockFileWriter(tmp_path / 'output') as writer:
+            writer.write((0, 0, 0), blocks)
+            writer.write((1, 0, 0), blocks)
+            writer.write((0, 0, 0), blocks)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_index_without_direction_ranges(tmp_path):
+    # Block files written before the ranges were stored.
+    with BlockFileWriter(tmp_path / 'output') as writer:
+        writer.write((0, 0, 0), np.zeros(3, dtype=BLOCK_BUFFER_DTYPE))
+
+    index = np.load(tmp_path / 'output.index.npy')
+    np.save(tmp_path / 'output.index.npy', index[['key', 'offset', 'count']])
+
+    assert list(load_mega_chunks(tmp_path / 'output')) == [(0, 0, 0)]
+    assert block_file.load_direction_ranges(tmp_path / 'output') == {}
+
+
+def test_cached_mega_chunks(tmp_path):
+    random = np.random.RandomState(1)
+    blocks = np.zeros(5000, dtype=BLOCK_BUFFER_DTYPE)
+    blocks['position'] = random.randint(-600, 600, (5000, 3))
+    blocks['position'][:, 1] = random.randint(0, 256, 5000)
+    blocks['texture_id'] = np.arange(5000)
+
+    expected = compute_mega_chunks(blocks)
+    mega_chunks = cached_mega_chunks(lambda: blocks, tmp_path / 'cache', 'first')
+
+    def fail():
+        raise AssertionError('Grouped buffer was not reused.')
+
+    cached = cached_mega_chunks(fail, tmp_path / 'cache', 'first')
+
+    for result in (mega_chunks, cached):
+        assert list(result) == sorted(expected, key=lambda key: (key[2], key[0]))
+
+        for key, value in result.items():
+            assert isinstance(value, np.memmap)
+            assert np.array_equal(np.sort(value['texture_id']), np.sort(expected[key]['texture_id']))
+
+    # A changed source is grouped again.
+    blocks['position'][0] = (1000, 0, 1000)
+    assert (3, 0, 3) in cached_mega_chunks(lambda: blocks, tmp_path / 'cache', 'second')
+
+
+def test_split_by_direction():
+    blocks = np.zeros(10, dtype=BLOCK_BUFFER_DTYPE)
+    blocks['direction'] = [3, 1, 6, 3, 1, 4, 4, 6, 3, 1]
+    blocks['texture_id'] = np.arange(10)
+
+    ordered, ranges = block_file.split_by_direction(blocks)
+
+    assert ordered['direction'].tolist() == [1, 1, 1, 3, 3, 3, 4, 4, 6, 6]
+    assert ordered['texture_id'].tolist() == [1, 4, 9, 0, 3, 8, 5, 6, 2, 7]
+    assert ranges.tolist() == [[0, 3], [3, 0], [3, 3], [6, 2], [8, 0], [8, 2]]
+    assert block_file.split_by_direction(ordered)[0] is ordered
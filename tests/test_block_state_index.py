@@ -0,0 +1,39 @@
+from noxitu.minecraft.map.block_state_index import describe, load_index, palette_key, resolve_palette
+
+
+def test_load_index():
+    index = load_index()
+
+    assert index[b'minecraft:stone', frozenset()] == 1
+    assert index[b'minecraft:oak_log', frozenset({(b'axis', b'x')})] == 73
+    assert index[b'minecraft:oak_log', None] == 74
+    assert load_index() is index
+
+
+def test_resolve_palette():
+    missing = set()
+    palette = [
+        {b'Name': b'minecraft:air'},
+        {b'Name': b'minecraft:oak_log', b'Properties': {b'axis': b'z'}},
+        {b'Name': b'minecraft:grass_block'},
+        # Properties not in blocks.json still match a single state.
+        {b'Name': b'minecraft:grass_block', b'Properties': {b'waterlogged': b'false', b'snowy': b'true'}},
+        {b'Name': b'minecraft:unknown', b'Properties': {b'facing': b'up'}},
+        {b'Name': b'minecraft:water', b'Properties': {b'level': b'99'}},
+    ]
+
+    assert resolve_palette(palette, missing).tolist() == [0, 75, 9, 8, 0, 0]
+    assert missing == {palette_key(palette[4]), palette_key(palette[5])}
+
+
+def test_property_order_is_normalised():
+    entries = [
+        {b'Name': b'minecraft:grass_block', b'Properties': {b'snowy': b'true', b'waterlogged': b'false'}},
+        {b'Name': b'minecraft:grass_block', b'Properties': {b'waterlogged': b'false', b'snowy': b'true'}},
+    ]
+    keys = [palette_key(entry) for entry in entries]
+
+    assert keys[0] == keys[1]
+    assert resolve_palette(entries, set()).tolist() == [8, 8]
+    assert describe(keys[1]) == 'minecraft:grass_block[snowy=true,waterlogged=false]'
+    assert describe((b'minecraft:stone', None)) == 'minecraft:stone'
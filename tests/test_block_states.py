@@ -0,0 +1,53 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+from noxitu.minecraft.map.block_states import SECTION_SIZE, packed_length, unpack_block_states, unpack_long
+
+
+def pack(values, bits, spanning):
+    if spanning:
+        stream = sum(int(value) << (i*bits) for i, value in enumerate(values))
+        return [(stream >> (64*i)) & (2**64 - 1) for i in range(packed_length(bits, True))]
+
+    values_per_long = 64 // bits
+    return [
+        sum(int(value) << (j*bits) for j, value in enumerate(values[i:i+values_per_long]))
+        for i in range(0, len(values), values_per_long)
+    ]
+
+
+def signed(packed):
+    return np.array([value - 2**64 if value >= 2**63 else value for value in packed], dtype='>i8')
+
+
+@pytest.mark.parametrize('bits', range(4, 16))
+def test_compact_matches_generator(bits):
+    values = np.random.RandomState(bits).randint(0, 2**bits, SECTION_SIZE)
+    packed = signed(pack(values, bits, spanning=False))
+
+    expected = [val for long in packed.tolist() for val in unpack_long(long, bits)][:SECTION_SIZE]
+    result = unpack_block_states(packed, bits, spanning=False)
+
+    assert result.dtype == np.uint16
+    assert_array_equal(result.ravel(), expected)
+
+
+@pytest.mark.parametrize('bits', range(4, 16))
+def test_spanning(bits):
+    values = np.random.RandomState(bits).randint(0, 2**bits, SECTION_SIZE)
+    packed = pack(values, bits, spanning=True)
+
+    assert_array_equal(unpack_block_states(packed, bits, spanning=True).ravel(), values)
+    assert_array_equal(unpack_block_states(signed(packed), bits).ravel(), values)
+
+
+def test_palette():
+    palette = np.array([0, 1, 9, 33, 4000])
+    values = np.random.RandomState(0).randint(0, len(palette), SECTION_SIZE)
+    packed = pack(values, 4, spanning=False)
+
+    result = unpack_block_states(np.array(packed, dtype=np.uint64), 4, palette)
+
+    assert result.shape == (16, 16, 16)
+    assert_array_equal(result.ravel(), palette[values])
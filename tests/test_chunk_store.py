@@ -0,0 +1,72 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from noxitu.minecraft.map.chunk_store import ShardedChunkStore, migrate, open_store
+
+
+def random_chunks(seed):
+    random = np.random.RandomState(seed)
+    chunks = {}
+
+    for x, z in [(0, 0), (31, 31), (-1, 5), (-33, -40), (70, 2)]:
+        chunk = np.zeros((16, 4096), dtype=np.uint16)
+        chunk[0] = 1
+        chunk[1] = random.choice([1, 2, 9, 4000], 4096)
+        chunk[2] = random.randint(0, 1000, 4096)
+        chunk[3, ::7] = 17
+        chunks[x, z] = chunk.reshape(256, 16, 16)
+
+    return chunks
+
+
+def test_sharded_round_trip(tmp_path):
+    chunks = random_chunks(0)
+
+    with open_store(tmp_path / 'world', 'a', 'sharded') as store:
+        for (x, z), chunk in chunks.items():
+            store.write_chunk(x, z, chunk)
+
+    store = open_store(tmp_path / 'world')
+
+    assert isinstance(store, ShardedChunkStore)
+    assert sorted(store.chunks()) == sorted(chunks)
+    assert (1, 1) not in store
+
+    for (x, z), chunk in chunks.items():
+        assert_array_equal(store.read_chunk(x, z), chunk)
+
+
+def test_sharded_append(tmp_path):
+    chunks = random_chunks(1)
+    items = list(chunks.items())
+
+    for (x, z), chunk in items:
+        with open_store(tmp_path / 'world', 'a', 'sharded') as store:
+            store.write_chunk(x, z, chunk)
+
+    with open_store(tmp_path / 'world', 'a') as store:
+        (x, z), _ = items[0]
+        store.write_chunk(x, z, np.full((256, 16, 16), 5, dtype=np.uint16))
+        chunks[x, z] = np.full((256, 16, 16), 5, dtype=np.uint16)
+
+    store = open_store(tmp_path / 'world')
+
+    for (x, z), chunk in chunks.items():
+        assert_array_equal(store.read_chunk(x, z), chunk)
+
+
+def test_migrate(tmp_path):
+    chunks = random_chunks(2)
+
+    with open_store(tmp_path / 'chunks', 'a') as store:
+        for (x, z), chunk in chunks.items():
+            store.write_chunk(x, z, chunk)
+
+    migrate(tmp_path / 'chunks', tmp_path / 'world')
+
+    store = open_store(tmp_path / 'world')
+
+    assert sorted(store.chunks()) == sorted(chunks)
+
+    for (x, z), chunk in chunks.items():
+        assert_array_equal(store.read_chunk(x, z), chunk)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.draw_batch import multi_draw_ranges, pack_offsets
+
+
+def test_multi_draw_ranges_matches_drawn_points():
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 5, size=(7, 6))
+    counts[2] = 0
+
+    offsets = pack_offsets(counts.sum(axis=1))
+    ranges = np.stack([offsets[:, None] + np.cumsum(counts, axis=1) - counts, counts], axis=-1)
+    facing = rng.random((7, 6)) < 0.6
+
+    expected = np.zeros(counts.sum(), dtype=bool)
+    for (first, count), draw in zip(ranges.reshape(-1, 2), facing.reshape(-1)):
+        expected[first:first+count] |= draw
+
+    firsts, draw_counts = multi_draw_ranges(ranges, facing)
+
+    drawn = np.zeros(counts.sum(), dtype=int)
+    for first, count in zip(firsts, draw_counts):
+        drawn[first:first+count] += 1
+
+    np.testing.assert_array_equal(drawn, expected)
+    assert np.all(firsts[1:] > firsts[:-1] + draw_counts[:-1])
+    assert firsts.dtype == draw_counts.dtype == np.int32
+
+
+def test_multi_draw_ranges_empty():
+    firsts, counts = multi_draw_ranges(np.zeros((0, 6, 2)), np.zeros((0, 6), dtype=bool))
+    assert len(firsts) == len(counts) == 0
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+from noxitu.minecraft.map.chunk_store import open_store
+from noxitu.minecraft.map.load import load
+from noxitu.minecraft.renderer.face_store import FaceStore, update_face_store
+from noxitu.minecraft.renderer.tiled_faces import build_block_buffer
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS_MASK
+
+
+def random_chunk(random):
+    solid = np.nonzero(GLOBAL_COLORS_MASK)[0]
+    chunk = random.choice(solid, (256, 16, 16)).astype(np.uint16)
+    chunk[random.rand(256, 16, 16) < 0.7] = 0
+    chunk[40:] = 0
+    return chunk
+
+
+def full_build(chunks_path, texture_mapping):
+    offset, world = load(chunks_path, y_range=slice(0, 48))
+    return build_block_buffer(world, texture_mapping, offset=offset[[2, 0, 1]], tile_chunks=2, workers=2)
+
+
+def assert_same_faces(actual, expected):
+    assert len(actual) == len(expected)
+    assert np.array_equal(np.sort(actual.view(np.void)), np.sort(expected.view(np.void)))
+
+
+def test_incremental_update(tmp_path):
+    random = np.random.RandomState(0)
+    texture_mapping = random.randint(0, 100, (len(GLOBAL_COLORS_MASK), 6))
+    chunks_path, faces_path = tmp_path / 'chunks', tmp_path / 'faces'
+
+    with open_store(chunks_path, 'a') as store:
+        for x in range(-3, 20):
+            for z in range(-2, 3):
+                store.write_chunk(x, z, random_chunk(random))
+
+    update = lambda: update_face_store(chunks_path, faces_path, texture_mapping, y_range=slice(0, 48), workers=2)
+
+    assert update() == (23*5, 0)
+    assert_same_faces(FaceStore(faces_path).load(), full_build(chunks_path, texture_mapping))
+
+    assert update() == (0, 0)
+
+    with open_store(chunks_path, 'a') as store:
+        store.write_chunk(5, 0, random_chunk(random))
+        store.write_chunk(16, -2, random_chunk(random))
+
+    assert update() == (5 + 4, 0)
+    assert_same_faces(FaceStore(faces_path).load(), full_build(chunks_path, texture_mapping))
+
+    # Moves the border of the world and removes a chunk.
+    os.remove(chunks_path / '7_1_chunk.npy')
+
+    with open_store(chunks_path, 'a') as store:
+        store.write_chunk(8, 3, random_chunk(random))
+
+    dirty, removed = update()
+
+    assert removed == 1
+    assert dirty < 23*5
+    assert_same_faces(FaceStore(faces_path).load(), full_build(chunks_path, texture_mapping))
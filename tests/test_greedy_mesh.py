@@ -0,0 +1,55 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.greedy_mesh import greedy_quads
+from noxitu.minecraft.renderer.tiled_faces import build_block_buffer, compute_faces_tiled
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS, GLOBAL_COLORS_MASK, compute_faces
+
+
+def terrain(seed):
+    random = np.random.RandomState(seed)
+    solid = np.nonzero(GLOBAL_COLORS_MASK)[0]
+
+    world = np.zeros((24, 40, 40), dtype=np.uint16)
+    world[:8] = solid[0]
+    world[8:12] = solid[1]
+    world[10:12, 5:30, 20:] = solid[2]
+    world[12:20][random.rand(8, 40, 40) < 0.005] = solid[4]
+
+    return world
+
+
+def expand(buffer, extents):
+    # Splits merged quads back into quads of single faces.
+    vertices = buffer['vertices'].astype(np.int64)
+    rows = []
+
+    for quad, colors, (width, height) in zip(vertices, buffer['colors'], extents.tolist()):
+        normal = np.nonzero(np.all(quad == quad[0], axis=0))[0][0]
+        low = quad.min(axis=0)
+        corners = (quad > low).astype(np.int64)
+
+        for du in range(width):
+            for dv in range(height):
+                step = np.zeros(3, dtype=np.int64)
+                step[(normal + 1) % 3] = du
+                step[(normal + 2) % 3] = dv
+                rows.append(np.concatenate([(low + step + corners).ravel(), colors.ravel()]))
+
+    return np.array(rows)
+
+
+def test_greedy_quads_cover_faces():
+    world = terrain(0)
+    texture_mapping = np.zeros((len(GLOBAL_COLORS_MASK), 6), dtype=np.int16)
+
+    _, coords, colors, _ = compute_faces_tiled(world, GLOBAL_COLORS, tile_chunks=1, workers=1)
+    pts, pts_colors = compute_faces(coords, colors)
+    expected = np.concatenate([pts.reshape(-1, 12), pts_colors.reshape(-1, 12)], axis=1)
+
+    buffer, extents = greedy_quads(build_block_buffer(world, texture_mapping, tile_chunks=1, workers=1))
+    actual = expand(buffer, extents)
+
+    assert len(buffer) < len(expected) / 4
+    assert extents.max() <= 16
+    assert np.array_equal(np.unique(actual, axis=0), np.unique(expected, axis=0))
+    assert len(actual) == len(expected)
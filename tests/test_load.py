@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from noxitu.minecraft.map.chunk_store import INDEX_NAME, open_store, write_index
+from noxitu.minecraft.map.load import load, load_lazy
+
+
+def write_world(path):
+    random = np.random.RandomState(0)
+
+    with open_store(path, 'a', 'sharded') as store:
+        for x, z in [(0, 0), (2, 1), (-1, 3), (1, 1)]:
+            store.write_chunk(x, z, random.randint(0, 50, (256, 16, 16)))
+
+
+def test_lazy_matches_load(tmp_path):
+    write_world(tmp_path / 'world')
+
+    offset, world = load(tmp_path / 'world', y_range=slice(10, 60))
+    lazy_offset, lazy = load_lazy(tmp_path / 'world', y_range=slice(10, 60), cache_bytes=16*1024)
+
+    assert_array_equal(lazy_offset, offset)
+    assert lazy.shape == world.shape
+
+    keys = [
+        (slice(None), slice(3, 40), slice(5, 60)),
+        (slice(None, None, -3), slice(60, 2, -7), 17),
+        (5, ...),
+        (..., slice(-20, None)),
+    ]
+
+    for key in keys:
+        assert_array_equal(lazy[key], world[key])
+
+    points = np.array([[0, 49, 3], [0, 5, 63], [12, 18, 33]])
+    assert_array_equal(lazy[points[0], points[1], points[2]], world[points[0], points[1], points[2]])
+
+    zs, xs = np.array([[49, 5], [18, 0]]), np.array([3, 63])
+    mask = np.zeros(world.shape[1:], dtype=bool)
+    mask[points[1], points[2]] = True
+
+    for key in [(slice(None), zs, xs), (slice(40, 2, -3), zs, 17), (points[0], slice(None), xs[0]), (zs[0], ..., xs), (slice(None), mask), (world.shape[0] * [False],)]:
+        assert_array_equal(lazy[key], world[key])
+
+    with pytest.raises(IndexError):
+        lazy[:, mask[:-1]]
+
+    assert_array_equal(lazy.materialize(), world)
+
+    mapped = lazy.materialize(tmp_path / 'world.npy')
+    assert isinstance(mapped, np.memmap)
+    assert_array_equal(mapped, world)
+
+    with pytest.raises(ValueError):
+        np.asarray(lazy)
+
+    _, small = load_lazy(tmp_path / 'world', y_range=slice(10, 60))
+    assert_array_equal(np.asarray(small), world)
+
+
+def test_load_uses_index(tmp_path):
+    write_world(tmp_path / 'world')
+    offset, world = load(tmp_path / 'world', x_range=slice(0, 3))
+
+    with open_store(tmp_path / 'world') as store:
+        write_index(store)
+
+    assert (tmp_path / 'world' / INDEX_NAME).exists()
+
+    indexed_offset, indexed = load(tmp_path / 'world', x_range=slice(0, 3), workers=3)
+
+    assert_array_equal(indexed_offset, offset)
+    assert_array_equal(indexed, world)
+
+    # Writing a chunk invalidates the index, so the new chunk is loaded.
+    with open_store(tmp_path / 'world', 'a') as store:
+        store.write_chunk(1, 0, np.ones((256, 16, 16)))
+
+    assert not (tmp_path / 'world' / INDEX_NAME).exists()
+
+    _, updated = load(tmp_path / 'world', x_range=slice(0, 3), workers=3)
+    world[:, 0:16, 16:32] = 1
+
+    assert_array_equal(updated, world)
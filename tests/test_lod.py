@@ -0,0 +1,66 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.block_file import load_mega_chunks
+from noxitu.minecraft.renderer.lod import DownsampledWorld, downsample, lod_path, write_lod_block_files
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS_MASK
+
+
+SOLID = np.nonzero(GLOBAL_COLORS_MASK)[0]
+TRANSPARENT = np.nonzero(~GLOBAL_COLORS_MASK)[0]
+
+
+def test_downsample_picks_top_visible_block():
+    blocks = np.zeros((4, 4, 4), dtype=np.uint16)
+    blocks[0, 0, 0] = SOLID[0]
+    blocks[1, 1, 0] = SOLID[1]
+    blocks[1, 0, 1] = SOLID[2]
+    blocks[3, 0, 0] = TRANSPARENT[1]
+    blocks[2:, 2:, 2:] = SOLID[3]
+    blocks[3, 3, 3] = SOLID[4]
+
+    result = downsample(blocks, 2)
+
+    assert result.shape == (2, 2, 2)
+    assert result[0, 0, 0] == SOLID[2]
+    assert result[1, 1, 1] == SOLID[3]
+    assert result[1, 0, 0] == 0
+    assert np.count_nonzero(result) == 2
+
+
+def test_downsampled_world_tiles():
+    random = np.random.RandomState(0)
+    world = random.choice(SOLID, (30, 48, 64)).astype(np.uint16)
+    world[random.rand(*world.shape) < 0.8] = 0
+
+    for factor in (2, 4, 8):
+        lod = DownsampledWorld(world, factor)
+        expected = downsample(world, factor)
+
+        assert lod.shape == expected.shape
+        assert np.array_equal(lod[:, 1:5, 2:7], expected[:, 1:5, 2:7])
+        assert np.array_equal(np.asarray(lod), expected)
+
+
+def test_lod_block_files(tmp_path):
+    random = np.random.RandomState(1)
+    world = np.zeros((40, 64, 320), dtype=np.uint16)
+    world[:20] = SOLID[0]
+    world[20:25][random.rand(5, 64, 320) < 0.3] = SOLID[1]
+
+    texture_mapping = np.zeros((len(GLOBAL_COLORS_MASK), 6), dtype=np.int16)
+    offset = np.array([-32, 2, 16])
+
+    n_blocks = write_lod_block_files(tmp_path / 'output', world, texture_mapping, offset=offset, workers=2)
+
+    for factor in (2, 4, 8):
+        mega_chunks = load_mega_chunks(lod_path(tmp_path / 'output', factor))
+        positions = np.concatenate([blocks['position'] for blocks in mega_chunks.values()])
+
+        assert sorted(mega_chunks) == [(-1, 0, 0), (0, 0, 0), (1, 0, 0)]
+        assert len(positions) == n_blocks[factor]
+        assert np.all((positions - offset) % factor == 0)
+
+        for key, blocks in mega_chunks.items():
+            assert np.all(np.floor(blocks['position'] / 256).astype(int) == key)
+
+    assert n_blocks[8] < n_blocks[4] < n_blocks[2]
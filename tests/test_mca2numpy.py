@@ -0,0 +1,119 @@
+import json
+import struct
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from noxitu.minecraft.map.chunk_store import INDEX_NAME, open_store
+from noxitu.minecraft.map.mca2numpy import convert_region, convert_world
+
+from test_region import write_region
+
+
+def named(tag, name, payload):
+    return struct.pack('>bH', tag, len(name)) + name + payload
+
+
+def string(value):
+    return struct.pack('>H', len(value)) + value
+
+
+def compound(*entries):
+    return b''.join(entries) + b'\x00'
+
+
+def palette_entry(name, properties=None):
+    entries = [named(0x08, b'Name', string(name))]
+
+    if properties is not None:
+        entries.append(named(0x0a, b'Properties', compound(*[named(0x08, key, string(value)) for key, value in properties])))
+
+    return compound(*entries)
+
+
+def section_nbt(y, palette, values):
+    # Four bits per block, sixteen blocks per long.
+    longs = (values.reshape(-1, 16).astype(np.uint64) << (4 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+
+    return compound(
+        named(0x01, b'Y', struct.pack('>b', y)),
+        named(0x09, b'Palette', struct.pack('>bi', 0x0a, len(palette)) + b''.join(palette)),
+        named(0x0c, b'BlockStates', struct.pack('>i', len(longs)) + longs.astype('>u8').tobytes()),
+    )
+
+
+PALETTE = [
+    palette_entry(b'minecraft:air'),
+    palette_entry(b'minecraft:stone'),
+    palette_entry(b'minecraft:oak_log', [(b'axis', b'z')]),
+    palette_entry(b'minecraft:unknown_block'),
+]
+PALETTE_IDS = np.array([0, 1, 75, 0])
+
+
+def chunk_nbt(x, z, values):
+    level = compound(
+        named(0x03, b'xPos', struct.pack('>i', x)),
+        named(0x03, b'zPos', struct.pack('>i', z)),
+        named(0x09, b'Sections', struct.pack('>bi', 0x0a, 2) + section_nbt(-1, PALETTE, values) + section_nbt(3, PALETTE, values)),
+    )
+
+    return named(0x0a, b'', named(0x0a, b'Level', level) + b'\x00')
+
+
+def write_save(directory):
+    # write_region places r.1.-1.mca chunks at (32 + local_x, -32 + local_z).
+    random = np.random.RandomState(0)
+    chunks = {}
+    expected = {}
+
+    for local_x, local_z in [(0, 0), (5, 2), (31, 31)]:
+        values = random.randint(0, len(PALETTE), 4096)
+        chunks[local_x, local_z] = (2, False, chunk_nbt(32 + local_x, -32 + local_z, values))
+
+        chunk = np.zeros((16, 4096), dtype=np.uint16)
+        chunk[3] = PALETTE_IDS[values]
+        expected[32 + local_x, -32 + local_z] = chunk.reshape(256, 16, 16)
+
+    write_region(directory, chunks)
+    return expected
+
+
+def test_convert_region(tmp_path):
+    expected = write_save(tmp_path)
+
+    name, converted, skipped, _, missing = convert_region(str(tmp_path / 'r.1.-1.mca'), str(tmp_path / 'chunks'), x_range=slice(0, 40))
+
+    assert (name, converted, skipped) == ('r.1.-1.mca', 2, 0)
+    assert missing == {(b'minecraft:unknown_block', None)}
+
+    with open_store(tmp_path / 'chunks') as store:
+        assert sorted(store.chunks()) == [(32, -32), (37, -30)]
+
+        for x, z in store.chunks():
+            assert_array_equal(store.read_chunk(x, z), expected[x, z])
+
+    # Converted chunks are skipped.
+    assert convert_region(str(tmp_path / 'r.1.-1.mca'), str(tmp_path / 'chunks'))[1:3] == (1, 2)
+
+
+def test_convert_world(tmp_path):
+    (tmp_path / 'region').mkdir()
+    expected = write_save(tmp_path / 'region')
+    (tmp_path / 'broken').mkdir()
+    write_region(tmp_path / 'broken', {(0, 0): (3, False, b'not nbt')}).rename(tmp_path / 'region' / 'r.5.5.mca')
+
+    unknown, missing, failed = convert_world(str(tmp_path / 'region'), str(tmp_path / 'world'), z_range=slice(-40, 200),
+                                             format='sharded', processes=1)
+
+    assert failed == ['r.5.5.mca']
+    assert missing == {(b'minecraft:unknown_block', None)}
+
+    with open(tmp_path / 'world' / INDEX_NAME) as fd:
+        assert json.load(fd)['chunks'] == sorted(map(list, expected))
+
+    with open_store(tmp_path / 'world') as store:
+        assert store.format == 'sharded'
+
+        for (x, z), chunk in expected.items():
+            assert_array_equal(store.read_chunk(x, z), chunk)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from noxitu.minecraft.renderer.mega_chunk_grid import MegaChunkGrid
+
+
+def test_select_matches_distances():
+    rng = np.random.default_rng(0)
+    xz = rng.choice(np.stack(np.meshgrid(np.arange(-7, 9), np.arange(-5, 12)), axis=-1).reshape(-1, 2), 150, replace=False)
+    keys = np.stack([xz[:, 0], np.zeros(len(xz), dtype=int), xz[:, 1]], axis=1)
+
+    grid = MegaChunkGrid(keys)
+
+    for camera_chunk, view_distance in [((0, 0), 2), ((-20, 3), 4), ((8, 11), 0), ((1, 2), 30)]:
+        selection = grid.select(np.array(camera_chunk), view_distance)
+        distances = np.abs(xz - camera_chunk).max(axis=1)
+
+        np.testing.assert_array_equal(selection.near, np.nonzero(distances <= view_distance)[0])
+        np.testing.assert_array_equal(selection.far, np.nonzero(distances > view_distance)[0])
+        np.testing.assert_array_equal(selection.far_distances, distances[distances > view_distance])
+
+
+def test_select_is_cached():
+    grid = MegaChunkGrid([(0, 0, 0), (3, 0, 1)])
+
+    first = grid.select(np.array([0, 0]), 1)
+    assert grid.select(np.array([0, 0]), 1) is first
+    assert grid.select(np.array([0, 0]), 2) is not first
@@ -0,0 +1,85 @@
+import struct
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+import noxitu.minecraft.protocol.nbt as nbt
+
+
+def named(tag, name, payload):
+    return struct.pack('>bH', tag, len(name)) + name + payload
+
+
+def chunk_nbt():
+    section = b''.join([
+        named(0x01, b'Y', struct.pack('>b', -1)),
+        named(0x0c, b'BlockStates', struct.pack('>i3q', 3, -1, 0, 2**40)),
+        named(0x07, b'BlockLight', struct.pack('>i4b', 4, -128, 0, 1, 127)),
+        b'\x00',
+    ])
+
+    level = b''.join([
+        named(0x03, b'xPos', struct.pack('>i', -7)),
+        named(0x0b, b'Biomes', struct.pack('>i2i', 2, 1, -2)),
+        named(0x09, b'Sections', struct.pack('>bi', 0x0a, 2) + section + section),
+        named(0x09, b'Pos', struct.pack('>bi3d', 0x06, 3, 0.5, 1.5, 2.5)),
+        named(0x08, b'Status', struct.pack('>H', 4) + b'full'),
+        b'\x00',
+    ])
+
+    return named(0x0a, b'', named(0x0a, b'Level', level) + b'\x00')
+
+
+def test_parse_fast():
+    buffer = chunk_nbt()
+    value, offset = nbt.parse_fast(buffer)
+
+    assert offset == len(buffer)
+
+    level = value[b''][b'Level']
+    assert level[b'xPos'] == -7
+    assert level[b'Status'] == b'full'
+    assert level[b'Pos'] == [0.5, 1.5, 2.5]
+
+    section = level[b'Sections'][1]
+    assert section[b'Y'] == -1
+    assert section[b'BlockStates'].dtype == np.dtype('>i8')
+    assert_array_equal(section[b'BlockStates'], [-1, 0, 2**40])
+    assert_array_equal(section[b'BlockLight'], [-128, 0, 1, 127])
+    assert_array_equal(level[b'Biomes'], [1, -2])
+
+
+def test_parse_fast_arrays_are_views():
+    buffer = chunk_nbt()
+    value, _ = nbt.parse_fast(buffer)
+
+    block_states = value[b''][b'Level'][b'Sections'][0][b'BlockStates']
+    assert block_states.base is not None
+    assert not block_states.flags.writeable
+
+
+def test_parse_matches_fast_parser():
+    buffer = chunk_nbt()
+
+    reference, reference_offset = nbt.parse(buffer)
+    value, offset = nbt.parse_fast(buffer)
+
+    assert offset == reference_offset
+    assert value[b''][b'Level'][b'Biomes'].tolist() == reference[b''][b'Level'][b'Biomes']
+    assert value[b''][b'Level'][b'Sections'][0][b'BlockStates'].tolist() == reference[b''][b'Level'][b'Sections'][0][b'BlockStates']
+
+
+def test_parse_fast_include():
+    buffer = chunk_nbt()
+    value, offset = nbt.parse_fast(buffer, include=['Level.xPos', 'Level.Sections.Y', 'Level.Missing'])
+
+    assert offset == len(buffer)
+    assert value == {b'': {b'Level': {b'xPos': -7, b'Sections': [{b'Y': -1}, {b'Y': -1}]}}}
+
+
+def test_parse_fast_include_nothing():
+    buffer = chunk_nbt() + b'tail'
+    value, offset = nbt.parse_fast(buffer, include=())
+
+    assert value == {b'': {}}
+    assert offset == len(buffer) - 4
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from noxitu.minecraft.raycaster.core import load_library, raycast_native, raycast_numpy, set_num_threads
+
+
+def synthetic_scene(seed=0):
+    rng = np.random.default_rng(seed)
+
+    world = np.zeros((24, 20, 28), dtype=np.uint16)
+    heights = rng.integers(2, 16, size=(20, 28))
+    world[np.arange(24).reshape(-1, 1, 1) < heights] = rng.integers(1, 6, size=world.shape)[np.arange(24).reshape(-1, 1, 1) < heights]
+    world[rng.random(world.shape) < 0.02] = 7
+
+    mask = np.array([0, 1, 1, 1, 0, 1, 1, 1], dtype=bool)
+
+    n_rays = 3000
+    origins = rng.uniform([-8, 0, -8], [36, 30, 28], size=(n_rays, 3))
+    directions = rng.normal(size=(n_rays, 3))
+    directions[np.arange(200), rng.integers(0, 3, size=200)] = 0
+    directions[200:300] = [[0, -1, 0]]
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+    rays = np.concatenate([origins, directions], axis=1).reshape(60, 50, 6)
+
+    return rays, world, mask
+
+
+def test_numpy_hits_block_below():
+    world = np.zeros((4, 3, 3), dtype=np.uint16)
+    world[0, 1, 1] = 3
+
+    ids, depths, normal_idx = raycast_numpy(np.array([[1.5, 3.5, 1.5, 0, -1, 0]]), world, np.array([0, 0, 0, 1], dtype=bool))
+
+    assert ids.tolist() == [3]
+    assert depths.tolist() == [2.5]
+    assert normal_idx.tolist() == [4]
+
+
+@pytest.mark.skipif(load_library() is None, reason='raycaster library is not built')
+def test_numpy_matches_native():
+    rays, world, mask = synthetic_scene()
+
+    expected = raycast_native(rays, world, mask)
+    actual = raycast_numpy(rays, world, mask)
+
+    assert np.count_nonzero(expected[0]) > 500
+
+    try:
+        set_num_threads(1)
+        single_threaded = raycast_native(rays, world, mask)
+    finally:
+        set_num_threads(None)
+
+    for expected_array, single_threaded_array in zip(expected, single_threaded):
+        np.testing.assert_array_equal(single_threaded_array, expected_array)
+
+    for expected_array, actual_array in zip(expected, actual):
+        assert expected_array.shape == actual_array.shape == rays.shape[:-1]
+        np.testing.assert_array_equal(actual_array, expected_array)
+
+
+@pytest.mark.skipif(load_library() is None, reason='raycaster library is not built')
+def test_accelerated_matches_voxel_by_voxel():
+    rng = np.random.default_rng(1)
+
+    world = np.zeros((70, 60, 75), dtype=np.uint16)
+    world[np.arange(70).reshape(-1, 1, 1) < rng.integers(5, 20, size=(60, 75))] = 1
+    world[rng.random(world.shape) < 0.0005] = 2
+    world[40:44, 30:34, 50:60] = 3
+    mask = np.array([0, 1, 1, 1], dtype=bool)
+
+    origins = np.floor(rng.uniform([-20, 0, -20], [95, 80, 80], size=(20000, 3)))
+    directions = rng.normal(size=(20000, 3))
+    directions[:2000, 1] = 0
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    rays = np.concatenate([origins, directions], axis=1)
+
+    expected = raycast_native(rays, world, mask, accelerate=False)
+    actual = raycast_native(rays, world, mask)
+
+    assert np.count_nonzero(expected[0]) > 2000
+
+    for expected_array, actual_array in zip(expected, actual):
+        np.testing.assert_array_equal(actual_array, expected_array)
+
+
+def test_float32_rays_hit_same_blocks():
+    from noxitu.minecraft.raycaster.core import raycast
+    from noxitu.minecraft.raycaster.rays import compute_shadow_rays, create_camera_rays
+    import noxitu.minecraft.renderer.view as view
+
+    size = 160
+    z, x = np.mgrid[:size, :size] / size * 2 * np.pi
+    heights = (30 + 6 * np.sin(3 * x) * np.cos(2 * z) + 3 * np.sin(7 * z + x)).astype(int)
+
+    world = np.zeros((64, size, size), dtype=np.uint16)
+    world[np.arange(64).reshape(-1, 1, 1) < heights] = 1
+    world[np.random.default_rng(0).random(world.shape) < 0.001] = 2
+    mask = np.array([0, 1, 1], dtype=bool)
+
+    viewport = dict(position=np.array([80.5, 50.3, 20.7]), rotation=view.view(180, -25, 0)[:3, :3],
+                    camera=view.perspective(80, 4 / 3)[:3, :3], resolution=(90, 120), offset=np.zeros(3))
+    rays64 = create_camera_rays(**viewport)
+    rays32 = create_camera_rays(**viewport, dtype=np.float32)
+
+    ids64, depths64, _ = raycast(rays64, world, mask)
+    ids32, depths32, _ = raycast(rays32, world, mask)
+
+    assert rays32.dtype == depths32.dtype == np.float32
+    assert np.count_nonzero(ids64) > 0.5 * ids64.size
+    assert np.mean(ids32 != ids64) < 1e-3
+    np.testing.assert_allclose(depths32[ids32 == ids64], depths64[ids32 == ids64], rtol=1e-5, atol=1e-4)
+
+    hit = ids64 != 0
+    sun = np.array([1, 3, -3]) / np.sqrt(19)
+    shadow32 = compute_shadow_rays(rays32[hit], depths32[hit], sun)
+    shadows64, _, _ = raycast(compute_shadow_rays(rays64[hit], depths64[hit], sun), world, mask)
+    shadows32, _, _ = raycast(shadow32, world, mask)
+
+    assert shadow32.dtype == np.float32
+    assert np.mean(shadows32 != shadows64) < 1e-3
+
+
+def test_camera_rays_match_explicit_rays():
+    from noxitu.minecraft.raycaster.core import raycast, raycast_camera
+    from noxitu.minecraft.raycaster.rays import CameraRays, create_camera_rays
+    import noxitu.minecraft.renderer.view as view
+
+    _, world, mask = synthetic_scene()
+    viewport = dict(position=np.array([14.3, 26.1, -5.2]), rotation=view.view(170, -30, 0)[:3, :3],
+                    camera=view.perspective(80, 4 / 3)[:3, :3], resolution=(60, 80), offset=np.zeros(3), tile=(8, 50, 16, 70))
+
+    camera = CameraRays(**viewport)
+    rays = np.asarray(camera)
+    np.testing.assert_allclose(rays, create_camera_rays(**viewport), atol=1e-12)
+
+    hit_mask = np.random.default_rng(0).random(camera.shape[:2]) < 0.3
+    np.testing.assert_array_equal(camera[hit_mask], rays[hit_mask])
+    np.testing.assert_array_equal(camera[hit_mask, 3:], rays[hit_mask, 3:])
+
+    expected = raycast(rays, world, mask)
+    actual = raycast_camera(camera, world, mask)
+
+    assert np.count_nonzero(expected[0]) > 0.3 * expected[0].size
+
+    for expected_array, actual_array in zip(expected, actual):
+        np.testing.assert_array_equal(actual_array, expected_array)
+
+    ids32, depths32, _ = raycast_camera(CameraRays(**viewport, dtype=np.float32), world, mask)
+    np.testing.assert_array_equal(ids32, expected[0])
+    np.testing.assert_array_equal(depths32, expected[1].astype(np.float32))
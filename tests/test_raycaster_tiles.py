@@ -0,0 +1,36 @@
+import numpy as np
+
+from noxitu.minecraft.raycaster.rays import create_camera_rays
+from noxitu.minecraft.raycaster.tiles import render_tiled, screen_tiles, tile_size_for_budget
+
+
+def test_tile_size_fits_budget():
+    size = tile_size_for_budget((4320, 7680), memory_budget=2**30, bytes_per_pixel=512, workers=4)
+
+    assert size % 16 == 0
+    assert 4 * size**2 * 512 <= 2**30
+    assert tile_size_for_budget((100, 60), memory_budget=2**40, bytes_per_pixel=512) == 100
+
+
+def test_screen_tiles_cover_image():
+    covered = np.zeros((70, 45), dtype=int)
+
+    for y0, y1, x0, x1 in screen_tiles(covered.shape, 16):
+        covered[y0:y1, x0:x1] += 1
+
+    assert np.all(covered == 1)
+
+
+def test_render_tiled_assembles_tiles():
+    shape = 90, 130
+    rays = create_camera_rays(position=np.array([10., 80., 20.]), rotation=np.eye(3), camera=np.diag([1.2, 0.8, 1.]),
+                              resolution=shape, offset=np.zeros(3))
+
+    def render_tile(tile):
+        tile_rays = create_camera_rays(position=np.array([10., 80., 20.]), rotation=np.eye(3), camera=np.diag([1.2, 0.8, 1.]),
+                                       resolution=shape, offset=np.zeros(3), tile=tile)
+        return (tile_rays[..., 3:] * 100 + 100).astype(np.uint8)
+
+    for workers in [1, 3]:
+        image = render_tiled(render_tile, shape, memory_budget=3 * 32**2 * 64, bytes_per_pixel=64, workers=workers)
+        np.testing.assert_array_equal(image, (rays[..., 3:] * 100 + 100).astype(np.uint8))
@@ -0,0 +1,65 @@
+import gzip
+import struct
+import zlib
+
+import pytest
+
+from noxitu.minecraft.map.region import RegionFile
+
+
+COMPRESSIONS = {1: gzip.compress, 2: zlib.compress, 3: bytes}
+
+
+def write_region(directory, chunks):
+    header = bytearray(8192)
+    body = bytearray()
+
+    for (local_x, local_z), (compression, external, payload) in chunks.items():
+        i = local_x + 32*local_z
+        data = COMPRESSIONS[compression](payload)
+
+        if external:
+            x, z = 32 + local_x, -32 + local_z
+            (directory / f'c.{x}.{z}.mcc').write_bytes(data)
+            sector = struct.pack('>iB', 1, compression | 0x80)
+        else:
+            sector = struct.pack('>iB', len(data) + 1, compression) + data
+
+        sector += b'\0' * (-len(sector) % 4096)
+
+        header[4*i:4*i+4] = struct.pack('>I', ((2 + len(body)//4096) << 8) | (len(sector)//4096))
+        header[4096+4*i:4096+4*i+4] = struct.pack('>I', 1000 + i)
+        body += sector
+
+    path = directory / 'r.1.-1.mca'
+    path.write_bytes(bytes(header + body))
+    return path
+
+
+def test_read_chunks(tmp_path):
+    chunks = {
+        (0, 0): (2, False, b'zlib' * 3000),
+        (5, 1): (1, False, b'gzip'),
+        (31, 31): (3, False, b'none'),
+        (7, 3): (2, True, b'external' * 100000),
+    }
+
+    with RegionFile(write_region(tmp_path, chunks)) as region:
+        assert sorted(region.chunks()) == sorted(chunks)
+        assert (1, 1) not in region
+        assert region.global_coords(5, 1) == (37, -31)
+        assert region.timestamp(5, 1) == 1000 + 5 + 32
+
+        for (local_x, local_z), (_, _, payload) in chunks.items():
+            assert region.read(local_x, local_z) == payload
+
+        with pytest.raises(KeyError):
+            region.read(1, 1)
+
+
+def test_empty_region(tmp_path):
+    path = tmp_path / 'r.0.0.mca'
+    path.write_bytes(b'')
+
+    with RegionFile(path) as region:
+        assert region.chunks() == []
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from noxitu.minecraft.renderer.block_file import BlockFileWriter
+from noxitu.minecraft.renderer.face_store import MANIFEST_NAME
+from noxitu.minecraft.renderer.io import block_buffer_source, load_lod_mega_chunks, load_mega_chunks
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE
+
+
+def test_newest_block_buffer_is_used(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/block_buffers/chunks')
+
+    with pytest.raises(FileNotFoundError):
+        block_buffer_source()
+
+    for path in ['data/block_buffers/output', 'data/block_buffers/output.lod2']:
+        with BlockFileWriter(path) as writer:
+            writer.write((0, 0, 0), np.zeros(2, dtype=BLOCK_BUFFER_DTYPE))
+
+    assert block_buffer_source() == 'blocks'
+    assert list(load_lod_mega_chunks()) == [2]
+
+    # An incremental run after the full one.
+    with open(os.path.join('data/block_buffers/chunks', MANIFEST_NAME), 'w') as fd:
+        fd.write('{}')
+
+    for path in ['output.blocks', 'output.index.npy', 'output.lod2.blocks', 'output.lod2.index.npy']:
+        os.utime(os.path.join('data/block_buffers', path), (1e9, 1e9))
+
+    assert block_buffer_source() == 'chunks'
+    assert load_lod_mega_chunks() == {}
+
+    np.savez('data/block_buffers/output.npz', buffer=np.zeros(0, dtype=BLOCK_BUFFER_DTYPE))
+    os.utime(os.path.join('data/block_buffers/chunks', MANIFEST_NAME), (1e9, 1e9))
+    assert block_buffer_source() == 'npz'
+
+
+def test_restored_npz_is_grouped_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/block_buffers')
+
+    def save(x):
+        blocks = np.zeros(3, dtype=BLOCK_BUFFER_DTYPE)
+        blocks['position'][:, 0] = x
+        np.savez('data/block_buffers/output.npz', buffer=blocks)
+        os.utime('data/block_buffers/output.npz', (1e9, 1e9))
+
+    save(0)
+    assert list(load_mega_chunks()[0]) == [(0, 0, 0)]
+
+    save(300)
+    assert list(load_mega_chunks()[0]) == [(1, 0, 0)]
+
+    # Restoring an older buffer, even older than the grouped one.
+    save(0)
+    assert list(load_mega_chunks()[0]) == [(0, 0, 0)]
@@ -0,0 +1,80 @@
+import numpy as np
+
+from noxitu.minecraft.map.chunk_store import open_store
+from noxitu.minecraft.map.load import load_lazy
+from noxitu.minecraft.renderer.tiled_faces import BLOCK_BUFFER_DTYPE, build_block_buffer, compute_faces_tiled
+from noxitu.minecraft.renderer.world_faces import GLOBAL_COLORS, GLOBAL_COLORS_MASK, compute_face_colors, compute_face_ids, compute_face_mask
+
+
+def random_world(shape, seed):
+    random = np.random.RandomState(seed)
+    solid = np.nonzero(GLOBAL_COLORS_MASK)[0]
+    world = random.choice(solid, shape).astype(np.uint16)
+    world[random.rand(*shape) < 0.6] = 0
+    return world
+
+
+def assert_same_faces(world, tiled_world, **kwargs):
+    n_faces, coords = compute_face_mask(world)
+    colors = compute_face_colors(coords, world, GLOBAL_COLORS)
+    ids = compute_face_ids(coords, world)
+
+    tiled_n_faces, tiled_coords, tiled_colors, tiled_ids = compute_faces_tiled(tiled_world, **kwargs)
+
+    assert tiled_n_faces == n_faces
+
+    for expected, actual in zip(coords, tiled_coords):
+        for e, a in zip(expected, actual):
+            assert a.dtype == e.dtype
+            assert a.tobytes() == e.tobytes()
+
+    for expected, actual in zip(colors + ids, tiled_colors + tiled_ids):
+        assert actual.dtype == expected.dtype
+        assert actual.tobytes() == expected.tobytes()
+
+
+def test_tiled_faces_match():
+    world = random_world((40, 53, 70), 0)
+
+    assert_same_faces(world, world, tile_chunks=1, workers=3)
+    assert_same_faces(world, world, tile_chunks=2, workers=1)
+    assert_same_faces(world[:, :10, :7], world[:, :10, :7], tile_chunks=1, workers=2)
+
+
+def test_tiled_faces_lazy_world(tmp_path):
+    chunks = random_world((256, 32, 48), 1)
+
+    with open_store(tmp_path / 'world', 'a', 'sharded') as store:
+        for z in range(2):
+            for x in range(3):
+                if (x, z) != (1, 1):
+                    store.write_chunk(x - 1, z, chunks[:, 16*z:16*z+16, 16*x:16*x+16])
+
+    _, lazy = load_lazy(tmp_path / 'world', y_range=slice(0, 100), cache_bytes=0)
+    assert_same_faces(lazy.materialize(), lazy, tile_chunks=1, workers=2)
+
+
+def test_block_buffer_matches():
+    world = random_world((30, 40, 50), 2)
+    texture_mapping = np.random.RandomState(3).randint(-1, 300, (len(GLOBAL_COLORS_MASK), 6))
+    offset = np.array([-100, 5, 40])
+
+    _, coords = compute_face_mask(world)
+    colors = compute_face_colors(coords, world, GLOBAL_COLORS)
+    ids = compute_face_ids(coords, world)
+
+    expected = np.zeros(sum(len(i) for i in ids), dtype=BLOCK_BUFFER_DTYPE)
+    start = 0
+
+    for i, (ys, zs, xs) in enumerate(coords):
+        part = expected[start:start+len(ys)]
+        start += len(ys)
+        part['position'] = np.stack([xs, ys, zs], axis=1) + offset
+        part['direction'] = i + 1
+        part['color'] = colors[i]
+        part['texture_id'] = texture_mapping[ids[i], i]
+
+    buffer = build_block_buffer(world, texture_mapping, GLOBAL_COLORS, offset, tile_chunks=1, workers=2)
+
+    assert buffer.dtype == expected.dtype
+    assert buffer.tobytes() == expected.tobytes()
@@ -54,4 +54,28 @@ def test_view_down_with_yaw():
 def test_view_down_with_roll():
     print('path = ', sys.path)
     rotation_matrix = noxitu.minecraft.renderer.view.view(0, -90, -90)
-    assert_allclose(rotation_matrix.astype(int), expected(2, -3, -1))
\ No newline at end of file
+    assert_allclose(rotation_matrix.astype(int), expected(2, -3, -1))
+
+def test_boxes_in_frustum():
+    view = noxitu.minecraft.renderer.view
+    matrix = view.perspective(80, 16/9) @ view.view(0, 0, 0) @ view.location(np.array([0, 100, 0]))
+    planes = view.frustum_planes(matrix)
+
+    keys = np.array([[-1, 0, -2], [-1, 0, 1], [20, 0, -2], [-1, 0, -1], [5, 0, -20]])
+    visible = view.boxes_in_frustum(planes, 256 * keys, 256 * (keys + 1))
+
+    assert len(planes) == 5
+    assert visible.tolist() == [True, False, False, True, True]
+
+
+def test_facing_directions():
+    view = noxitu.minecraft.renderer.view
+    lows = np.array([[0, 0, 0], [256, 0, 0], [-256, 0, -256]])
+
+    facing = view.facing_directions([100, 300, -10], lows, lows + 256)
+
+    assert facing.tolist() == [
+        [True, True, False, True, True, False],
+        [True, False, False, True, True, False],
+        [False, True, False, True, True, True],
+    ]